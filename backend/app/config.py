@@ -0,0 +1,16 @@
+import os
+import yaml
+
+# Path to the configuration file; $SEARCH_CONFIG points a process (e.g. one container) at another one
+CONFIG_PATH = os.environ.get("SEARCH_CONFIG") or os.path.abspath(os.path.join(os.path.dirname(__file__), "../../config/config.yml"))
+
+
+def load_config(config_path: str = CONFIG_PATH) -> dict:
+    """
+    Load the configuration from the YAML file.
+    Returns an empty dict when the file is missing (e.g. inside the backend container), so callers fall back to defaults.
+    """
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, "r") as file:
+        return yaml.safe_load(file) or {}
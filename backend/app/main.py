@@ -1,11 +1,18 @@
-import sys
-print("PYTHONPATH:", sys.path)
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.routes import search
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # With retrieval.lazy_load the model and index load in the background once the server is up
+    search.start_loading()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS Middleware
 app.add_middleware(
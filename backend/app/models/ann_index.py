@@ -0,0 +1,164 @@
+import os
+import logging
+import numpy as np
+from typing import Optional, Tuple
+
+from backend.app.models.vector_store import normalize_rows, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+# Written next to the embeddings_N.npy shards by IndexingService
+IVF_INDEX_FILE = "ivf_index.npz"
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over L2-normalized embeddings.
+    Documents are partitioned into `nlist` clusters by spherical k-means; a query scores the
+    centroids, then only the documents in the `nprobe` closest clusters. Raising nprobe trades
+    latency for recall, and nprobe == nlist is exactly the exhaustive search.
+    Only cluster assignments are stored; vectors are read from the QueryService embedding matrix.
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_ids: np.ndarray, nprobe: int = 8):
+        """
+        :param centroids: (nlist, dim) float32 array of unit-length cluster centroids.
+        :param list_offsets: (nlist + 1,) offsets of each cluster's slice in `list_ids`.
+        :param list_ids: Document indices grouped by cluster, ascending within each cluster.
+        :param nprobe: Default number of clusters scanned per query.
+        """
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def num_docs(self) -> int:
+        return self.list_ids.shape[0]
+
+    @classmethod
+    def train(
+        cls,
+        matrix: np.ndarray,
+        nlist: int = 1024,
+        iterations: int = 10,
+        sample_size: Optional[int] = None,
+        block_size: int = 65536,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """
+        Build an index with spherical k-means over a sample of the matrix, then assign every row.
+        :param matrix: (n, dim) L2-normalized float32 matrix, may be memory-mapped.
+        :param nlist: Number of clusters; around sqrt(n) to 4 * sqrt(n) is a good range.
+        :param iterations: k-means iterations.
+        :param sample_size: Rows used for training; defaults to 64 per cluster.
+        :param block_size: Rows assigned per block, bounding temporary memory.
+        :param seed: Random seed for sampling and initialization.
+        :return: Trained IVFIndex.
+        """
+        n = matrix.shape[0]
+        nlist = max(1, min(nlist, n))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n, sample_size or 64 * nlist)
+        sample = np.asarray(matrix[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for iteration in range(iterations):
+            assignments = _assign(sample, centroids, block_size)
+            counts = np.bincount(assignments, minlength=nlist)
+            # Per-cluster sums via one sort + reduceat, much faster than np.add.at
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            sums = np.zeros_like(centroids)
+            sums[counts > 0] = np.add.reduceat(sample[np.argsort(assignments, kind="stable")], starts[counts > 0], axis=0)
+            # Re-seed empty clusters with random sample points
+            empty = np.flatnonzero(counts == 0)
+            sums[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+            centroids = normalize_rows(sums)
+            logger.debug(f"IVF k-means iteration {iteration + 1}/{iterations}: {len(empty)} empty clusters re-seeded")
+
+        assignments = _assign(matrix, centroids, block_size)
+
+        # Stable sort keeps document indices ascending within each cluster
+        list_ids = np.argsort(assignments, kind="stable").astype(np.int64)
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))]).astype(np.int64)
+        return cls(centroids, list_offsets, list_ids)
+
+    def extend(self, rows: np.ndarray, block_size: int = 65536) -> None:
+        """
+        Add documents without retraining: new rows are assigned to the existing centroids and get the
+        next document indices, so lists stay ascending. Retrain once the distribution drifts.
+        :param rows: (m, dim) L2-normalized float32 rows, documents num_docs .. num_docs + m - 1.
+        :param block_size: Rows assigned per block.
+        """
+        assignments = _assign(rows, self.centroids, block_size)
+        old_counts = np.diff(self.list_offsets)
+        new_counts = np.bincount(assignments, minlength=self.nlist)
+        list_offsets = np.concatenate([[0], np.cumsum(old_counts + new_counts)]).astype(np.int64)
+
+        # Each cluster's slice is its old documents followed by its new ones
+        list_ids = np.empty(list_offsets[-1], dtype=np.int64)
+        old_clusters = np.repeat(np.arange(self.nlist), old_counts)
+        list_ids[list_offsets[old_clusters] + np.arange(old_clusters.shape[0]) - self.list_offsets[old_clusters]] = self.list_ids
+        order = np.argsort(assignments, kind="stable")
+        new_clusters = assignments[order]
+        new_starts = np.concatenate([[0], np.cumsum(new_counts)[:-1]])
+        positions = list_offsets[new_clusters] + old_counts[new_clusters] + np.arange(order.shape[0]) - new_starts[new_clusters]
+        list_ids[positions] = self.num_docs + order
+
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+
+    def search(self, matrix: np.ndarray, query_embedding: np.ndarray, top_k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k search.
+        :param matrix: The L2-normalized embedding matrix the index was trained on.
+        :param query_embedding: L2-normalized float32 query vector.
+        :param top_k: Number of results to return.
+        :param nprobe: Clusters to scan; defaults to the index's nprobe.
+        :return: Tuple of (document indices, scores), best first, ties broken as in exhaustive search.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        probes = top_k_indices(self.centroids @ query_embedding, nprobe)
+        candidates = np.concatenate([self.list_ids[self.list_offsets[p]:self.list_offsets[p + 1]] for p in probes])
+        # Ascending document order makes positional tie-breaking match the exhaustive path
+        candidates.sort()
+
+        scores = matrix[candidates] @ query_embedding
+        selected = top_k_indices(scores, top_k)
+        return candidates[selected], scores[selected]
+
+    def save(self, index_dir: str) -> str:
+        """
+        Save the index to `ivf_index.npz` in the index directory, replacing any previous one atomically.
+        :return: Path of the written file.
+        """
+        path = os.path.join(index_dir, IVF_INDEX_FILE)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, list_offsets=self.list_offsets, list_ids=self.list_ids)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, index_dir: str, nprobe: int = 8) -> "IVFIndex":
+        """
+        Load an index saved with `save`.
+        :param index_dir: Index directory containing `ivf_index.npz`.
+        :param nprobe: Default number of clusters scanned per query.
+        """
+        with np.load(os.path.join(index_dir, IVF_INDEX_FILE)) as data:
+            return cls(data["centroids"], data["list_offsets"], data["list_ids"], nprobe=nprobe)
+
+
+def _assign(rows: np.ndarray, centroids: np.ndarray, block_size: int) -> np.ndarray:
+    """
+    Index of the most similar centroid for every row, computed in blocks.
+    """
+    return np.concatenate([
+        np.argmax(np.asarray(rows[start:start + block_size]) @ centroids.T, axis=1)
+        for start in range(0, rows.shape[0], block_size)
+    ]) if rows.shape[0] else np.empty(0, dtype=np.int64)
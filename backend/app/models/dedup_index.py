@@ -0,0 +1,199 @@
+import logging
+import os
+import re
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Written next to the shards by IndexingService(dedup_threshold=...)
+DUPLICATE_GROUPS_FILE = "duplicate_groups.npz"
+UNIQUE_MATRIX_FILE = "unique_embeddings.npy"
+
+
+def normalize_title(text: str) -> str:
+    """
+    Key under which titles count as exact duplicates: case and whitespace are ignored.
+    """
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class DuplicateGroups:
+    """
+    Partition of the embedding rows into groups of exact or near-duplicate documents (e.g. the same job
+    ad reposted under new ids). Each group is represented by its first row, whose vector stands in for
+    the whole group in the unique-vector matrix; the other rows are its posting list.
+    """
+
+    def __init__(self, group_of: np.ndarray, representatives: np.ndarray):
+        """
+        :param group_of: Group number of every row.
+        :param representatives: First row of every group, ascending, so group numbers follow row order.
+        """
+        self.group_of = np.asarray(group_of, dtype=np.int64)
+        self.representatives = np.asarray(representatives, dtype=np.int64)
+        # Rows grouped by group; within a group in descending row order, the tie order of the rankings
+        self.member_rows = np.lexsort((-np.arange(len(self.group_of)), self.group_of))
+        self.member_starts = np.searchsorted(self.group_of[self.member_rows], np.arange(self.num_groups + 1))
+
+    def __len__(self) -> int:
+        return len(self.group_of)
+
+    @property
+    def num_groups(self) -> int:
+        return len(self.representatives)
+
+    def members(self, group: int) -> np.ndarray:
+        return self.member_rows[self.member_starts[group]:self.member_starts[group + 1]]
+
+    def latest(self, groups: np.ndarray) -> np.ndarray:
+        """
+        Last row of each group: the most recently indexed posting, and the one ranked first among tied duplicates.
+        """
+        return self.member_rows[self.member_starts[groups]]
+
+    def expand(self, groups: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Replace ranked groups by all of their rows, each with the score of its group.
+        """
+        rows = [self.members(group) for group in groups]
+        sizes = [len(members) for members in rows]
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(rows), np.repeat(scores, sizes)
+
+    def collapse(self, rows: np.ndarray, scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Keep only the best-ranked row of every group in a ranking.
+        """
+        _, first = np.unique(self.group_of[rows], return_index=True)
+        keep = np.sort(first)[:top_k]
+        return rows[keep], scores[keep]
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        texts: Sequence[str],
+        threshold: float = 0.95,
+        num_bands: int = 8,
+        band_bits: int = 12,
+        max_bucket: int = 2048,
+        block_size: int = 65536,
+        seed: int = 0,
+    ) -> "DuplicateGroups":
+        """
+        Group exact duplicates (same normalized text), then near duplicates (cosine similarity of the
+        normalized embeddings at least `threshold`). Near-duplicate candidates come from locality-sensitive
+        hashing instead of all pairs: each row gets num_bands signatures of band_bits random-hyperplane
+        bits, and only rows sharing a signature in some band are compared. Groups are transitive.
+        :param matrix: L2-normalized embedding matrix; may be memory-mapped, it is read in blocks.
+        :param texts: Indexed field of every row.
+        :param threshold: Minimum cosine similarity of near duplicates.
+        :param num_bands: Signatures per row; more bands find more pairs below ~0.98 similarity.
+        :param band_bits: Hyperplane bits per signature; more bits make smaller buckets.
+        :param max_bucket: Rows compared with each other at a time within one bucket, bounding the work
+                           on very common titles.
+        :param block_size: Rows hashed per matrix product.
+        :param seed: Seed of the random hyperplanes.
+        """
+        num_rows = matrix.shape[0]
+        parent = np.arange(num_rows)
+
+        # Exact duplicates point at the first row with the same normalized text
+        first_rows = {}
+        for row, text in enumerate(texts):
+            parent[row] = first_rows.setdefault(normalize_title(text or ""), row)
+        heads = np.flatnonzero(parent == np.arange(num_rows))
+        num_exact = num_rows - len(heads)
+
+        def find(row: int) -> int:
+            while parent[row] != row:
+                parent[row] = parent[parent[row]]
+                row = parent[row]
+            return row
+
+        # Banded random-hyperplane signatures of the distinct texts
+        planes = np.random.default_rng(seed).standard_normal((matrix.shape[1], num_bands * band_bits)).astype(np.float32)
+        bit_weights = np.int64(1) << np.arange(band_bits, dtype=np.int64)
+        signatures = np.empty((len(heads), num_bands), dtype=np.int64)
+        for start in range(0, len(heads), block_size):
+            bits = (np.asarray(matrix[heads[start:start + block_size]]) @ planes) > 0
+            signatures[start:start + block_size] = bits.reshape(-1, num_bands, band_bits).astype(np.int64) @ bit_weights
+
+        num_compared = 0
+        for band in range(num_bands):
+            order = np.argsort(signatures[:, band], kind="stable")
+            bounds = np.flatnonzero(np.diff(signatures[order, band], prepend=-1, append=-1))
+            shared = np.diff(bounds) > 1
+            for start, end in zip(bounds[:-1][shared], bounds[1:][shared]):
+                for chunk in range(start, end - 1, max_bucket):
+                    rows = np.sort(heads[order[chunk:min(chunk + max_bucket, end)]])
+                    vectors = np.asarray(matrix[rows])
+                    num_compared += len(rows) * (len(rows) - 1) // 2
+                    for i, j in zip(*np.nonzero(np.triu(vectors @ vectors.T >= threshold, 1))):
+                        root_i, root_j = find(rows[i]), find(rows[j])
+                        if root_i != root_j:
+                            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        roots = np.array([find(row) for row in range(num_rows)], dtype=np.int64)
+        representatives = np.unique(roots)
+        logger.info(
+            f"{num_rows} documents form {len(representatives)} groups: {num_exact} exact and "
+            f"{len(heads) - len(representatives)} near duplicates, {num_compared} pairs compared."
+        )
+        return cls(np.searchsorted(representatives, roots), representatives)
+
+    def save(self, index_dir: str, matrix: np.ndarray, block_size: int = 65536) -> Tuple[str, str]:
+        """
+        Store the groups and the matrix of representative vectors, each renamed into place once complete.
+        :param index_dir: Index directory.
+        :param matrix: Normalized embedding matrix the groups were built from.
+        :return: Tuple of (groups path, unique matrix path).
+        """
+        unique_path = os.path.join(index_dir, UNIQUE_MATRIX_FILE)
+        unique = np.lib.format.open_memmap(unique_path + ".tmp", mode="w+", dtype=np.float32,
+                                           shape=(self.num_groups, matrix.shape[1]))
+        for start in range(0, self.num_groups, block_size):
+            unique[start:start + block_size] = matrix[self.representatives[start:start + block_size]]
+        unique.flush()
+        del unique
+        os.replace(unique_path + ".tmp", unique_path)
+
+        groups_path = os.path.join(index_dir, DUPLICATE_GROUPS_FILE)
+        np.savez(groups_path + ".tmp.npz", group_of=self.group_of, representatives=self.representatives)
+        os.replace(groups_path + ".tmp.npz", groups_path)
+        return groups_path, unique_path
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["DuplicateGroups"]:
+        """
+        :return: The stored groups, or None if the index has none.
+        """
+        path = os.path.join(index_dir, DUPLICATE_GROUPS_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["group_of"], data["representatives"])
+
+
+def load_unique_matrix(index_dir: str, mmap: bool = False) -> np.ndarray:
+    """
+    The representative vectors written by `DuplicateGroups.save`, one row per group.
+    """
+    return np.load(os.path.join(index_dir, UNIQUE_MATRIX_FILE), mmap_mode="r" if mmap else None)
+
+
+def remove_duplicate_groups(index_dir: str) -> List[str]:
+    """
+    Delete the duplicate groups of an index, e.g. once incremental updates made them stale.
+    :return: Paths removed.
+    """
+    removed = []
+    for file_name in (DUPLICATE_GROUPS_FILE, UNIQUE_MATRIX_FILE):
+        path = os.path.join(index_dir, file_name)
+        if os.path.exists(path):
+            os.remove(path)
+            removed.append(path)
+    return removed
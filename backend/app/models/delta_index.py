@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+# Written next to the shards by IndexingService for incremental updates (IndexingService.update_index)
+DOCUMENT_HASHES_FILE = "document_hashes.npz"
+TOMBSTONES_FILE = "tombstones.npy"
+
+
+def content_hash(value) -> int:
+    """
+    64-bit fingerprint of a string or a JSON-serializable value (dict keys are sorted).
+    """
+    text = value if isinstance(value, str) else json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class DocumentHashes:
+    """
+    Per-row identity of the indexed documents, aligned with the embedding rows: the document key,
+    a hash of the indexed field (decides whether a changed document must be re-encoded) and a hash
+    of the whole metadata record (decides whether it changed at all).
+    """
+
+    def __init__(self, keys: List[str], text_hashes: List[int], record_hashes: List[int]):
+        self.keys = list(keys)
+        self.text_hashes = list(text_hashes)
+        self.record_hashes = list(record_hashes)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @staticmethod
+    def document_key(metadata: dict, key_field: Optional[str], text_hash: int) -> str:
+        """
+        Key identifying a document across updates: its key_field value, or the hash of its indexed field
+        when no key field is configured (a document whose indexed field changed is then a delete plus an
+        insert, one whose other metadata changed an update that keeps its vector).
+        """
+        if key_field is None:
+            return f"{text_hash:016x}"
+        return str(metadata.get(key_field, ""))
+
+    def append(self, metadata: dict, text: str, key_field: Optional[str]) -> None:
+        text_hash = content_hash(text)
+        self.keys.append(self.document_key(metadata, key_field, text_hash))
+        self.text_hashes.append(text_hash)
+        self.record_hashes.append(content_hash(metadata))
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], field: str, key_field: Optional[str]) -> "DocumentHashes":
+        """
+        Recompute the hashes from metadata records, for indexes built before hashes were stored.
+        """
+        hashes = cls([], [], [])
+        for record in records:
+            hashes.append(record["metadata"], record.get(field) or "", key_field)
+        return hashes
+
+    def rekey_by_text(self) -> None:
+        """
+        Key every row by the hash of its indexed field, as `document_key` does without a key field; for
+        hashes stored when such rows were keyed by the whole record.
+        """
+        self.keys = [f"{text_hash:016x}" for text_hash in self.text_hashes]
+
+    def subset(self, rows: np.ndarray) -> "DocumentHashes":
+        return DocumentHashes([self.keys[row] for row in rows], [self.text_hashes[row] for row in rows],
+                              [self.record_hashes[row] for row in rows])
+
+    def live_rows(self, deleted: np.ndarray) -> Dict[str, List[int]]:
+        """
+        Rows of every key that are not tombstoned, oldest first.
+        """
+        live = {}
+        for row in np.flatnonzero(~deleted):
+            live.setdefault(self.keys[row], []).append(int(row))
+        return live
+
+    def save(self, index_dir: str) -> str:
+        path = os.path.join(index_dir, DOCUMENT_HASHES_FILE)
+        np.savez(
+            path + ".tmp.npz",
+            keys=np.array(self.keys, dtype=str),
+            text_hashes=np.array(self.text_hashes, dtype=np.uint64),
+            record_hashes=np.array(self.record_hashes, dtype=np.uint64),
+        )
+        os.replace(path + ".tmp.npz", path)
+        return path
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["DocumentHashes"]:
+        """
+        :return: The stored hashes, or None if the index has none.
+        """
+        path = os.path.join(index_dir, DOCUMENT_HASHES_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["keys"].tolist(), data["text_hashes"].tolist(), data["record_hashes"].tolist())
+
+
+def write_tombstones(index_dir: str, deleted: np.ndarray) -> str:
+    """
+    Store the deleted-row mask as a bitmap (one bit per embedding row), replacing any previous one atomically.
+    :param index_dir: Index directory.
+    :param deleted: Boolean array, True for rows that were deleted or superseded by a newer version.
+    :return: Path of the written file.
+    """
+    path = os.path.join(index_dir, TOMBSTONES_FILE)
+    np.save(path + ".tmp.npy", np.packbits(deleted, bitorder="little"))
+    os.replace(path + ".tmp.npy", path)
+    return path
+
+
+def load_tombstones(index_dir: str, num_docs: int) -> Optional[np.ndarray]:
+    """
+    Read the deleted-row mask written by `write_tombstones`.
+    :param index_dir: Index directory.
+    :param num_docs: Number of embedding rows.
+    :return: Boolean array of length num_docs, or None if the index has no tombstones.
+    """
+    path = os.path.join(index_dir, TOMBSTONES_FILE)
+    if not os.path.exists(path):
+        return None
+    bits = np.load(path)
+    if bits.shape[0] != (num_docs + 7) // 8:
+        raise ValueError(f"Stale {TOMBSTONES_FILE}: {bits.shape[0] * 8} bits for {num_docs} documents.")
+    return np.unpackbits(bits, count=num_docs, bitorder="little").astype(bool)
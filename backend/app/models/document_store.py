@@ -0,0 +1,293 @@
+import json
+import mmap
+import os
+import struct
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from backend.app.models.vector_store import list_index_files
+
+# Compact metadata store written next to the metadata_N.json shards by IndexingService: one compact JSON
+# record per document back to back, each behind a table of its fields' byte ranges; the byte offset of
+# every record; and the field path of every table slot.
+METADATA_STORE_FILE = "metadata_store.bin"
+METADATA_OFFSETS_FILE = "metadata_offsets.npy"
+# Deliberately not prefixed with "metadata_" so shard discovery ignores it.
+METADATA_FIELDS_FILE = "record_fields.json"
+
+
+def load_metadata(metadata_paths: List[str]) -> List[dict]:
+    """
+    Load and concatenate the `metadata_N.json` shards of an index.
+    :param metadata_paths: Ordered list of metadata shard paths.
+    :return: List of per-document metadata records, aligned with the embedding rows.
+    """
+    metadata = []
+    for metadata_path in metadata_paths:
+        with open(metadata_path, "r") as f:
+            metadata.extend(json.load(f))
+    return metadata
+
+
+def project_record(record: dict, fields: Optional[Sequence[str]]) -> dict:
+    """
+    Keep only the requested fields of a metadata record, preserving its nesting.
+    Fields are top-level keys ("title") or dotted paths into nested dicts ("metadata.requirements");
+    "id" is always kept. Missing fields are left out.
+    :param record: Metadata record.
+    :param fields: Field paths to keep, or None to return the record unchanged.
+    :return: The projected record.
+    """
+    if fields is None:
+        return record
+
+    projected = {"id": record["id"]} if "id" in record else {}
+    for field in fields:
+        source, target = record, projected
+        *parents, leaf = field.split(".")
+        for parent in parents:
+            source = source.get(parent)
+            if not isinstance(source, dict):
+                break
+            target = target.setdefault(parent, {})
+        else:
+            if leaf in source:
+                target[leaf] = source[leaf]
+    return projected
+
+
+def _encode_record(record: dict, field_ids: Dict[Tuple[str, ...], int], paths: List[Tuple[str, ...]]) -> bytes:
+    """
+    Encode a record as compact JSON (the same text as `json.dumps`) preceded by a table with the byte range
+    of the value at every field path, nested dicts included, so any field can be decoded on its own.
+    The table holds the number of slots and a (begin, end) pair per slot, (0, 0) for absent fields.
+    Paths seen for the first time are added to field_ids and paths.
+    """
+    chunks, spans = [], {}
+    size = 0
+
+    def emit(chunk: bytes) -> None:
+        nonlocal size
+        chunks.append(chunk)
+        size += len(chunk)
+
+    def dump(value, path: Tuple[str, ...]) -> None:
+        begin = size
+        if isinstance(value, dict):
+            emit(b"{")
+            for position, (key, item) in enumerate(value.items()):
+                key = str(key)
+                emit((b"," if position else b"") + json.dumps(key, ensure_ascii=False).encode("utf-8") + b":")
+                dump(item, path + (key,))
+            emit(b"}")
+        else:
+            emit(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        if path:
+            field_id = field_ids.get(path)
+            if field_id is None:
+                field_id = field_ids[path] = len(paths)
+                paths.append(path)
+            spans[field_id] = (begin, size)
+
+    dump(record, ())
+    count = max(spans) + 1 if spans else 0
+    table = [offset for field_id in range(count) for offset in spans.get(field_id, (0, 0))]
+    return struct.pack(f"<{2 * count + 1}I", count, *table) + b"".join(chunks)
+
+
+def _write_fields(index_dir: str, paths: List[Tuple[str, ...]]) -> None:
+    fields_path = os.path.join(index_dir, METADATA_FIELDS_FILE)
+    with open(fields_path + ".tmp", "w") as f:
+        json.dump([list(path) for path in paths], f, ensure_ascii=False)
+    os.replace(fields_path + ".tmp", fields_path)
+
+
+def _read_fields(index_dir: str) -> Optional[List[Tuple[str, ...]]]:
+    fields_path = os.path.join(index_dir, METADATA_FIELDS_FILE)
+    if not os.path.exists(fields_path):
+        return None
+    with open(fields_path, "r") as f:
+        return [tuple(path) for path in json.load(f)]
+
+
+def write_metadata_store(index_dir: str, records: Iterable[dict]) -> str:
+    """
+    Write metadata records as an offset-indexed record file that MetadataStore reads lazily, with the
+    byte range of every field of a record, so a projection decodes only the requested ones.
+    Records are streamed, so `records` may be a generator over the metadata shards.
+    The files are renamed into place once complete, offsets last.
+    :param index_dir: Index directory to write into.
+    :param records: Per-document metadata records, in embedding row order.
+    :return: Path of the written record file.
+    """
+    store_path = os.path.join(index_dir, METADATA_STORE_FILE)
+    offsets_path = os.path.join(index_dir, METADATA_OFFSETS_FILE)
+    field_ids, paths = {}, []
+    offsets = [0]
+    with open(store_path + ".tmp", "wb") as f:
+        for record in records:
+            f.write(_encode_record(record, field_ids, paths))
+            offsets.append(f.tell())
+    os.replace(store_path + ".tmp", store_path)
+    _write_fields(index_dir, paths)
+    np.save(offsets_path + ".tmp.npy", np.array(offsets, dtype=np.int64))
+    os.replace(offsets_path + ".tmp.npy", offsets_path)
+    return store_path
+
+
+def append_metadata_store(index_dir: str, records: Iterable[dict]) -> str:
+    """
+    Append records to the store written by `write_metadata_store`, e.g. the delta shards of an
+    incremental update. Existing bytes are never rewritten, new field paths are added after the known
+    ones, and the offsets file is replaced last, so readers either see the old store or the extended one.
+    :param index_dir: Index directory containing the store.
+    :param records: Metadata records of the new rows, in embedding row order.
+    :return: Path of the record file.
+    """
+    store_path = os.path.join(index_dir, METADATA_STORE_FILE)
+    offsets_path = os.path.join(index_dir, METADATA_OFFSETS_FILE)
+    offsets = np.load(offsets_path).tolist()
+    paths = _read_fields(index_dir)
+    field_ids = {path: field_id for field_id, path in enumerate(paths or [])}
+    with open(store_path, "r+b") as f:
+        # Drop any tail left by an interrupted append
+        f.truncate(offsets[-1])
+        f.seek(offsets[-1])
+        for record in records:
+            if paths is None:
+                # Store written before fields were encoded separately: one JSON object per record
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            else:
+                f.write(_encode_record(record, field_ids, paths))
+            offsets.append(f.tell())
+    if paths is not None:
+        _write_fields(index_dir, paths)
+    np.save(offsets_path + ".tmp.npy", np.array(offsets, dtype=np.int64))
+    os.replace(offsets_path + ".tmp.npy", offsets_path)
+    return store_path
+
+
+class MetadataStore:
+    """
+    Read-only, list-like view of the metadata records written by `write_metadata_store`.
+    The record file is memory-mapped and a record is only decoded when it is indexed, so opening
+    the store costs one offsets read and resident memory holds just the records that were fetched.
+    The byte range of every field is stored with its record, so `get` decodes only the fields it returns.
+    Records are the same dicts `load_metadata` returns; each access returns a fresh copy.
+    """
+
+    def __init__(self, index_dir: str):
+        """
+        :param index_dir: Index directory containing metadata_store.bin, metadata_offsets.npy and record_fields.json.
+        """
+        self.offsets = np.load(os.path.join(index_dir, METADATA_OFFSETS_FILE), mmap_mode="r")
+        store_path = os.path.join(index_dir, METADATA_STORE_FILE)
+        size = os.path.getsize(store_path)
+        # A longer file is an append in progress; its offsets are not published yet
+        if size < self.offsets[-1]:
+            raise ValueError(f"Corrupt metadata store: {store_path} has {size} bytes, offsets end at {self.offsets[-1]}.")
+        # None for stores holding one JSON object per record, written before fields were encoded separately
+        self.paths = _read_fields(index_dir)
+        self._field_ids = {path: field_id for field_id, path in enumerate(self.paths or [])}
+        self._plans = {}  # requested fields -> _plan
+        self._file = open(store_path, "rb")
+        # mmap cannot map empty files
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return self.offsets.shape[0] - 1
+
+    def _check_index(self, index: Union[int, np.integer]) -> int:
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Metadata index {index} out of range for {len(self)} documents.")
+        return index
+
+    def _plan(self, fields: Tuple[str, ...]) -> List[Tuple[List[Tuple[str, Optional[int]]], str, Optional[int]]]:
+        """
+        For each field path to return ("id" first): the (key, field id) of its parent dicts, and the key
+        and field id of the value itself; None for paths no record has.
+        """
+        plan = self._plans.get(fields)
+        if plan is None:
+            plan = []
+            for field in ("id", *fields):
+                *parents, leaf = field.split(".")
+                parent_ids = [(key, self._field_ids.get(tuple(parents[:depth + 1]))) for depth, key in enumerate(parents)]
+                plan.append((parent_ids, leaf, self._field_ids.get(tuple(field.split(".")))))
+            self._plans[fields] = plan
+        return plan
+
+    def __getitem__(self, index: Union[int, np.integer]) -> dict:
+        index = self._check_index(index)
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        if self.paths is not None:
+            (count,) = struct.unpack_from("<I", self._data, start)
+            start += 4 + 8 * count
+        return json.loads(self._data[start:end])
+
+    def get(self, index: Union[int, np.integer], fields: Optional[Sequence[str]] = None) -> dict:
+        """
+        Read one record, keeping only the requested fields, as `project_record` would; only the values
+        returned are decoded, the rest of the record is never parsed.
+        :param index: Document index (embedding row).
+        :param fields: Field paths as in `project_record`, or None for the whole record.
+        """
+        if fields is None or self.paths is None:
+            return project_record(self[index], fields)
+        start = int(self.offsets[self._check_index(index)])
+        data = self._data
+        (count,) = struct.unpack_from("<I", data, start)
+        spans = struct.unpack_from(f"<{2 * count}I", data, start + 4)
+        base = start + 4 + 8 * count
+
+        projected, targets, values = {}, [], []
+        for parent_ids, leaf, field_id in self._plan(tuple(fields)):
+            target = projected
+            for key, parent_id in parent_ids:
+                # Only descend into parents that are dicts in this record
+                if parent_id is None or parent_id >= count or not spans[2 * parent_id + 1] \
+                        or data[base + spans[2 * parent_id]] != ord("{"):
+                    break
+                target = target.setdefault(key, {})
+            else:
+                if field_id is not None and field_id < count and spans[2 * field_id + 1]:
+                    target[leaf] = None  # keeps the field order of project_record
+                    targets.append((target, leaf))
+                    values.append(data[base + spans[2 * field_id]:base + spans[2 * field_id + 1]])
+        # The selected values are decoded together, as one JSON array
+        for (target, leaf), value in zip(targets, json.loads(b"[" + b",".join(values) + b"]")):
+            target[leaf] = value
+        return projected
+
+    def __iter__(self) -> Iterator[dict]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+def fetch_record(metadata: Union["MetadataStore", List[dict]], index: int, fields: Optional[Sequence[str]] = None) -> dict:
+    """
+    One record of the metadata opened by `open_metadata`, keeping only the requested fields; a
+    MetadataStore decodes just those.
+    """
+    if isinstance(metadata, MetadataStore):
+        return metadata.get(index, fields)
+    return project_record(metadata[index], fields)
+
+
+def open_metadata(index_dir: str) -> Union[MetadataStore, List[dict]]:
+    """
+    Open the metadata of an index: the lazy MetadataStore if IndexingService wrote one,
+    otherwise the metadata_N.json shards loaded into memory.
+    """
+    if os.path.exists(os.path.join(index_dir, METADATA_OFFSETS_FILE)):
+        return MetadataStore(index_dir)
+    _, metadata_paths = list_index_files(index_dir)
+    return load_metadata(metadata_paths)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Optional
+
+# Written by IndexingService after every other index file, so its presence marks a complete build
+# and its version changes whenever the index is rebuilt.
+MANIFEST_FILE = "index_manifest.json"
+
+
+def write_manifest(index_dir: str, **info) -> dict:
+    """
+    Stamp an index directory with a fresh version and build information.
+    The file is written to a temporary name and renamed, so readers never see a partial manifest.
+    :param index_dir: Index directory.
+    :param info: Extra build information to record (e.g. num_docs, model, field).
+    :return: The manifest that was written.
+    """
+    manifest = {
+        "version": f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:12]}",
+        "created_at": time.time(),
+        **info,
+    }
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+
+def read_manifest(index_dir: str) -> Optional[dict]:
+    """
+    Read the manifest of an index directory.
+    :return: The manifest, or None for indexes built before manifests were written.
+    """
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def index_version(index_dir: str) -> str:
+    """
+    Version stamp of an index directory: the manifest version, or for indexes without a manifest
+    a fingerprint of the names, sizes and modification times of the files in it.
+    """
+    manifest = read_manifest(index_dir)
+    if manifest is not None:
+        return manifest["version"]
+
+    fingerprint = hashlib.sha1()
+    for file_name in sorted(os.listdir(index_dir)):
+        stat = os.stat(os.path.join(index_dir, file_name))
+        fingerprint.update(f"{file_name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return f"files-{fingerprint.hexdigest()[:16]}"
+
+
+# Written by IndexingService into the staging directory of a build after every completed shard,
+# and removed once the build is published.
+BUILD_CHECKPOINT_FILE = "build_checkpoint.json"
+
+
+def write_build_checkpoint(build_dir: str, **state) -> dict:
+    """
+    Record the progress of an index build, atomically like the manifest.
+    :param build_dir: Staging directory of the build.
+    :param state: Build settings and progress (e.g. num_shards, documents_seen).
+    :return: The checkpoint that was written.
+    """
+    checkpoint_path = os.path.join(build_dir, BUILD_CHECKPOINT_FILE)
+    with open(checkpoint_path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(checkpoint_path + ".tmp", checkpoint_path)
+    return state
+
+
+def read_build_checkpoint(build_dir: str) -> Optional[dict]:
+    """
+    :return: The last checkpoint of an interrupted build, or None if there is none.
+    """
+    checkpoint_path = os.path.join(build_dir, BUILD_CHECKPOINT_FILE)
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, "r") as f:
+        return json.load(f)
@@ -0,0 +1,245 @@
+import os
+import logging
+import numpy as np
+from typing import List, Optional, Tuple
+
+from backend.app.models.vector_store import merge_top_k, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+# Written next to the embeddings_N.npy shards by IndexingService(quantization="pq")
+PQ_CODES_FILE = "pq_codes.npy"
+PQ_CODEBOOKS_FILE = "pq_codebooks.npz"
+
+
+def _kmeans(points: np.ndarray, num_centroids: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Euclidean k-means over a small float32 sample; empty clusters are re-seeded with random points.
+    """
+    centroids = points[rng.choice(points.shape[0], num_centroids, replace=False)].copy()
+    for iteration in range(iterations):
+        assignments = _nearest(points, centroids)
+        counts = np.bincount(assignments, minlength=num_centroids)
+        # Per-cluster sums via one sort + reduceat, as in IVFIndex.train
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        sums[counts > 0] = np.add.reduceat(points[np.argsort(assignments, kind="stable")], starts[counts > 0], axis=0)
+        centroids = (sums / np.maximum(counts, 1)[:, np.newaxis]).astype(np.float32)
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = points[rng.choice(points.shape[0], len(empty), replace=False)]
+    return centroids
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Index of the closest centroid (Euclidean) for every point: argmax of x.c - |c|^2 / 2.
+    """
+    return np.argmax(points @ centroids.T - 0.5 * np.einsum("ij,ij->i", centroids, centroids), axis=1)
+
+
+class ProductQuantizer:
+    """
+    Product-quantized (PQ) compressed copy of the normalized embedding matrix.
+    Each vector is split into `num_subspaces` sub-vectors and each sub-vector is replaced by the index of
+    its nearest of 256 sub-centroids, so a 512-dim float32 row (2 KB) becomes `num_subspaces` bytes.
+    An optional OPQ rotation, learned before the codebooks, spreads variance evenly across subspaces.
+    A query is scored by asymmetric distance computation (ADC): one lookup table of query/sub-centroid
+    dot products per subspace, then a table lookup per code. Codes are stored subspace-major, so the
+    scan reads one contiguous byte column per subspace.
+    Scores are approximate; QueryService re-scores the best candidates with the float32 matrix.
+    """
+
+    def __init__(self, codebooks: np.ndarray, codes: Optional[np.ndarray] = None, rotation: Optional[np.ndarray] = None):
+        """
+        :param codebooks: (num_subspaces, 256, dim / num_subspaces) float32 sub-centroids.
+        :param codes: (num_subspaces, n) uint8 codes, may be memory-mapped; None before encoding.
+        :param rotation: (dim, dim) orthogonal OPQ rotation applied before splitting, or None.
+        """
+        self.codebooks = codebooks
+        self.codes = codes
+        self.rotation = rotation
+
+    @property
+    def num_subspaces(self) -> int:
+        return self.codebooks.shape[0]
+
+    @property
+    def num_docs(self) -> int:
+        return self.codes.shape[1] if self.codes is not None else 0
+
+    @property
+    def nbytes(self) -> int:
+        codes_nbytes = self.codes.nbytes if self.codes is not None else 0
+        rotation_nbytes = self.rotation.nbytes if self.rotation is not None else 0
+        return codes_nbytes + self.codebooks.nbytes + rotation_nbytes
+
+    @classmethod
+    def train(
+        cls,
+        matrix: np.ndarray,
+        num_subspaces: int = 32,
+        iterations: int = 15,
+        opq_iterations: int = 0,
+        sample_size: int = 65536,
+        seed: int = 0,
+    ) -> "ProductQuantizer":
+        """
+        Learn the (optionally OPQ-rotated) codebooks from a sample of the matrix; codes are added with `encode`.
+        :param matrix: (n, dim) L2-normalized float32 matrix, may be memory-mapped.
+        :param num_subspaces: Number of sub-vectors, i.e. bytes per encoded row; must divide dim.
+        :param iterations: k-means iterations per subspace.
+        :param opq_iterations: Rounds of alternating rotation / codebook updates (0 disables OPQ).
+        :param sample_size: Rows used for training.
+        :param seed: Random seed for sampling and initialization.
+        :return: ProductQuantizer without codes.
+        """
+        n, dim = matrix.shape
+        if dim % num_subspaces:
+            raise ValueError(f"num_subspaces={num_subspaces} must divide the embedding dimension {dim}.")
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(matrix[np.sort(rng.choice(n, min(n, sample_size), replace=False))], dtype=np.float32)
+        num_centroids = min(256, sample.shape[0])
+
+        rotation = None
+        if opq_iterations:
+            # Non-parametric OPQ: alternate short PQ training on the rotated sample with the
+            # orthogonal Procrustes rotation that best maps the sample onto its reconstruction
+            rotation = np.eye(dim, dtype=np.float32)
+            for opq_iteration in range(opq_iterations):
+                rotated = sample @ rotation
+                quantizer = cls(cls._train_codebooks(rotated, num_subspaces, num_centroids, 4, rng))
+                reconstructed = quantizer._reconstruct(quantizer._encode_block(rotated))
+                u, _, vt = np.linalg.svd(sample.T @ reconstructed)
+                rotation = (u @ vt).astype(np.float32)
+            sample = sample @ rotation
+
+        return cls(cls._train_codebooks(sample, num_subspaces, num_centroids, iterations, rng), rotation=rotation)
+
+    @staticmethod
+    def _train_codebooks(sample: np.ndarray, num_subspaces: int, num_centroids: int, iterations: int, rng) -> np.ndarray:
+        return np.stack([
+            _kmeans(np.ascontiguousarray(subspace), num_centroids, iterations, rng)
+            for subspace in np.split(sample, num_subspaces, axis=1)
+        ]).astype(np.float32)
+
+    def _encode_block(self, rotated: np.ndarray) -> np.ndarray:
+        """
+        (num_subspaces, rows) uint8 codes of already rotated rows.
+        """
+        return np.stack([
+            _nearest(subspace, codebook)
+            for subspace, codebook in zip(np.split(rotated, self.num_subspaces, axis=1), self.codebooks)
+        ]).astype(np.uint8)
+
+    def _reconstruct(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Rotated-space approximation of the encoded rows.
+        """
+        return np.concatenate([codebook[subspace_codes] for codebook, subspace_codes in zip(self.codebooks, codes)], axis=1)
+
+    def _rotate(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.float32)
+        return rows @ self.rotation if self.rotation is not None else rows
+
+    def encode(self, matrix: np.ndarray, block_size: int = 65536, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encode every row of the matrix block by block and keep the codes.
+        :param matrix: (n, dim) L2-normalized float32 matrix, may be memory-mapped.
+        :param block_size: Rows encoded at a time, bounding temporary memory.
+        :param out: Optional (num_subspaces, n) uint8 array (e.g. a writable memmap) to fill.
+        :return: The codes.
+        """
+        codes = out if out is not None else np.empty((self.num_subspaces, matrix.shape[0]), dtype=np.uint8)
+        for start in range(0, matrix.shape[0], block_size):
+            codes[:, start:start + block_size] = self._encode_block(self._rotate(matrix[start:start + block_size]))
+        self.codes = codes
+        return codes
+
+    def extend(self, rows: np.ndarray, block_size: int = 65536) -> None:
+        """
+        Encode additional rows with the existing codebooks and append their codes in memory; store them with `save`.
+        :param rows: (m, dim) L2-normalized float32 rows, documents num_docs .. num_docs + m - 1.
+        :param block_size: Rows encoded at a time.
+        """
+        new_codes = np.empty((self.num_subspaces, rows.shape[0]), dtype=np.uint8)
+        for start in range(0, rows.shape[0], block_size):
+            new_codes[:, start:start + block_size] = self._encode_block(self._rotate(np.asarray(rows[start:start + block_size])))
+        self.codes = np.concatenate([self.codes, new_codes], axis=1)
+
+    def save(self, index_dir: str, matrix: Optional[np.ndarray] = None, block_size: int = 65536) -> str:
+        """
+        Encode the matrix straight into `pq_codes.npy` and store the codebooks in `pq_codebooks.npz`.
+        Without a matrix, the current codes are stored as they are (e.g. after `extend`).
+        Both files are renamed into place once complete, codebooks last.
+        :param index_dir: Index directory to write into.
+        :param matrix: (n, dim) L2-normalized float32 matrix the codebooks were trained for, or None.
+        :param block_size: Rows encoded at a time.
+        :return: Path of the written codes file.
+        """
+        codes_path = os.path.join(index_dir, PQ_CODES_FILE)
+        num_docs = matrix.shape[0] if matrix is not None else self.codes.shape[1]
+        codes = np.lib.format.open_memmap(codes_path + ".tmp", mode="w+", dtype=np.uint8, shape=(self.num_subspaces, num_docs))
+        if matrix is not None:
+            self.encode(matrix, block_size, out=codes)
+        else:
+            codes[:] = self.codes
+        codes.flush()
+        del codes
+        os.replace(codes_path + ".tmp", codes_path)
+
+        codebooks_path = os.path.join(index_dir, PQ_CODEBOOKS_FILE)
+        arrays = {"codebooks": self.codebooks}
+        if self.rotation is not None:
+            arrays["rotation"] = self.rotation
+        np.savez(codebooks_path + ".tmp.npz", **arrays)
+        os.replace(codebooks_path + ".tmp.npz", codebooks_path)
+        self.codes = np.load(codes_path, mmap_mode="r")
+        return codes_path
+
+    @classmethod
+    def load(cls, index_dir: str, mmap: bool = False) -> "ProductQuantizer":
+        """
+        Load codebooks and codes saved with `save`.
+        :param index_dir: Index directory.
+        :param mmap: Memory-map the codes instead of reading them into memory.
+        """
+        with np.load(os.path.join(index_dir, PQ_CODEBOOKS_FILE)) as data:
+            codebooks = data["codebooks"]
+            rotation = data["rotation"] if "rotation" in data.files else None
+        codes = np.load(os.path.join(index_dir, PQ_CODES_FILE), mmap_mode="r" if mmap else None)
+        return cls(codebooks, codes, rotation)
+
+    def lookup_table(self, query_embedding: np.ndarray) -> np.ndarray:
+        """
+        (num_subspaces, 256) dot products of the query's sub-vectors with every sub-centroid.
+        """
+        rotated = self._rotate(query_embedding[np.newaxis, :])[0]
+        return np.einsum("mkd,md->mk", self.codebooks, rotated.reshape(self.num_subspaces, -1))
+
+    def search(self, query_embedding: np.ndarray, top_k: int, block_size: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k by ADC over all codes; each block of rows contributes its own top-k,
+        which are merged as in the exhaustive search.
+        :param query_embedding: L2-normalized float32 query vector.
+        :param top_k: Number of candidates to return.
+        :param block_size: Rows scored at a time; the score accumulator stays in cache.
+        :return: Tuple of (document indices, approximate scores), best first.
+        """
+        table = self.lookup_table(query_embedding)
+        block_indices, block_scores = [], []
+        partial = np.empty(block_size, dtype=np.float32)
+        for start in range(0, self.num_docs, block_size):
+            stop = min(start + block_size, self.num_docs)
+            scores = table[0].take(self.codes[0, start:stop])
+            for subspace in range(1, self.num_subspaces):
+                scores += table[subspace].take(self.codes[subspace, start:stop], out=partial[:stop - start])
+            indices = top_k_indices(scores, top_k)
+            block_indices.append(indices + start)
+            block_scores.append(scores[indices])
+        return merge_top_k(block_indices, block_scores, top_k)
+
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int, block_size: int = 65536) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Approximate top-k for several queries; ADC has no matrix-matrix form, so queries are scanned one by one.
+        """
+        return [self.search(query_embedding, top_k, block_size) for query_embedding in query_embeddings]
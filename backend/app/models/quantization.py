@@ -0,0 +1,175 @@
+import os
+import numpy as np
+from typing import List, Optional, Tuple
+
+from backend.app.models.vector_store import merge_top_k, top_k_indices
+
+QUANTIZATION_KINDS = ("float16", "int8")
+
+
+def quantized_matrix_file(kind: str) -> str:
+    """
+    File name of the quantized copy of normalized_embeddings.npy; int8 also stores `quantized_int8_scale.npy`.
+    """
+    return f"quantized_{kind}.npy"
+
+
+def _scale_file(kind: str) -> str:
+    return f"quantized_{kind}_scale.npy"
+
+
+def _check_kind(kind: str):
+    if kind not in QUANTIZATION_KINDS:
+        raise ValueError(f"Unsupported quantization: {kind}. Options: {', '.join(QUANTIZATION_KINDS)}")
+
+
+def _int8_scale(matrix: np.ndarray, block_size: int) -> np.ndarray:
+    """
+    Per-dimension symmetric int8 scale: the largest absolute value of each column maps to 127.
+    """
+    max_abs = np.zeros(matrix.shape[1], dtype=np.float32)
+    for start in range(0, matrix.shape[0], block_size):
+        np.maximum(max_abs, np.abs(matrix[start:start + block_size]).max(axis=0), out=max_abs)
+    max_abs[max_abs == 0.0] = 1.0
+    return max_abs / 127.0
+
+
+def _encode_block(block: np.ndarray, kind: str, scale: Optional[np.ndarray]) -> np.ndarray:
+    if kind == "float16":
+        return block.astype(np.float16)
+    return np.clip(np.rint(block / scale), -127, 127).astype(np.int8)
+
+
+class QuantizedMatrix:
+    """
+    Compressed copy of the normalized embedding matrix used for a fast first-pass scan.
+    float16 halves and int8 quarters the bytes read per query; int8 uses a per-dimension scale,
+    so a score is `codes @ (scale * query)` and rows never need to be rescaled.
+    numpy has no native float16 arithmetic, so widening float16 codes is slow on CPU: float16 saves memory,
+    int8 saves memory and scans about as fast as float32 (faster once the float32 matrix outgrows RAM).
+    Scores are approximate; QueryService re-scores the best candidates with the float32 matrix.
+    """
+
+    def __init__(self, codes: np.ndarray, scale: Optional[np.ndarray] = None):
+        """
+        :param codes: (n, dim) float16 or int8 array, may be memory-mapped.
+        :param scale: (dim,) float32 per-dimension scale for int8 codes; None for float16.
+        """
+        self.codes = codes
+        self.scale = scale
+
+    @property
+    def kind(self) -> str:
+        return "int8" if self.codes.dtype == np.int8 else "float16"
+
+    @property
+    def num_docs(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    @classmethod
+    def quantize(cls, matrix: np.ndarray, kind: str, block_size: int = 65536) -> "QuantizedMatrix":
+        """
+        Quantize a normalized float32 matrix in memory.
+        :param matrix: (n, dim) L2-normalized float32 matrix.
+        :param kind: "float16" or "int8".
+        :param block_size: Rows converted at a time, bounding temporary memory.
+        """
+        _check_kind(kind)
+        scale = _int8_scale(matrix, block_size) if kind == "int8" else None
+        codes = np.empty(matrix.shape, dtype=np.float16 if kind == "float16" else np.int8)
+        for start in range(0, matrix.shape[0], block_size):
+            codes[start:start + block_size] = _encode_block(matrix[start:start + block_size], kind, scale)
+        return cls(codes, scale)
+
+    @staticmethod
+    def write(index_dir: str, matrix: np.ndarray, kind: str, block_size: int = 65536) -> str:
+        """
+        Stream a quantized copy of a (possibly memory-mapped) normalized matrix to the index directory.
+        Like `write_normalized_matrix`, the file is renamed into place once complete.
+        :param index_dir: Index directory to write into.
+        :param matrix: (n, dim) L2-normalized float32 matrix.
+        :param kind: "float16" or "int8".
+        :param block_size: Rows converted at a time.
+        :return: Path of the written codes file.
+        """
+        _check_kind(kind)
+        scale = None
+        if kind == "int8":
+            scale = _int8_scale(matrix, block_size)
+            np.save(os.path.join(index_dir, _scale_file(kind)), scale)
+
+        path = os.path.join(index_dir, quantized_matrix_file(kind))
+        tmp_path = path + ".tmp"
+        codes = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float16 if kind == "float16" else np.int8, shape=matrix.shape)
+        for start in range(0, matrix.shape[0], block_size):
+            codes[start:start + block_size] = _encode_block(np.asarray(matrix[start:start + block_size]), kind, scale)
+        codes.flush()
+        del codes
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, index_dir: str, kind: str, mmap: bool = False) -> "QuantizedMatrix":
+        """
+        Load a matrix written with `write`.
+        :param index_dir: Index directory.
+        :param kind: "float16" or "int8".
+        :param mmap: Memory-map the codes instead of reading them into memory.
+        """
+        _check_kind(kind)
+        codes = np.load(os.path.join(index_dir, quantized_matrix_file(kind)), mmap_mode="r" if mmap else None)
+        scale = np.load(os.path.join(index_dir, _scale_file(kind))) if kind == "int8" else None
+        return cls(codes, scale)
+
+    def _scaled_queries(self, query_embeddings: np.ndarray) -> np.ndarray:
+        return query_embeddings * self.scale if self.scale is not None else query_embeddings
+
+    def search(
+        self, query_embedding: np.ndarray, top_k: int, block_size: int = 65536, chunk_size: int = 1024
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k by scanning the codes.
+        :param query_embedding: L2-normalized float32 query vector.
+        :param top_k: Number of candidates to return.
+        :param block_size: Rows per top-k selection block.
+        :param chunk_size: Rows widened to float32 at a time.
+        :return: Tuple of (document indices, approximate scores), best first.
+        """
+        return self.search_batch(query_embedding[np.newaxis, :], top_k, block_size, chunk_size)[0]
+
+    def search_batch(
+        self, query_embeddings: np.ndarray, top_k: int, block_size: int = 65536, chunk_size: int = 1024
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Approximate top-k for a batch of queries. Codes are widened to float32 a small chunk at a time
+        into a reused buffer that stays in cache, so memory traffic stays at the compressed size; each
+        block of rows contributes its own top-k, which are merged as in the exhaustive search.
+        :param query_embeddings: 2D array of L2-normalized float32 query vectors, one per row.
+        :param top_k: Number of candidates to return per query.
+        :param block_size: Rows per top-k selection block.
+        :param chunk_size: Rows widened to float32 at a time.
+        :return: List of (document indices, approximate scores) tuples, one per query, best first.
+        """
+        scaled = self._scaled_queries(query_embeddings).astype(np.float32)
+        num_queries = scaled.shape[0]
+        buffer = np.empty((chunk_size, self.codes.shape[1]), dtype=np.float32)
+        block_indices = [[] for _ in range(num_queries)]
+        block_scores = [[] for _ in range(num_queries)]
+        for start in range(0, self.num_docs, block_size):
+            stop = min(start + block_size, self.num_docs)
+            similarities = np.empty((num_queries, stop - start), dtype=np.float32)
+            for chunk_start in range(start, stop, chunk_size):
+                chunk = self.codes[chunk_start:min(chunk_start + chunk_size, stop)]
+                widened = buffer[:chunk.shape[0]]
+                np.copyto(widened, chunk, casting="unsafe")
+                offset = chunk_start - start
+                similarities[:, offset:offset + chunk.shape[0]] = scaled @ widened.T
+            for q in range(num_queries):
+                indices = top_k_indices(similarities[q], top_k)
+                block_indices[q].append(indices + start)
+                block_scores[q].append(similarities[q, indices])
+        return [merge_top_k(block_indices[q], block_scores[q], top_k) for q in range(num_queries)]
@@ -0,0 +1,192 @@
+import os
+import numpy as np
+from collections import Counter
+from typing import Callable, List, Optional, Tuple
+
+from backend.app.models.vector_store import top_k_indices
+from backend.app.utils.preprocess import tokenize
+
+# Written next to the embeddings_N.npy shards by IndexingService
+SPARSE_INDEX_FILE = "sparse_index.npz"
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 ranking, stored as flat NumPy arrays (CSR layout):
+    the postings of term t are doc_ids[term_offsets[t]:term_offsets[t + 1]] (ascending) with
+    their precomputed BM25 contributions in impacts[...]. max_impacts[t] is the largest impact
+    of term t, the per-term upper bound used for MaxScore early termination.
+    """
+
+    def __init__(
+        self,
+        terms: np.ndarray,
+        term_offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        impacts: np.ndarray,
+        num_docs: int,
+        k1: float = 1.2,
+        b: float = 0.75,
+        tokenizer: Callable[[str], List[str]] = tokenize,
+    ):
+        """
+        :param terms: Vocabulary, term id -> term string.
+        :param term_offsets: (num_terms + 1,) offsets of each term's postings.
+        :param doc_ids: Document indices of all postings, ascending within each term.
+        :param impacts: BM25 score contribution of each posting.
+        :param num_docs: Number of indexed documents.
+        :param k1: BM25 term-frequency saturation used at build time.
+        :param b: BM25 length normalization used at build time.
+        :param tokenizer: Function turning text into tokens; must match the one used at build time.
+        """
+        self.terms = terms
+        self.term_offsets = term_offsets
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.num_docs = num_docs
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer
+        self.vocabulary = {term: term_id for term_id, term in enumerate(terms.tolist())}
+        # Every term has at least one posting, so each reduceat segment is non-empty
+        self.max_impacts = np.maximum.reduceat(impacts, term_offsets[:-1]) if len(terms) else np.empty(0, dtype=np.float32)
+
+    @classmethod
+    def build(cls, texts: List[str], k1: float = 1.2, b: float = 0.75, tokenizer: Callable[[str], List[str]] = tokenize) -> "BM25Index":
+        """
+        Build the index from one text per document; document i is texts[i].
+        :param texts: Indexed field of every document, in index order.
+        :param k1: BM25 term-frequency saturation.
+        :param b: BM25 length normalization.
+        :param tokenizer: Function turning text into tokens.
+        :return: BM25Index.
+        """
+        vocabulary = {}
+        posting_terms, posting_docs, posting_tfs = [], [], []
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+
+        for doc_id, text in enumerate(texts):
+            tokens = tokenizer(text or "")
+            doc_lengths[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                posting_terms.append(vocabulary.setdefault(term, len(vocabulary)))
+                posting_docs.append(doc_id)
+                posting_tfs.append(tf)
+
+        posting_terms = np.array(posting_terms, dtype=np.int64)
+        posting_docs = np.array(posting_docs, dtype=np.int32)
+        posting_tfs = np.array(posting_tfs, dtype=np.float32)
+
+        # Group postings by term; documents stay ascending within each term
+        order = np.argsort(posting_terms, kind="stable")
+        posting_terms, posting_docs, posting_tfs = posting_terms[order], posting_docs[order], posting_tfs[order]
+        doc_freqs = np.bincount(posting_terms, minlength=len(vocabulary))
+        term_offsets = np.concatenate([[0], np.cumsum(doc_freqs)]).astype(np.int64)
+
+        num_docs = len(texts)
+        avg_length = doc_lengths.mean() if num_docs and doc_lengths.mean() > 0 else 1.0
+        idf = np.log(1.0 + (num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        length_norm = k1 * (1.0 - b + b * doc_lengths[posting_docs] / avg_length)
+        impacts = (idf[posting_terms] * posting_tfs * (k1 + 1.0) / (posting_tfs + length_norm)).astype(np.float32)
+
+        terms = np.array(sorted(vocabulary, key=vocabulary.get), dtype=str)
+        return cls(terms, term_offsets, posting_docs, impacts, num_docs, k1=k1, b=b, tokenizer=tokenizer)
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return self.doc_ids[start:end], self.impacts[start:end]
+
+    def search(self, query: str, top_k: int = 1000, prune: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rank documents for a query by BM25.
+        With `prune`, terms are processed in decreasing order of their score upper bound (MaxScore):
+        once the current k-th best score exceeds what all remaining terms together could add,
+        no unseen document can enter the top-k, so the remaining terms only update existing candidates
+        that can still make it. Results are identical to the unpruned evaluation.
+        :param query: Query string.
+        :param top_k: Number of results to return.
+        :param prune: Enable MaxScore early termination.
+        :return: Tuple of (document indices, scores), best first, ties broken by descending index.
+        """
+        query_terms = Counter(self.vocabulary[t] for t in self.tokenizer(query) if t in self.vocabulary)
+        if not query_terms or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Highest upper bound first, so the bound on the remaining terms shrinks as fast as possible
+        term_ids = sorted(query_terms, key=lambda t: -self.max_impacts[t] * query_terms[t])
+        upper_bounds = [float(self.max_impacts[t]) * query_terms[t] for t in term_ids]
+        remaining_bound = sum(upper_bounds)
+
+        # Scores accumulate in float64 so pruned and unpruned evaluation add up identically
+        candidates = np.empty(0, dtype=np.int32)
+        scores = np.empty(0, dtype=np.float64)
+        for position, term_id in enumerate(term_ids):
+            docs, impacts = self._postings(term_id)
+            impacts = impacts * query_terms[term_id]
+            remaining_bound -= upper_bounds[position]
+
+            threshold = _kth_largest(scores, top_k)
+            if prune and threshold is not None and threshold > remaining_bound + upper_bounds[position]:
+                # Non-essential term: only score candidates that are still able to reach the top-k
+                alive = scores + remaining_bound + upper_bounds[position] >= threshold
+                candidates, scores = candidates[alive], scores[alive]
+                positions = np.searchsorted(docs, candidates)
+                positions[positions == len(docs)] = 0
+                matched = docs[positions] == candidates if len(docs) else np.zeros(len(candidates), dtype=bool)
+                scores[matched] += impacts[positions[matched]]
+            else:
+                candidates, scores = _merge_postings(candidates, scores, docs, impacts)
+
+        selected = top_k_indices(scores, top_k)
+        return candidates[selected].astype(np.int64), scores[selected].astype(np.float32)
+
+    def save(self, index_dir: str) -> str:
+        """
+        Save the index to `sparse_index.npz` in the index directory, replacing any previous one atomically.
+        :return: Path of the written file.
+        """
+        path = os.path.join(index_dir, SPARSE_INDEX_FILE)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            terms=self.terms,
+            term_offsets=self.term_offsets,
+            doc_ids=self.doc_ids,
+            impacts=self.impacts,
+            params=np.array([self.num_docs, self.k1, self.b], dtype=np.float64),
+        )
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, index_dir: str, tokenizer: Optional[Callable[[str], List[str]]] = None) -> "BM25Index":
+        """
+        Load an index saved with `save`.
+        :param index_dir: Index directory containing `sparse_index.npz`.
+        :param tokenizer: Tokenizer used at build time; defaults to `tokenize`.
+        """
+        with np.load(os.path.join(index_dir, SPARSE_INDEX_FILE)) as data:
+            num_docs, k1, b = data["params"]
+            return cls(
+                data["terms"], data["term_offsets"], data["doc_ids"], data["impacts"],
+                int(num_docs), k1=float(k1), b=float(b), tokenizer=tokenizer or tokenize,
+            )
+
+
+def _kth_largest(scores: np.ndarray, k: int) -> Optional[float]:
+    """
+    The k-th largest score, or None while there are fewer than k candidates.
+    """
+    if len(scores) < k:
+        return None
+    return float(np.partition(scores, len(scores) - k)[len(scores) - k])
+
+
+def _merge_postings(candidates: np.ndarray, scores: np.ndarray, docs: np.ndarray, impacts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Add a term's postings to the accumulated (ascending) candidates, keeping them ascending and unique.
+    """
+    if not len(candidates):
+        return docs.copy(), impacts.astype(np.float64)
+    merged, inverse = np.unique(np.concatenate([candidates, docs]), return_inverse=True)
+    return merged, np.bincount(inverse, weights=np.concatenate([scores, impacts]), minlength=len(merged))
@@ -0,0 +1,213 @@
+import os
+import numpy as np
+from typing import List, Tuple
+
+# Single pre-normalized matrix of all shards, written next to the embeddings_N.npy files.
+# Deliberately not prefixed with "embeddings_" so shard discovery ignores it.
+NORMALIZED_MATRIX_FILE = "normalized_embeddings.npy"
+
+
+def shard_number(file_name: str) -> int:
+    """
+    Extract N from an `embeddings_N.npy` / `metadata_N.json` file name, for numeric shard ordering.
+    """
+    return int(file_name.split("_")[1].split(".")[0])
+
+
+def list_index_files(index_dir: str) -> Tuple[List[str], List[str]]:
+    """
+    Collect the embedding and metadata shard files of an index, in shard number order
+    (the order IndexingService writes them), ensuring every embedding shard has matching metadata.
+    :param index_dir: Index directory.
+    :return: Tuple of (embedding paths, metadata paths).
+    """
+    embedding_files = sorted(
+        [f for f in os.listdir(index_dir) if f.startswith("embeddings_") and f.endswith(".npy")],
+        key=shard_number,
+    )
+    metadata_files = sorted(
+        [f for f in os.listdir(index_dir) if f.startswith("metadata_") and f.endswith(".json")],
+        key=shard_number,
+    )
+
+    # Ensure the number of files matches
+    if len(embedding_files) != len(metadata_files):
+        raise ValueError(f"Mismatch: {len(embedding_files)} embedding files and {len(metadata_files)} metadata files found.")
+
+    # Check matching numbers in filenames
+    for embedding_file, metadata_file in zip(embedding_files, metadata_files):
+        if shard_number(embedding_file) != shard_number(metadata_file):
+            raise ValueError(f"Mismatch in file numbering: {embedding_file} and {metadata_file}")
+
+    return (
+        [os.path.join(index_dir, f) for f in embedding_files],
+        [os.path.join(index_dir, f) for f in metadata_files],
+    )
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize every row of a 2D float32 array in place and return it.
+    Zero rows are left untouched so they score 0.0 against any query, matching cosine_similarity.
+    :param matrix: 2D float32 array, modified in place.
+    :return: The same array, with unit-length rows.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def _open_shards(embedding_paths: List[str]) -> List[np.ndarray]:
+    """
+    Memory-map embedding shards read-only; only the .npy headers are read here.
+    """
+    return [np.load(path, mmap_mode="r") for path in embedding_paths]
+
+
+def read_shard_sizes(embedding_paths: List[str]) -> List[int]:
+    """
+    Number of rows in each embedding shard, read from the .npy headers.
+    """
+    return [shard.shape[0] for shard in _open_shards(embedding_paths)]
+
+
+def _copy_normalized(shards: List[np.ndarray], out: np.ndarray) -> np.ndarray:
+    """
+    Copy shards back to back into `out`, normalizing one shard at a time.
+    """
+    offset = 0
+    for shard in shards:
+        rows = out[offset:offset + shard.shape[0]]
+        rows[:] = shard
+        normalize_rows(rows)
+        offset += shard.shape[0]
+    return out
+
+
+def load_embedding_matrix(embedding_paths: List[str]) -> Tuple[np.ndarray, List[int]]:
+    """
+    Load embedding shards into one contiguous, L2-normalized float32 matrix.
+    Shards are memory-mapped while copying, so peak memory stays at the size of the final matrix.
+    :param embedding_paths: Ordered list of `embeddings_N.npy` paths.
+    :return: Tuple of (matrix, list of per-shard row counts).
+    """
+    shards = _open_shards(embedding_paths)
+    shard_sizes = [shard.shape[0] for shard in shards]
+    dim = shards[0].shape[1] if shards else 0
+
+    matrix = np.empty((sum(shard_sizes), dim), dtype=np.float32)
+    return _copy_normalized(shards, matrix), shard_sizes
+
+
+def write_normalized_matrix(index_dir: str, embedding_paths: List[str]) -> str:
+    """
+    Write all shards as a single L2-normalized float32 .npy file that can be memory-mapped directly.
+    The file is streamed shard by shard and renamed into place once complete,
+    so readers never see a partially written matrix.
+    :param index_dir: Index directory to write into.
+    :param embedding_paths: Ordered list of `embeddings_N.npy` paths.
+    :return: Path of the written matrix file.
+    """
+    shards = _open_shards(embedding_paths)
+    dim = shards[0].shape[1] if shards else 0
+    shape = (sum(shard.shape[0] for shard in shards), dim)
+
+    matrix_path = os.path.join(index_dir, NORMALIZED_MATRIX_FILE)
+    tmp_path = matrix_path + ".tmp"
+    matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=shape)
+    _copy_normalized(shards, matrix)
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, matrix_path)
+    return matrix_path
+
+
+def open_embedding_matrix(index_dir: str, embedding_paths: List[str]) -> Tuple[np.ndarray, List[int]]:
+    """
+    Memory-map the pre-normalized matrix written by `write_normalized_matrix`.
+    Pages are shared through the OS page cache by every process mapping the file,
+    and opening costs one header read per shard regardless of corpus size.
+    :param index_dir: Index directory containing the matrix file.
+    :param embedding_paths: Ordered list of `embeddings_N.npy` paths, used for shard boundaries.
+    :return: Tuple of (read-only memory-mapped matrix, list of per-shard row counts).
+    """
+    matrix_path = os.path.join(index_dir, NORMALIZED_MATRIX_FILE)
+    if not os.path.exists(matrix_path):
+        raise FileNotFoundError(f"Normalized embedding matrix '{matrix_path}' not found.")
+
+    matrix = np.load(matrix_path, mmap_mode="r")
+    shard_sizes = read_shard_sizes(embedding_paths)
+
+    if matrix.shape[0] != sum(shard_sizes):
+        raise ValueError(
+            f"Stale normalized matrix: {matrix.shape[0]} rows in {matrix_path}, "
+            f"{sum(shard_sizes)} rows in embedding shards."
+        )
+    return matrix, shard_sizes
+
+
+def _sort_descending(indices: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """
+    Order candidates by descending score, breaking ties by descending index.
+    This is the order `np.argsort(scores, kind="stable")[::-1]` produces.
+    """
+    return indices[np.lexsort((indices, scores))[::-1]]
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores, best first, in O(n + k log k).
+    Rank-equivalent to `np.argsort(scores, kind="stable")[-top_k:][::-1]`, including ties.
+    :param scores: 1D array of similarity scores.
+    :param top_k: Number of indices to return.
+    :return: Array of at most top_k indices into `scores`.
+    """
+    n = scores.shape[0]
+    top_k = min(top_k, n)
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k == n:
+        return _sort_descending(np.arange(n), scores)
+
+    kth = n - top_k
+    candidates = np.argpartition(scores, kth)[kth:]
+    threshold = scores[candidates].min()
+
+    # argpartition keeps an arbitrary subset of the scores equal to the threshold;
+    # keep the highest-indexed ones instead, as a stable argsort would
+    above = candidates[scores[candidates] > threshold]
+    tied = np.flatnonzero(scores == threshold)
+    candidates = np.concatenate([above, tied[len(tied) - (top_k - len(above)):]])
+
+    return _sort_descending(candidates, scores[candidates])
+
+
+def merge_top_k(
+    shard_indices: List[np.ndarray], shard_scores: List[np.ndarray], top_k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge per-shard top-k lists into a global top-k list.
+    Each shard only needs to contribute its own top_k, so the merge costs O(shards * k log k).
+    :param shard_indices: Per-shard arrays of global document indices.
+    :param shard_scores: Per-shard arrays of the matching scores.
+    :param top_k: Number of results to keep.
+    :return: Tuple of (global indices, scores), best first.
+    """
+    if not shard_indices:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    indices = np.concatenate(shard_indices)
+    scores = np.concatenate(shard_scores)
+    order = np.lexsort((indices, scores))[::-1][:top_k]
+    return indices[order], scores[order]
+
+
+def split_shards(matrix: np.ndarray, shard_sizes: List[int]) -> List[np.ndarray]:
+    """
+    Split a matrix into per-shard row views without copying.
+    :param matrix: Matrix holding all shards back to back.
+    :param shard_sizes: Number of rows in each shard.
+    :return: List of views into `matrix`, one per shard.
+    """
+    boundaries = np.cumsum(shard_sizes)[:-1]
+    return np.split(matrix, boundaries) if shard_sizes else []
@@ -1,7 +1,21 @@
 from fastapi import APIRouter, Query, HTTPException
-from backend.app.services.query_service import QueryService
-import os
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import List, Optional
 import logging
+import json
+import threading
+import time
+from backend.app.config import load_config
+from backend.app.services.hybrid_search import HybridSearchService
+from backend.app.services.index_reloader import IndexReloader
+from backend.app.services.query_service import DEFAULT_MODEL, QueryService
+from backend.app.services.scatter_gather import ScatterGatherSearchService, ShardCluster
+from backend.app.services.shard_search import shard_authkey
+from backend.app.services.sparse_search import SparseSearchService
+from backend.app.utils.cache import EmbeddingCache, ResultCache, load_query_frequencies
+from backend.app.utils.executor import BoundedExecutor, MicroBatcher, Overloaded
+import os
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -9,57 +23,359 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Initialize QueryService
+config = load_config()
+retrieval_config = config.get("retrieval", {})
+
+# Initialize the retrievers selected by retrieval.mode: dense, sparse or hybrid
 index_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../index"))
 
-if not os.path.exists(index_dir):
-    raise HTTPException(status_code=500, detail=f"Index directory '{index_dir}' not found.")
-query_service = QueryService(model_name="distiluse-base-multilingual-cased-v1", index_dir=index_dir)
+retrieval_mode = retrieval_config.get("mode", "dense")
+if retrieval_mode not in ("dense", "sparse", "hybrid"):
+    raise ValueError(f"Unsupported retrieval mode: {retrieval_mode}. Options: dense, sparse, hybrid")
 
-from fastapi import APIRouter, Query, HTTPException
-import logging
-import json
-from backend.app.services.query_service import QueryService
-import os
+# Ranked results of repeated queries, keyed on the index version so a rebuilt index never serves stale results
+result_cache = None
+if retrieval_config.get("result_cache_mb", 0) > 0:
+    result_cache = ResultCache(
+        max_bytes=int(retrieval_config["result_cache_mb"] * 1024 * 1024),
+        depth=retrieval_config.get("result_cache_depth", 1000),
+    )
 
-router = APIRouter()
-logger = logging.getLogger(__name__)
+embedding_cache = None
+if retrieval_mode in ("dense", "hybrid") and retrieval_config.get("embedding_cache_size", 0) > 0:
+    embedding_cache = EmbeddingCache(
+        max_size=retrieval_config["embedding_cache_size"],
+        ttl=retrieval_config.get("embedding_cache_ttl"),
+    )
 
-# Initialize QueryService
-index_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../index"))
-query_service = QueryService(model_name="distiluse-base-multilingual-cased-v1", index_dir=index_dir)
+# Load the model and index in the background once the server is up (start_loading, called by the app's
+# lifespan hook) instead of while importing this module; /ready answers 503 until they are loaded
+lazy_load = retrieval_config.get("lazy_load", False)
 
-@router.get("/search")
-def search(query: str = Query(..., description="Search query parameter"), top_k: int = 20):
+# Set by load_index: the shard connections, if any, and the reloader serving the loaded index
+shard_cluster = None
+reloader = None
+load_error = None
+load_seconds = None
+_loader = None
+
+
+def load_search_service(index_path: str, version: str, previous: Optional[HybridSearchService] = None) -> HybridSearchService:
     """
-    Search endpoint that processes keyword queries and returns relevant results.
+    Build the retrievers selected by retrieval.mode over one index version.
+    On a reload, the model of the previous service is reused, as are the caches, which stay valid across
+    index versions (query embeddings do not depend on the index, cached results are keyed on its version).
+    """
+    query_service = None
+    if shard_cluster is not None:
+        shard_version = shard_cluster.refresh()
+        if shard_version != version:
+            logger.warning(f"Shard nodes serve index version {shard_version}, {index_path} holds {version}.")
+        query_service = ScatterGatherSearchService(
+            model_name=retrieval_config.get("model", DEFAULT_MODEL),
+            cluster=shard_cluster,
+            embedding_cache=embedding_cache,
+            model=previous.dense_service.model if previous is not None else None,
+        )
+    elif retrieval_mode in ("dense", "hybrid"):
+        query_service = QueryService(
+            model_name=retrieval_config.get("model", DEFAULT_MODEL),
+            index_dir=index_path,
+            mmap=retrieval_config.get("mmap", False),
+            ann=retrieval_config.get("ann", False),
+            nprobe=retrieval_config.get("nprobe", 8),
+            embedding_cache=embedding_cache,
+            quantization=retrieval_config.get("quantization"),
+            rerank_depth=retrieval_config.get("rerank_depth", 200),
+            dedup=retrieval_config.get("dedup", False),
+            collapse_duplicates=retrieval_config.get("collapse_duplicates", False),
+            model=previous.dense_service.model if previous is not None else None,
+        )
+
+    # Pre-warm the cache with the most frequent logged queries
+    if query_service is not None:
+        prewarm_csv = retrieval_config.get("embedding_cache_prewarm_csv")
+        if embedding_cache is not None and prewarm_csv and previous is None:
+            prewarm_csv = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../", prewarm_csv))
+            if os.path.exists(prewarm_csv):
+                prewarm_top = retrieval_config.get("embedding_cache_prewarm_top", 1000)
+                query_service.prewarm_cache(load_query_frequencies(prewarm_csv)[:prewarm_top])
+            else:
+                logger.warning(f"Query log '{prewarm_csv}' not found, embedding cache starts cold.")
+
+    sparse_service = None
+    if retrieval_mode in ("sparse", "hybrid"):
+        # Share the metadata already loaded by a local dense retriever
+        sparse_service = SparseSearchService(index_dir=index_path, metadata=getattr(query_service, "metadata", None))
+
+    return HybridSearchService(
+        dense_service=query_service,
+        sparse_service=sparse_service,
+        fusion=retrieval_config.get("fusion", "rrf"),
+        rrf_k=retrieval_config.get("rrf_k", 60),
+        dense_weight=retrieval_config.get("dense_weight", 0.5),
+        fusion_depth=retrieval_config.get("fusion_depth", 100),
+        parallel=retrieval_config.get("parallel", True),
+        result_cache=result_cache,
+        index_version=version,
+    )
+
+
+def load_index():
+    """
+    Connect to the shard nodes, if any, and load the encoder and the current index version.
     """
+    global shard_cluster, reloader, load_error, load_seconds
+    start_time = time.perf_counter()
     try:
-        logger.info(f"Received search query: {query} with top_k: {top_k}")
+        if not os.path.exists(index_dir):
+            raise FileNotFoundError(f"Index directory '{index_dir}' not found.")
+
+        # Dense retrieval on shard nodes (retrieval.shards: one list of "host:port" replicas per shard group)
+        # instead of the local embeddings; the connections are kept across index reloads
+        if retrieval_mode in ("dense", "hybrid") and retrieval_config.get("shards"):
+            shard_hedge_delay_ms = retrieval_config.get("shard_hedge_delay_ms")
+            shard_cluster = ShardCluster(
+                retrieval_config["shards"],
+                shard_authkey(),
+                timeout=retrieval_config.get("shard_timeout", 2.0),
+                hedge_delay=shard_hedge_delay_ms / 1000 if shard_hedge_delay_ms is not None else None,
+                allow_partial=retrieval_config.get("shard_allow_partial", False),
+            )
+
+        # Serves one index version at a time; a new version published to index_dir is loaded in the background
+        # (POST /admin/reload, or every reload_poll_seconds) and swapped in without dropping requests
+        reloader = IndexReloader(
+            load_search_service,
+            index_dir,
+            poll_interval=retrieval_config.get("reload_poll_seconds"),
+            drain_timeout=retrieval_config.get("reload_drain_timeout", 30.0),
+        )
+    except Exception as e:
+        load_error = f"{type(e).__name__}: {e}"
+        raise
+    load_seconds = time.perf_counter() - start_time
+    logger.info(f"Loaded index version {reloader.service.index_version} in {load_seconds:.2f} seconds.")
+
+
+def _load_logged():
+    try:
+        load_index()
+    except Exception as e:
+        logger.error(f"Loading the index from {index_dir} failed: {e}")
+
+
+def start_loading() -> bool:
+    """
+    With retrieval.lazy_load, start loading the index in a background thread, so the server answers
+    health checks while the model and index load. Without it the index was loaded on import.
+    :return: Whether loading was started.
+    """
+    global _loader
+    if not lazy_load or reloader is not None or (_loader is not None and _loader.is_alive()):
+        return False
+    _loader = threading.Thread(target=_load_logged, name="index-loader", daemon=True)
+    _loader.start()
+    return True
+
+
+if not lazy_load:
+    load_index()
+
+# Encoding and scoring run on a fixed number of threads; requests beyond the admission queue get a 503
+search_executor = BoundedExecutor(
+    max_workers=retrieval_config.get("search_workers", 4),
+    max_queue=retrieval_config.get("search_queue", 64),
+    queue_timeout=retrieval_config.get("search_queue_timeout"),
+)
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 20
+
+
+# Metadata fields read for each returned hit; the rest of the record is never loaded
+RESPONSE_FIELDS = ["title", "metadata.requirements", "metadata.resposibilities"]
+
+
+def format_result(result: dict) -> dict:
+    """
+    Convert a search result into the response shape shared by the search endpoints.
+    """
+    return {
+        "title": result["metadata"].get("title", "No Title"),
+        "requirements": result["metadata"].get("metadata", {}).get("requirements", ""),
+        "description": result["metadata"].get("metadata", {}).get("resposibilities", ""),
+        "score": float(result["score"]),  # Convert numpy.float32 to float
+    }
 
-        # Perform the search
-        results = query_service.search(query=query, top_k=top_k)
-        logger.info(f"Search completed. Number of results: {len(results)}")
+def run_search(query: str, top_k: int) -> dict:
+    """
+    Encode, score and format one query; runs on a search_executor worker.
+    """
+    # Perform the search on one index version, even if a reload swaps it meanwhile
+    with reloader.acquire() as search_service:
+        results, timings = search_service.search(query=query, top_k=top_k, fields=RESPONSE_FIELDS)
+        logger.info(f"Search completed. Number of results: {len(results)}, timings: {timings}")
 
         # Build the response
         response = {
             "query": query,
-            "results": [
-                {
-                    "title": result["metadata"].get("title", "No Title"),
-                    "requirements": result["metadata"]["metadata"].get("requirements", ""),
-                    "description": result["metadata"]["metadata"].get("resposibilities", ""),
-                    "score": float(result["score"]),  # Convert numpy.float32 to float
-                }
-                for result in results
-            ],
+            "mode": search_service.mode,
+            "results": [format_result(result) for result in results],
+            "timings": timings,
         }
 
-        # Debugging the response
-        logger.debug("Generated Response: %s", json.dumps(response, indent=2))  # Logs the response as formatted JSON
+    # Debugging the response
+    logger.debug("Generated Response: %s", json.dumps(response, indent=2))  # Logs the response as formatted JSON
+
+    return response
+
+
+def run_search_batch(queries: List[str], top_k: int) -> dict:
+    with reloader.acquire() as search_service:
+        batch_results = search_service.search_batch(queries=queries, top_k=top_k, fields=RESPONSE_FIELDS)
+
+    return {
+        "results": [
+            {"query": query, "results": [format_result(result) for result in results]}
+            for query, results in zip(queries, batch_results)
+        ],
+    }
+
+
+def run_search_coalesced(queries: List[str], top_k: int) -> List[dict]:
+    """
+    Search a batch of concurrent /search requests with one model call; runs on a search_batcher worker.
+    :return: One /search response per query.
+    """
+    with reloader.acquire() as search_service:
+        batch_results, timings = search_service.search_batch_timed(queries=queries, top_k=top_k, fields=RESPONSE_FIELDS)
+        mode = search_service.mode
+    timings = {"batch_size": len(queries), **timings}
+    logger.info(f"Searched a batch of {len(queries)} requests, timings: {timings}")
+
+    return [
+        {"query": query, "mode": mode, "results": [format_result(result) for result in results], "timings": timings}
+        for query, results in zip(queries, batch_results)
+    ]
+
+
+# Single /search requests arriving within search_batch_max_wait_ms are searched together, up to
+# search_batch_max_size at a time, as one task on search_executor; a max size of 1 searches every request on its own
+search_batcher = None
+if retrieval_config.get("search_batch_max_size", 1) > 1:
+    search_batcher = MicroBatcher(
+        run_search_coalesced,
+        search_executor,
+        max_batch_size=retrieval_config["search_batch_max_size"],
+        max_wait=retrieval_config.get("search_batch_max_wait_ms", 2) / 1000,
+        max_queue=retrieval_config.get("search_queue", 64),
+        queue_timeout=retrieval_config.get("search_queue_timeout"),
+    )
 
-        return response
 
+def overloaded(e: Overloaded) -> HTTPException:
+    logger.warning(f"Rejecting request: {e}")
+    return HTTPException(status_code=503, detail=f"Search is overloaded, retry later: {e}", headers={"Retry-After": "1"})
+
+def require_ready():
+    """
+    Answer 503 while the index is still loading (retrieval.lazy_load) or failed to load.
+    """
+    if reloader is None:
+        detail = f"Loading the index failed: {load_error}" if load_error else "The index is still loading, retry later."
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
+
+@router.get("/ready")
+def ready():
+    """
+    Readiness probe: 200 once the model and index are loaded and searches can be served, 503 before.
+    """
+    if reloader is None:
+        status = "failed" if load_error else "loading"
+        return JSONResponse(status_code=503, content={"status": status, "error": load_error})
+    return {"status": "ready", "index_version": reloader.service.index_version, "load_s": load_seconds}
+
+@router.get("/search")
+async def search(query: str = Query(..., description="Search query parameter"), top_k: int = 20):
+    """
+    Search endpoint that processes keyword queries and returns relevant results.
+    Encoding and scoring run on the bounded search executor, or with search batching on the batcher,
+    which searches concurrent requests together; the event loop only awaits them, and requests beyond
+    the admission queue are answered with 503 right away.
+    """
+    require_ready()
+    try:
+        logger.info(f"Received search query: {query} with top_k: {top_k}")
+        if search_batcher is not None:
+            return await search_batcher.run(query, key=top_k)
+        return await search_executor.run(run_search, query, top_k)
+
+    except Overloaded as e:
+        raise overloaded(e)
     except Exception as e:
         logger.error(f"Error processing query '{query}': {e}")
         raise HTTPException(status_code=500, detail=f"Error processing query: {e}")
+
+@router.post("/search/batch")
+async def search_batch(request: BatchSearchRequest):
+    """
+    Batch search endpoint: encodes all queries in one model call and scores them together.
+    Intended for offline workloads such as replaying the query-frequency log.
+    """
+    require_ready()
+    max_queries = retrieval_config.get("search_batch_max_queries", 1000)
+    if len(request.queries) > max_queries:
+        raise HTTPException(status_code=413, detail=f"Batch of {len(request.queries)} queries exceeds the limit of {max_queries}.")
+    try:
+        logger.info(f"Received batch of {len(request.queries)} queries with top_k: {request.top_k}")
+        return await search_executor.run(run_search_batch, request.queries, request.top_k)
+
+    except Overloaded as e:
+        raise overloaded(e)
+    except Exception as e:
+        logger.error(f"Error processing batch of {len(request.queries)} queries: {e}")
+        raise HTTPException(status_code=500, detail=f"Error processing batch: {e}")
+
+@router.get("/search/cache")
+def cache_stats():
+    """
+    Size and hit/miss counters of the query-embedding and result caches, and the load of the search workers.
+    """
+    return {
+        "index_version": reloader.service.index_version if reloader is not None else None,
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "executor": search_executor.stats(),
+        "batcher": search_batcher.stats() if search_batcher is not None else None,
+        "shards": shard_cluster.stats() if shard_cluster is not None else None,
+    }
+
+@router.post("/admin/reload", status_code=202)
+def reload_index(wait: bool = False):
+    """
+    Load the index version currently in the index directory in the background and swap it in once loaded;
+    requests keep being served by the current version meanwhile. With wait=true, respond when done.
+    """
+    require_ready()
+    if wait:
+        try:
+            return reloader.reload()
+        except Exception as e:
+            logger.error(f"Error reloading the index: {e}")
+            raise HTTPException(status_code=500, detail=f"Error reloading the index: {e}")
+    started = reloader.reload_in_background()
+    return {"status": "started" if started else "already_running", "index_version": reloader.service.index_version}
+
+@router.get("/admin/reload")
+def reload_status():
+    """
+    Served index version, whether a reload is running, and the outcome of the last one.
+    """
+    require_ready()
+    return {
+        "index_version": reloader.service.index_version,
+        "reloading": reloader.reloading,
+        "last_reload": reloader.last_reload,
+    }
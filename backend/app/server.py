@@ -0,0 +1,166 @@
+"""
+Pre-forking API server for multi-core boxes. The encoder is loaded once, then the workers are forked from
+this process and share its memory pages; with retrieval.mmap they also share the page cache of the index
+files, so adding a worker costs little more than its Python heap. All workers accept on one listening socket.
+
+    python -m backend.app.server --workers 8 --port 8000
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.config import load_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# A worker exiting sooner than this after it was started failed to start; it is not restarted
+MIN_WORKER_UPTIME = 10.0
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload(config: dict):
+    """
+    Load what the workers can share before they are forked: the encoder of the dense retriever.
+    """
+    retrieval_config = config.get("retrieval", {})
+    if not retrieval_config.get("mmap", False):
+        logger.warning("retrieval.mmap is off: every worker loads a private copy of the embedding matrix.")
+    if retrieval_config.get("mode", "dense") in ("dense", "hybrid"):
+        from backend.app.services.query_service import DEFAULT_MODEL, preload_encoder
+
+        start_time = time.perf_counter()
+        model_name = retrieval_config.get("model", DEFAULT_MODEL)
+        preload_encoder(model_name)
+        logger.info(f"Preloaded encoder {model_name} in {time.perf_counter() - start_time:.2f} seconds.")
+
+
+def run_worker(sock: socket.socket, num_threads: int, log_level: str):
+    """
+    Body of a forked worker: load the API, which opens the index, and serve on the shared socket.
+    Never returns.
+    """
+    for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+        signal.signal(sig, signal.SIG_DFL)
+    try:
+        import torch
+
+        # One share of the cores per worker instead of every worker using them all
+        torch.set_num_threads(num_threads)
+
+        from backend.app.main import app
+        from backend.app.routes import search
+
+        # Forwarded by the parent on SIGHUP, so one signal reloads the index in every worker
+        signal.signal(signal.SIGHUP, lambda signum, frame: search.reloader and search.reloader.reload_in_background())
+        uvicorn.Server(uvicorn.Config(app, log_level=log_level)).run(sockets=[sock])
+    except BaseException as e:
+        logger.error(f"Worker {os.getpid()} failed: {e}")
+        os._exit(1)
+    os._exit(0)
+
+
+class PreforkServer:
+    """
+    Forks and supervises the workers: a worker that dies is replaced, SIGTERM or SIGINT stops them all,
+    and SIGHUP is forwarded to every worker to reload the index.
+    """
+    def __init__(self, sock: socket.socket, num_workers: int, log_level: str = "info"):
+        """
+        :param sock: Bound, listening socket shared by the workers.
+        :param num_workers: Worker processes.
+        :param log_level: uvicorn log level of the workers.
+        """
+        self.sock = sock
+        self.num_workers = num_workers
+        self.num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+        self.log_level = log_level
+        self.workers = {}  # pid -> start time
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.sock, self.num_threads, self.log_level)
+        self.workers[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}.")
+
+    def signal_workers(self, sig: int):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        self.signal_workers(signal.SIGTERM)
+
+    def run(self):
+        """
+        Fork the workers and supervise them until all have exited.
+        """
+        handlers = {
+            signal.SIGTERM: self.stop,
+            signal.SIGINT: self.stop,
+            signal.SIGHUP: lambda signum, frame: self.signal_workers(signal.SIGHUP),
+        }
+        original_handlers = {sig: signal.signal(sig, handler) for sig, handler in handlers.items()}
+        try:
+            for _ in range(self.num_workers):
+                self.spawn()
+
+            while self.workers:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+                started = self.workers.pop(pid, None)
+                if started is None or self.stopping:
+                    continue
+                uptime = time.monotonic() - started
+                logger.warning(f"Worker {pid} exited with status {status} after {uptime:.1f} seconds.")
+                if uptime < MIN_WORKER_UPTIME:
+                    logger.error("Worker failed during startup, stopping the server.")
+                    self.stop()
+                else:
+                    self.spawn()
+        finally:
+            for sig, handler in original_handlers.items():
+                signal.signal(sig, handler)
+            self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    preload(load_config())
+    sock = bind_socket(args.host, args.port)
+    logger.info(f"Serving on {args.host}:{args.port} with {args.workers} workers.")
+    PreforkServer(sock, args.workers, args.log_level).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,22 @@
 import os
+import io
+import sys
 import json
 import csv
-from typing import List, Dict
+import functools
+import itertools
+import operator
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
 import zipfile
-import shutil
 import logging
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+SUPPORTED_FORMATS = (".csv", ".json", ".jsonl")
+# Slotted documents intern field values up to this many characters
+INTERN_MAX_LENGTH = 64
+
 
 class Document:
     def __init__(self, **kwargs):
@@ -18,6 +26,73 @@ class Document:
         for key, value in kwargs.items():
             setattr(self, key, value)
 
+    def items(self):
+        return vars(self).items()
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class SlottedDocument:
+    """
+    Base of the compact document types built by `document_type`: one slot per metadata field
+    and no per-instance __dict__, so a document costs its object header plus one pointer per field.
+    Reads like Document (`doc.title`); fields missing from the source are None.
+    """
+    __slots__ = ()
+    _fields = ()  # Field names, in slot order; differ from the slot names where a field was renamed
+
+    def __init__(self, **kwargs):
+        for name, slot in zip(self._fields, self.__slots__):
+            setattr(self, slot, kwargs.get(name))
+
+    @classmethod
+    def from_values(cls, values: Sequence):
+        """
+        Build a document from field values in schema order; missing trailing values are None.
+        """
+        document = cls.__new__(cls)
+        for name, value in itertools.zip_longest(cls.__slots__, values[:len(cls.__slots__)]):
+            setattr(document, name, value)
+        return document
+
+    def items(self):
+        return zip(self._fields, self._values(self))
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"Document({self.to_dict()!r})"
+
+
+@functools.lru_cache(maxsize=None)
+def document_type(fields: Tuple[str, ...]) -> type:
+    """
+    Compact document class for a metadata schema, with one slot per field.
+    A field named like a document attribute (`items`, `to_dict`, `_values`, ...) would shadow it, so it is
+    stored in a slot renamed `_<position>`, as `namedtuple(rename=True)` does; `items()` and `to_dict()`
+    still report it under its own name.
+    :param fields: Field names, as read from metadata.csv; must be valid Python identifiers.
+    """
+    invalid = [field for field in fields if not field.isidentifier()]
+    if invalid:
+        raise ValueError(f"Metadata fields are not valid attribute names: {invalid}")
+    reserved = set(dir(SlottedDocument)) | {"_values"}
+    slots = []
+    for position, field in enumerate(fields):
+        slot = field
+        if slot in reserved:
+            slot = f"_{position}"
+            while slot in reserved or slot in fields or slot in slots:
+                slot += "_"
+            logger.warning(f"Metadata field '{field}' shadows a document attribute; stored as '{slot}'.")
+        slots.append(slot)
+    slots = tuple(slots)
+    getter = operator.attrgetter(*slots) if len(slots) > 1 else (lambda doc: (getattr(doc, slots[0]),) if slots else ())
+    return type("Document", (SlottedDocument,), {"__slots__": slots, "_fields": fields, "_values": staticmethod(getter)})
+
+
 def extract_zip(file_path: str, extract_to: str) -> List[str]:
     """
     Extracts a ZIP file to the specified directory and returns a list of file paths.
@@ -51,89 +126,188 @@ def load_metadata_fields(metadata_file: str) -> List[str]:
         raise ValueError(f"Error reading metadata file '{metadata_file}': {e}")
 
 
+def _document_factory(metadata_fields: List[str], slots: bool) -> Callable[[Sequence], Document]:
+    """
+    Function building one document from field values in schema order.
+    Uses the compact slotted type unless disabled or the field names are not identifiers.
+    """
+    if slots:
+        if all(field.isidentifier() for field in metadata_fields):
+            from_values = document_type(tuple(metadata_fields)).from_values
+            # Short values (company, location, category, date, ...) repeat across postings: share one copy
+            return lambda values: from_values([
+                sys.intern(value) if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH else value
+                for value in values
+            ])
+        logger.warning(f"Metadata fields {metadata_fields} are not all identifiers; using dict-backed documents.")
+    # Map metadata fields to row values
+    return lambda values: Document(**{field: values[i] if i < len(values) else None for i, field in enumerate(metadata_fields)})
+
+
+def iter_csv_documents(stream: TextIO, metadata_fields: List[str], source: str = "", slots: bool = True) -> Iterator[Document]:
+    """
+    Lazily read documents from an open CSV text stream, mapping the columns using metadata fields.
+    :param stream: Text stream positioned at the first data row.
+    :param metadata_fields: Field names in column order.
+    :param source: Name of the stream for log messages.
+    :param slots: Build compact slotted documents (see `document_type`) instead of Document.
+    """
+    make_document = _document_factory(metadata_fields, slots)
+    row_num = 0
+    for row_num, row in enumerate(csv.reader(stream), start=1):
+        yield make_document(row)
+        if row_num % 1000 == 0:  # Log progress every 1000 rows
+            logger.debug(f"{row_num} rows processed from {source}")
+    logger.info(f"Total documents read from {source}: {row_num}")
+
+
+def iter_json_documents(
+    stream: TextIO, metadata_fields: List[str], source: str = "", read_size: int = 1 << 16, slots: bool = True
+) -> Iterator[Document]:
+    """
+    Lazily read documents from an open JSON text stream holding either an array of objects or one
+    object per line (JSON Lines). Objects are decoded one at a time from a small rolling buffer,
+    so the stream is never parsed as a whole.
+    :param stream: Text stream.
+    :param metadata_fields: Field names to keep from each object.
+    :param source: Name of the stream for log messages.
+    :param read_size: Characters read from the stream at a time.
+    :param slots: Build compact slotted documents (see `document_type`) instead of Document.
+    """
+    make_document = _document_factory(metadata_fields, slots)
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+    row_num = 0
+    while True:
+        # Skip the array brackets and separators between objects
+        while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+            position += 1
+        if position == len(buffer):
+            if eof:
+                break
+            buffer, position = stream.read(read_size), 0
+            eof = not buffer
+            continue
+        try:
+            obj, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Object continues past the buffer: keep the unparsed tail and read more
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        position = end
+        row_num += 1
+        yield make_document([obj.get(field) for field in metadata_fields])
+        if row_num % 1000 == 0:
+            logger.debug(f"{row_num} objects processed from {source}")
+    logger.info(f"Total documents read from {source}: {row_num}")
+
+
+def _iter_stream_documents(stream: TextIO, name: str, metadata_fields: List[str], slots: bool) -> Iterator[Document]:
+    if name.endswith(".csv"):
+        logger.debug(f"Loading documents from CSV file: {name}")
+        return iter_csv_documents(stream, metadata_fields, source=name, slots=slots)
+    logger.debug(f"Loading documents from JSON file: {name}")
+    return iter_json_documents(stream, metadata_fields, source=name, slots=slots)
+
+
+def iter_documents(file_path: str, metadata_file: str, slots: bool = True) -> Iterator[Document]:
+    """
+    Stream documents from a CSV, JSON or JSON Lines file, or from every such member of a ZIP archive.
+    ZIP members are decompressed on the fly while reading; nothing is extracted to disk and at most
+    one document is materialized at a time.
+    :param file_path: Path of the data file (.csv, .json, .jsonl or .zip).
+    :param metadata_file: CSV whose first row holds the field names.
+    :param slots: Build compact slotted documents (see `document_type`) instead of Document.
+    """
+    # Load metadata field names
+    logger.debug(f"Loading metadata from file: {metadata_file}")
+    metadata_fields = load_metadata_fields(metadata_file)
+
+    if file_path.endswith(".zip"):
+        if not zipfile.is_zipfile(file_path):
+            raise ValueError(f"{file_path} is not a valid ZIP file")
+        logger.debug(f"Processing ZIP file: {file_path}")
+        with zipfile.ZipFile(file_path, "r") as zip_ref:
+            for member in zip_ref.infolist():
+                if member.is_dir():
+                    continue
+                if not member.filename.endswith(SUPPORTED_FORMATS):
+                    logger.warning(f"Unsupported file format skipped: {member.filename}")
+                    continue
+                with zip_ref.open(member) as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as stream:
+                    yield from _iter_stream_documents(stream, member.filename, metadata_fields, slots)
+    elif file_path.endswith(SUPPORTED_FORMATS):
+        with open(file_path, "r", encoding="utf-8", newline="") as stream:
+            yield from _iter_stream_documents(stream, file_path, metadata_fields, slots)
+    else:
+        raise ValueError(f"Unsupported file format: {file_path}")
+
+
+def chunked(items: Iterable, chunk_size: int) -> Iterator[list]:
+    """
+    Group an iterable into lists of chunk_size items; the last list may be shorter.
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}.")
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_document_chunks(file_path: str, metadata_file: str, chunk_size: int = 25000) -> Iterator[List[Document]]:
+    """
+    Stream documents as lists of at most chunk_size, so memory is bounded by the chunk size
+    rather than the corpus size.
+    :param file_path: Path of the data file (.csv, .json, .jsonl or .zip).
+    :param metadata_file: CSV whose first row holds the field names.
+    :param chunk_size: Number of documents per chunk.
+    """
+    return chunked(iter_documents(file_path, metadata_file), chunk_size)
+
+
 def load_documents_from_csv(data_file: str, metadata_fields: List[str]) -> List[Document]:
     """
     Loads documents from a CSV data file, mapping the columns using metadata fields.
     """
-    documents = []
     try:
-        with open(data_file, "r") as f:
-            reader = csv.reader(f)
-            for row_num, row in enumerate(reader, start=1):
-                # Map metadata fields to row values
-                document_data = {metadata_fields[i]: row[i] if i < len(row) else None for i in range(len(metadata_fields))}
-                documents.append(Document(**document_data))
-                if row_num % 1000 == 0:  # Log progress every 1000 rows
-                    logger.debug(f"{row_num} rows processed from {data_file}")
-        logger.info(f"Total documents loaded from {data_file}: {len(documents)}")
-        return documents
+        with open(data_file, "r", encoding="utf-8", newline="") as f:
+            return list(iter_csv_documents(f, metadata_fields, source=data_file))
     except Exception as e:
         logger.error(f"Error loading documents from CSV file '{data_file}': {e}")
         raise ValueError(f"Error loading documents from CSV file '{data_file}': {e}")
 
-def load_metadata_fields(metadata_file: str) -> List[str]:
+
+def load_documents_from_json(data_file: str, metadata_fields: List[str]) -> List[Document]:
     """
-    Loads metadata field mappings from a CSV file.
-    Returns a list of field names in the same order as in the metadata file.
+    Loads documents from a JSON array or JSON Lines data file, keeping the metadata fields.
     """
     try:
-        with open(metadata_file, "r") as f:
-            reader = csv.reader(f)
-            fields = next(reader)  # Extract the first row as field names
-        logger.debug(f"Metadata fields loaded: {fields}")
-        return fields
+        with open(data_file, "r", encoding="utf-8") as f:
+            return list(iter_json_documents(f, metadata_fields, source=data_file))
     except Exception as e:
-        logger.error(f"Error reading metadata file '{metadata_file}': {e}")
-        raise ValueError(f"Error reading metadata file '{metadata_file}': {e}")
+        logger.error(f"Error loading documents from JSON file '{data_file}': {e}")
+        raise ValueError(f"Error loading documents from JSON file '{data_file}': {e}")
 
 
-def load_documents(file_path: str, metadata_file: str, temp_dir: str = "./temp") -> List[Document]:
+def load_documents(file_path: str, metadata_file: str, temp_dir: Optional[str] = None) -> List[Document]:
     """
     Handles loading documents from a CSV data file using metadata for field mapping.
-    Supports direct file processing or ZIP extraction.
+    Supports direct file processing or ZIP archives. Materializes the whole corpus;
+    prefer `iter_documents` / `iter_document_chunks` for large inputs.
+    :param temp_dir: Unused; ZIP members are read in place. Kept for existing callers.
     """
-    # Load metadata field names
-    logger.debug(f"Loading metadata from file: {metadata_file}")
-    metadata_fields = load_metadata_fields(metadata_file)
-
-    documents = []
-
     try:
-        # Handle ZIP files
-        if file_path.endswith(".zip"):
-            logger.debug(f"Processing ZIP file: {file_path}")
-            extracted_files = extract_zip(file_path, temp_dir)
-            for extracted_file in extracted_files:
-                if extracted_file.endswith(".json"):
-                    logger.debug(f"Loading documents from JSON file: {extracted_file}")
-                    documents.extend(load_documents_from_json(extracted_file, metadata_fields))
-                elif extracted_file.endswith(".csv"):
-                    logger.debug(f"Loading documents from CSV file: {extracted_file}")
-                    documents.extend(load_documents_from_csv(extracted_file, metadata_fields))
-                else:
-                    logger.warning(f"Unsupported file format skipped: {extracted_file}")
-        # Handle JSON files
-        elif file_path.endswith(".json"):
-            logger.debug(f"Loading documents from JSON file: {file_path}")
-            documents = load_documents_from_json(file_path, metadata_fields)
-        # Handle CSV files
-        elif file_path.endswith(".csv"):
-            logger.debug(f"Loading documents from CSV file: {file_path}")
-            documents = load_documents_from_csv(file_path, metadata_fields)
-        else:
-            raise ValueError(f"Unsupported file format: {file_path}")
-
+        documents = list(iter_documents(file_path, metadata_file))
     except Exception as e:
         logger.error(f"Error processing file '{file_path}': {e}")
         raise
 
-    # Cleanup temporary directory
-    if os.path.exists(temp_dir):
-        try:
-            shutil.rmtree(temp_dir)
-            logger.debug(f"Temporary directory '{temp_dir}' cleaned up.")
-        except Exception as e:
-            logger.warning(f"Unable to delete temporary directory '{temp_dir}': {e}")
-
     logger.info(f"Total documents loaded: {len(documents)}")
-    return documents
\ No newline at end of file
+    return documents
@@ -0,0 +1,301 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FUSION_METHODS = ("rrf", "weighted")
+
+
+def reciprocal_rank_fusion(result_lists: List[List[dict]], k: int = 60) -> List[dict]:
+    """
+    Fuse ranked result lists by Reciprocal Rank Fusion: score(d) = sum over lists of 1 / (k + rank(d)).
+    Only ranks are used, so dense cosine scores and BM25 scores need no calibration.
+    :param result_lists: Ranked result lists of {"score", "index"} hits; documents are matched on "index".
+    :param k: RRF constant; larger values flatten the contribution of top ranks.
+    :return: Fused {"score", "index"} hits, best first, with the fused value in "score".
+    """
+    fused = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            entry = fused.setdefault(result["index"], {"score": 0.0, "index": result["index"]})
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda entry: -entry["score"])
+
+
+def weighted_score_fusion(result_lists: List[List[dict]], weights: List[float]) -> List[dict]:
+    """
+    Fuse ranked result lists by a weighted sum of min-max normalized scores; a document missing
+    from a list contributes 0 for it.
+    :param result_lists: Ranked result lists of {"score", "index"} hits; documents are matched on "index".
+    :param weights: One weight per list.
+    :return: Fused {"score", "index"} hits, best first, with the fused value in "score".
+    """
+    fused = {}
+    for results, weight in zip(result_lists, weights):
+        if not results:
+            continue
+        scores = [float(result["score"]) for result in results]
+        low, high = min(scores), max(scores)
+        span = high - low
+        for result, score in zip(results, scores):
+            entry = fused.setdefault(result["index"], {"score": 0.0, "index": result["index"]})
+            entry["score"] += weight * ((score - low) / span if span > 0 else 1.0)
+    return sorted(fused.values(), key=lambda entry: -entry["score"])
+
+
+class HybridSearchService:
+    """
+    Runs the dense (QueryService) and lexical (SparseSearchService) retrievers and fuses their rankings.
+    Either retriever may be None, which gives a dense-only or sparse-only deployment behind the same interface.
+    In parallel mode the sparse search runs on a small thread pool while the dense search runs in the calling
+    thread, so a request costs max(dense, sparse) rather than their sum.
+    Retrieval, fusion and the result cache work on document indices and scores only; metadata is read
+    once, for the final top_k hits of a request.
+    """
+    def __init__(
+        self,
+        dense_service=None,
+        sparse_service=None,
+        fusion: str = "rrf",
+        rrf_k: int = 60,
+        dense_weight: float = 0.5,
+        fusion_depth: int = 100,
+        parallel: bool = True,
+        max_workers: int = 4,
+        result_cache=None,
+        index_version: str = "",
+    ):
+        """
+        Initialize the hybrid search service.
+        :param dense_service: QueryService, or None to disable dense retrieval.
+        :param sparse_service: SparseSearchService, or None to disable lexical retrieval.
+        :param fusion: "rrf" (reciprocal rank fusion) or "weighted" (weighted normalized scores).
+        :param rrf_k: RRF constant.
+        :param dense_weight: Weight of the dense scores in weighted fusion; sparse gets 1 - dense_weight.
+        :param fusion_depth: Minimum number of candidates fetched from each retriever before fusing.
+        :param parallel: Run both retrievers concurrently instead of one after the other.
+        :param max_workers: Threads available for the concurrent sparse searches.
+        :param result_cache: ResultCache serving repeated queries without searching, or None.
+        :param index_version: Version stamp of the served index; part of the result cache key.
+        """
+        if dense_service is None and sparse_service is None:
+            raise ValueError("HybridSearchService needs at least one of dense_service and sparse_service.")
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unsupported fusion method: {fusion}. Options: {', '.join(FUSION_METHODS)}")
+
+        self.dense_service = dense_service
+        self.sparse_service = sparse_service
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.dense_weight = dense_weight
+        self.fusion_depth = fusion_depth
+        self.parallel = parallel
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sparse-search") if parallel else None
+        self.result_cache = result_cache
+        self.index_version = index_version
+
+    def close(self):
+        """
+        Stop the sparse-search threads and release both retrievers' indexes; call once no request uses this service.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        for service in (self.dense_service, self.sparse_service):
+            if service is not None:
+                service.close()
+
+    @property
+    def mode(self) -> str:
+        if self.dense_service is not None and self.sparse_service is not None:
+            return "hybrid"
+        return "dense" if self.dense_service is not None else "sparse"
+
+    def _fuse(self, dense_results: List[dict], sparse_results: List[dict], top_k: int) -> List[dict]:
+        if self.fusion == "rrf":
+            fused = reciprocal_rank_fusion([dense_results, sparse_results], k=self.rrf_k)
+        else:
+            fused = weighted_score_fusion([dense_results, sparse_results], [self.dense_weight, 1.0 - self.dense_weight])
+        return fused[:top_k]
+
+    @staticmethod
+    def _hits(ranked) -> List[dict]:
+        top_indices, top_scores = ranked
+        return [{"score": score, "index": int(i)} for i, score in zip(top_indices, top_scores)]
+
+    def _rank_hits(self, service, query: str, top_k: int) -> List[dict]:
+        return self._hits(service.rank(query, top_k))
+
+    def _materialize(self, hits: List[dict], fields: Optional[Sequence[str]]) -> List[dict]:
+        """
+        Attach the (projected) metadata records of the final hits.
+        """
+        service = self.dense_service if self.dense_service is not None else self.sparse_service
+        records = service.fetch_metadata([hit["index"] for hit in hits], fields)
+        return [{"score": hit["score"], "index": hit["index"], "metadata": record} for hit, record in zip(hits, records)]
+
+    @staticmethod
+    def _timed(search_fn, *args) -> Tuple[list, float]:
+        start_time = time.perf_counter()
+        results = search_fn(*args)
+        return results, (time.perf_counter() - start_time) * 1000
+
+    def _candidates(self, top_k: int) -> Optional[int]:
+        """
+        Candidates fetched from each retriever for a fused request, or None for a single retriever.
+        """
+        return max(top_k, self.fusion_depth) if self.mode == "hybrid" else None
+
+    def _cache_depth(self, top_k: int) -> int:
+        """
+        Number of results to compute and cache for a request. A single retriever's ranking is cached to the
+        result cache depth and its prefix serves any smaller top_k. A fused ranking depends on how many
+        candidates each retriever contributed, so it is cached under its candidate depth (see `_candidates`)
+        and only serves requests fused at that same depth.
+        """
+        if self.mode == "hybrid":
+            return self._candidates(top_k)
+        return max(top_k, self.result_cache.depth)
+
+    @property
+    def exhaustive(self) -> bool:
+        """
+        Whether every retriever considers all documents, so a ranking shorter than requested holds every match.
+        """
+        return all(getattr(service, "exhaustive", False) for service in (self.dense_service, self.sparse_service) if service is not None)
+
+    def _search(self, query: str, top_k: int) -> Tuple[List[dict], Dict[str, float]]:
+        start_time = time.perf_counter()
+        timings = {}
+
+        if self.mode != "hybrid":
+            service = self.dense_service if self.mode == "dense" else self.sparse_service
+            hits, timings[f"{self.mode}_ms"] = self._timed(self._rank_hits, service, query, top_k)
+            timings["total_ms"] = (time.perf_counter() - start_time) * 1000
+            return hits, timings
+
+        depth = self._candidates(top_k)
+        if self.parallel:
+            sparse_future = self.executor.submit(self._timed, self._rank_hits, self.sparse_service, query, depth)
+            dense_hits, timings["dense_ms"] = self._timed(self._rank_hits, self.dense_service, query, depth)
+            sparse_hits, timings["sparse_ms"] = sparse_future.result()
+        else:
+            dense_hits, timings["dense_ms"] = self._timed(self._rank_hits, self.dense_service, query, depth)
+            sparse_hits, timings["sparse_ms"] = self._timed(self._rank_hits, self.sparse_service, query, depth)
+
+        hits, timings["fusion_ms"] = self._timed(self._fuse, dense_hits, sparse_hits, top_k)
+        timings["total_ms"] = (time.perf_counter() - start_time) * 1000
+        return hits, timings
+
+    def _search_cached(self, query: str, top_k: int) -> Tuple[List[dict], Dict[str, float]]:
+        if self.result_cache is None:
+            return self._search(query, top_k)
+
+        start_time = time.perf_counter()
+        candidates = self._candidates(top_k)
+        cached = self.result_cache.get(query, self.index_version, top_k, candidates)
+        if cached is not None:
+            elapsed = (time.perf_counter() - start_time) * 1000
+            return cached, {"cache_ms": elapsed, "total_ms": elapsed}
+
+        depth = self._cache_depth(top_k)
+        hits, timings = self._search(query, depth)
+        self.result_cache.put(query, self.index_version, hits, depth, self.exhaustive, candidates)
+        return hits[:top_k], timings
+
+    def search(self, query: str, top_k: int = 20, fields: Optional[Sequence[str]] = None) -> Tuple[List[dict], Dict[str, float]]:
+        """
+        Search with the configured retrievers and fuse the results, answering from the result cache when possible.
+        :param query: Query string.
+        :param top_k: Number of top results to return.
+        :param fields: Metadata fields to return, e.g. ["title", "metadata.requirements"]; None returns whole records.
+        :return: Tuple of (results shaped like QueryService.search output, per-stage timings in milliseconds).
+        """
+        hits, timings = self._search_cached(query, top_k)
+        start_time = time.perf_counter()
+        results = self._materialize(hits, fields)
+        timings["fetch_ms"] = (time.perf_counter() - start_time) * 1000
+        timings["total_ms"] += timings["fetch_ms"]
+        return results, timings
+
+    def _rank_batch_hits(self, service, queries: List[str], top_k: int) -> List[List[dict]]:
+        if service is self.dense_service:
+            return [self._hits(ranked) for ranked in service.rank_batch(queries, top_k)]
+        return [self._rank_hits(service, query, top_k) for query in queries]
+
+    def _search_batch(self, queries: List[str], top_k: int) -> Tuple[List[List[dict]], Dict[str, float]]:
+        start_time = time.perf_counter()
+        timings = {}
+
+        if self.mode != "hybrid":
+            service = self.dense_service if self.mode == "dense" else self.sparse_service
+            batch_hits, timings[f"{self.mode}_ms"] = self._timed(self._rank_batch_hits, service, queries, top_k)
+            timings["total_ms"] = (time.perf_counter() - start_time) * 1000
+            return batch_hits, timings
+
+        # As in _search: the sparse searches run on the thread pool while the dense batch runs here
+        depth = self._candidates(top_k)
+        if self.parallel:
+            sparse_future = self.executor.submit(self._timed, self._rank_batch_hits, self.sparse_service, queries, depth)
+            dense_batch, timings["dense_ms"] = self._timed(self._rank_batch_hits, self.dense_service, queries, depth)
+            sparse_batch, timings["sparse_ms"] = sparse_future.result()
+        else:
+            dense_batch, timings["dense_ms"] = self._timed(self._rank_batch_hits, self.dense_service, queries, depth)
+            sparse_batch, timings["sparse_ms"] = self._timed(self._rank_batch_hits, self.sparse_service, queries, depth)
+
+        start_fusion = time.perf_counter()
+        batch_hits = [self._fuse(dense_hits, sparse_hits, top_k) for dense_hits, sparse_hits in zip(dense_batch, sparse_batch)]
+        timings["fusion_ms"] = (time.perf_counter() - start_fusion) * 1000
+        timings["total_ms"] = (time.perf_counter() - start_time) * 1000
+        return batch_hits, timings
+
+    def _search_batch_cached(self, queries: List[str], top_k: int) -> Tuple[List[List[dict]], Dict[str, float]]:
+        if self.result_cache is None:
+            return self._search_batch(queries, top_k)
+
+        start_time = time.perf_counter()
+        candidates = self._candidates(top_k)
+        batch_hits = [self.result_cache.get(query, self.index_version, top_k, candidates) for query in queries]
+        timings = {"cache_ms": (time.perf_counter() - start_time) * 1000}
+        missing = list(dict.fromkeys(query for query, hits in zip(queries, batch_hits) if hits is None))
+        if missing:
+            depth = self._cache_depth(top_k)
+            searched_hits, search_timings = self._search_batch(missing, depth)
+            timings.update(search_timings)
+            searched = dict(zip(missing, searched_hits))
+            for query, hits in searched.items():
+                self.result_cache.put(query, self.index_version, hits, depth, self.exhaustive, candidates)
+            batch_hits = [
+                searched[query][:top_k] if hits is None else hits
+                for query, hits in zip(queries, batch_hits)
+            ]
+        timings["total_ms"] = (time.perf_counter() - start_time) * 1000
+        return batch_hits, timings
+
+    def search_batch_timed(
+        self, queries: List[str], top_k: int = 20, fields: Optional[Sequence[str]] = None
+    ) -> Tuple[List[List[dict]], Dict[str, float]]:
+        """
+        Search for several queries; dense retrieval uses one batched QueryService call and, in parallel
+        mode, runs concurrently with the sparse searches. Queries found in the result cache are answered
+        from it and only the others are searched.
+        :param queries: List of query strings.
+        :param top_k: Number of top results to return per query.
+        :param fields: Metadata fields to return, as in `search`.
+        :return: Tuple of (result lists in the same order as `queries`, per-stage timings of the whole batch in milliseconds).
+        """
+        batch_hits, timings = self._search_batch_cached(queries, top_k)
+        start_time = time.perf_counter()
+        results = [self._materialize(hits, fields) for hits in batch_hits]
+        timings["fetch_ms"] = (time.perf_counter() - start_time) * 1000
+        timings["total_ms"] += timings["fetch_ms"]
+        return results, timings
+
+    def search_batch(self, queries: List[str], top_k: int = 20, fields: Optional[Sequence[str]] = None) -> List[List[dict]]:
+        """
+        Search for several queries, as `search_batch_timed` without the timings.
+        :return: List of result lists, in the same order as `queries`.
+        """
+        return self.search_batch_timed(queries, top_k, fields)[0]
@@ -0,0 +1,213 @@
+import contextlib
+import gc
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+from backend.app.models.index_manifest import index_version
+from backend.app.services.hybrid_search import HybridSearchService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pause before reading a plain index directory again that was missing, i.e. caught between the two renames
+# with which IndexingService publishes a new version
+MISSING_INDEX_RETRY_S = 0.1
+
+
+class IndexReloader:
+    """
+    Serves requests from one HybridSearchService at a time and replaces it when a new index version is
+    published to index_dir, without restarting the process.
+    The new version is loaded in the background next to the current one, which keeps serving; the swap
+    is a single reference assignment. Each request holds the service it started on (`acquire`), so it
+    sees one consistent index, and the old service is closed, releasing its memory, once its in-flight
+    requests have drained: by the reload, or if they outlast drain_timeout, by the last of them.
+    """
+    def __init__(
+        self,
+        load_service: Callable[[str, str, Optional[HybridSearchService]], HybridSearchService],
+        index_dir: str,
+        poll_interval: Optional[float] = None,
+        drain_timeout: float = 30.0,
+        max_load_attempts: int = 3,
+    ):
+        """
+        Load the current index and optionally start watching index_dir for new versions.
+        :param load_service: Builds the search service for (index directory, index version, previous service);
+                             the previous service is None at startup and lets a reload reuse its model and caches.
+        :param index_dir: Index directory, or a symlink repointed by IndexingService on publish.
+        :param poll_interval: Seconds between checks of the index version by a watcher thread; None disables it
+                              and reloads only happen through `reload`.
+        :param drain_timeout: Seconds a reload waits for the old service's requests; requests still running after
+                              that close it when the last one finishes.
+        :param max_load_attempts: Loads retried when a new version was published while one was being read,
+                                  or index_dir was missing while it was being replaced.
+        """
+        self.load_service = load_service
+        self.index_dir = index_dir
+        self.poll_interval = poll_interval
+        self.drain_timeout = drain_timeout
+        self.max_load_attempts = max_load_attempts
+        self.last_reload = None  # Outcome of the most recent reload, for the admin endpoint
+
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._in_flight = {}  # service -> number of requests using it
+        self._close_when_drained = set()  # replaced services whose last request closes them
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self.service = self._load(None)
+        self._watcher = None
+        if poll_interval:
+            self._watcher = threading.Thread(target=self._watch, name="index-watcher", daemon=True)
+            self._watcher.start()
+
+    @contextlib.contextmanager
+    def acquire(self) -> Iterator[HybridSearchService]:
+        """
+        The current search service, kept open until the block exits even if a reload swaps it out meanwhile.
+        """
+        with self._lock:
+            service = self.service
+            self._in_flight[service] = self._in_flight.get(service, 0) + 1
+        try:
+            yield service
+        finally:
+            with self._lock:
+                self._in_flight[service] -= 1
+                drained = not self._in_flight[service]
+                if drained:
+                    del self._in_flight[service]
+                    self._drained.notify_all()
+                close = drained and service in self._close_when_drained
+                if close:
+                    self._close_when_drained.remove(service)
+            if close:
+                logger.info(f"Last request on index version {service.index_version} finished, closing it.")
+                service.close()
+
+    def _load(self, previous: Optional[HybridSearchService]) -> HybridSearchService:
+        """
+        Load the index version currently in index_dir. The version is read before and after loading;
+        if a build was published in between, the files read may mix both versions and the load is repeated.
+        """
+        for _ in range(self.max_load_attempts):
+            # A symlinked index_dir is resolved once, so every file is read from the same version
+            path = os.path.realpath(self.index_dir)
+            try:
+                version = index_version(path)
+                service = self.load_service(path, version, previous)
+            except FileNotFoundError as e:
+                logger.warning(f"Index in {self.index_dir} is being replaced ({e}); loading again.")
+                time.sleep(MISSING_INDEX_RETRY_S)
+                continue
+            if self._index_version() == version:
+                return service
+            logger.warning(f"Index in {self.index_dir} changed while version {version} was loading; loading again.")
+            service.close()
+        raise RuntimeError(f"Index in {self.index_dir} kept changing during {self.max_load_attempts} load attempts.")
+
+    def _index_version(self) -> str:
+        """
+        Version of the index in index_dir. A plain directory is swapped with two renames on publish and is
+        missing in between; it is read again after a pause before the error is raised.
+        """
+        for attempt in range(self.max_load_attempts):
+            try:
+                return index_version(self.index_dir)
+            except FileNotFoundError:
+                if attempt == self.max_load_attempts - 1:
+                    raise
+                time.sleep(MISSING_INDEX_RETRY_S)
+
+    def reload(self) -> dict:
+        """
+        Load the index version in index_dir and swap it in if it differs from the one being served.
+        Requests keep being answered by the current version while the new one loads.
+        :return: Outcome with status "reloaded" or "unchanged", the served version and, after a reload, timings.
+        """
+        with self._reload_lock:
+            current = self.service
+            if self._index_version() == current.index_version:
+                return {"status": "unchanged", "index_version": current.index_version}
+
+            start_time = time.perf_counter()
+            service = self._load(current)
+            load_s = time.perf_counter() - start_time
+            with self._lock:
+                self.service = service
+            logger.info(f"Serving index version {service.index_version} (loaded in {load_s:.1f} s), draining {current.index_version}.")
+
+            start_time = time.perf_counter()
+            with self._lock:
+                drained = self._drained.wait_for(lambda: current not in self._in_flight, timeout=self.drain_timeout)
+                if not drained:
+                    # Closing now would break the remaining requests; the last of them closes the old index
+                    self._close_when_drained.add(current)
+            drain_s = time.perf_counter() - start_time
+            if drained:
+                current.close()
+            else:
+                logger.warning(f"Requests on index version {current.index_version} still running after {self.drain_timeout} s; "
+                               f"it is closed when they finish.")
+            del current
+            gc.collect()
+
+            # Results cached for the old version can never be served again
+            if service.result_cache is not None:
+                service.result_cache.clear()
+
+            self.last_reload = {
+                "status": "reloaded",
+                "index_version": service.index_version,
+                "load_s": load_s,
+                "drain_s": drain_s,
+                "drained": drained,
+                "finished_at": time.time(),
+            }
+            return self.last_reload
+
+    def _reload_logged(self) -> None:
+        try:
+            self.reload()
+        except Exception as e:
+            logger.error(f"Reloading the index from {self.index_dir} failed, still serving {self.service.index_version}: {e}")
+            self.last_reload = {"status": "failed", "error": str(e), "index_version": self.service.index_version, "finished_at": time.time()}
+
+    def reload_in_background(self) -> bool:
+        """
+        Start `reload` in a background thread.
+        :return: False if a reload is already running.
+        """
+        if self._reload_lock.locked():
+            return False
+        threading.Thread(target=self._reload_logged, name="index-reload", daemon=True).start()
+        return True
+
+    @property
+    def reloading(self) -> bool:
+        return self._reload_lock.locked()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                changed = index_version(self.index_dir) != self.service.index_version
+            except OSError:
+                # index_dir is being swapped by IndexingService; check again on the next tick
+                continue
+            if changed:
+                self._reload_logged()
+
+    def close(self) -> None:
+        """
+        Stop watching and release the served index.
+        """
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        with self._reload_lock:
+            self.service.close()
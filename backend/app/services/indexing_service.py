@@ -1,94 +1,681 @@
 import os
-import sys
 import json
+import contextlib
+import itertools
+import multiprocessing
+import shutil
 import numpy as np
 import logging
-from typing import List
-from sentence_transformers import SentenceTransformer
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
-# Add the project root directory to sys.path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
-print(sys.path)
-
-from backend.app.services.data_loader import Document
+from backend.app.services.data_loader import Document, chunked
+from backend.app.models.ann_index import IVF_INDEX_FILE, IVFIndex
+from backend.app.models.dedup_index import DuplicateGroups, remove_duplicate_groups
+from backend.app.models.delta_index import DOCUMENT_HASHES_FILE, DocumentHashes, content_hash, load_tombstones, write_tombstones
+from backend.app.models.document_store import MetadataStore, append_metadata_store, open_metadata, write_metadata_store
+from backend.app.models.index_manifest import (
+    BUILD_CHECKPOINT_FILE,
+    read_build_checkpoint,
+    read_manifest,
+    write_build_checkpoint,
+    write_manifest,
+)
+from backend.app.models.pq_index import PQ_CODES_FILE, ProductQuantizer
+from backend.app.models.quantization import QUANTIZATION_KINDS, QuantizedMatrix, quantized_matrix_file
+from backend.app.models.sparse_model import BM25Index
+from backend.app.models.vector_store import (
+    NORMALIZED_MATRIX_FILE,
+    list_index_files,
+    read_shard_sizes,
+    shard_number,
+    write_normalized_matrix,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# sentence_transformers.SentenceTransformer, imported on first use (torch and transformers take seconds to import)
+SentenceTransformer = None
+
+# Model of an encoding worker process, loaded once by _init_encoder_worker
+_worker_model = None
+
+
+def _encoder_class() -> type:
+    global SentenceTransformer
+    if SentenceTransformer is None:
+        from sentence_transformers import SentenceTransformer
+    return SentenceTransformer
+
+
+def _init_encoder_worker(model_factory, model_name: str, num_threads: int) -> None:
+    global _worker_model
+    import torch
+    torch.set_num_threads(num_threads)
+    _worker_model = model_factory(model_name)
+
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    return _worker_model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+
+
+def _iter_records(documents: Iterable[Document], field: str, stats: dict, start: int = 0) -> Iterator[dict]:
+    """
+    Metadata records of the documents that have the indexed field; stats["seen"] counts all documents.
+    :param start: Position of the first document, when resuming a build part-way through the stream.
+    """
+    for i, doc in enumerate(documents, start):
+        stats["seen"] = i + 1
+        text = getattr(doc, field, None)
+        if text:
+            yield {"id": i, field: text, "metadata": {key: value for key, value in doc.items() if value is not None}}
+
+
+def _input_fingerprint(documents: List[Document]) -> str:
+    """
+    Hash of the first documents of a build's input stream, stored in its checkpoint so a build is only
+    resumed with the same input.
+    """
+    return format(content_hash([{key: value for key, value in doc.items() if value is not None} for doc in documents]), "016x")
+
+
+def _iter_metadata_shards(metadata_paths: List[str]) -> Iterator[dict]:
+    for metadata_path in metadata_paths:
+        with open(metadata_path, "r") as f:
+            yield from json.load(f)
+
+
 class IndexingService:
-    def __init__(self, model_name: str, index_dir: str = "./index", batch_size: int = 25000, field_to_index: str = "title"):
+    def __init__(
+        self,
+        model_name: str,
+        index_dir: str = "./index",
+        batch_size: int = 25000,
+        field_to_index: str = "title",
+        ann_nlist: Optional[int] = None,
+        quantization: Optional[str] = None,
+        pq_subspaces: int = 32,
+        opq_iterations: int = 0,
+        num_workers: int = 1,
+        encode_chunk_size: int = 1000,
+        key_field: Optional[str] = None,
+        dedup_threshold: Optional[float] = None,
+    ):
         """
         Initialize the indexing service.
         :param model_name: Hugging Face model name for encoding.
         :param index_dir: Directory to store the index files.
         :param batch_size: Number of embeddings per file.
         :param field_to_index: The text field in metadata to index.
+        :param ann_nlist: If set, also build an IVF index with this many clusters for approximate search.
+        :param quantization: If set ("float16", "int8" or "pq"), also store a quantized copy of the embeddings
+                             for QueryService's first-pass scan.
+        :param pq_subspaces: Bytes per document in the product-quantized copy; must divide the embedding dimension.
+        :param opq_iterations: OPQ rotation rounds learned before the PQ codebooks (0 disables OPQ).
+        :param num_workers: Encoding processes, each with its own model copy; 1 encodes in this process.
+        :param encode_chunk_size: Texts per task handed to an encoding process.
+        :param key_field: Metadata field identifying a document across incremental updates (e.g. a posting id);
+                          None identifies documents by their indexed field.
+        :param dedup_threshold: If set, also group exact and near-duplicate documents (cosine similarity at least
+                                this) and store one vector per group, for QueryService(dedup=True).
         """
-        self.model = SentenceTransformer(model_name)
+        # With worker processes the model is only loaded in the workers
+        self.model = _encoder_class()(model_name) if num_workers <= 1 else None
+        self.model_name = model_name
         self.index_dir = index_dir
         self.batch_size = batch_size
         self.field_to_index = field_to_index  # Field to index
+        self.ann_nlist = ann_nlist
+        self.quantization = quantization
+        self.pq_subspaces = pq_subspaces
+        self.opq_iterations = opq_iterations
+        self.num_workers = num_workers
+        self.encode_chunk_size = encode_chunk_size
+        self.key_field = key_field
+        self.dedup_threshold = dedup_threshold
         os.makedirs(self.index_dir, exist_ok=True)
 
-    def create_embeddings(self, documents: List[dict]) -> None:
+    def create_embeddings(self, documents: Iterable[Document], resume: bool = True) -> None:
         """
         Create and store embeddings for the specified field of the documents.
         Metadata includes the indexed field and additional information.
-        :param documents: List of Document objects to process.
-        """
-        logger.info(f"Starting to create embeddings for {len(documents)} documents...")
-
-        # Extract the field to be indexed and the metadata
-        field_texts = [getattr(doc, self.field_to_index, None) for doc in documents if getattr(doc, self.field_to_index, None)]
-        skipped_docs = [doc for doc in documents if not getattr(doc, self.field_to_index, None)]
-        logger.info(f"Skipped {len(skipped_docs)} documents without '{self.field_to_index}' field.")
-
-        metadata = [
-            {
-                "id": i,
-                self.field_to_index: getattr(doc, self.field_to_index, ""),
-                "metadata": {key: value for key, value in vars(doc).items() if value is not None}
-            }
-            for i, doc in enumerate(documents) if getattr(doc, self.field_to_index, None)
+        Documents are consumed as a stream: each shard of batch_size documents is encoded and written
+        before the next one is read, so peak memory is bounded by the shard size, not the corpus size.
+        The index is built in a staging directory next to index_dir, checkpointed after every shard, and
+        swapped in only once complete; until then the previous index keeps serving.
+        :param documents: Document objects to process, e.g. a list or `data_loader.iter_documents(...)`.
+                          A resumed build skips the documents already indexed, so the stream must yield
+                          the same documents in the same order as in the interrupted build.
+        :param resume: Continue an interrupted build with the same settings and input from its last completed shard.
+                       The input is recognised by a hash of its first batch_size documents.
+        """
+        logger.info(f"Starting to create embeddings for field '{self.field_to_index}' using model {self.model_name}...")
+        build_dir = self.index_dir.rstrip(os.sep) + ".building"
+        documents = iter(documents)
+        head = list(itertools.islice(documents, self.batch_size))
+        documents = itertools.chain(head, documents)
+        settings = {"model": self.model_name, "field": self.field_to_index, "batch_size": self.batch_size, "key_field": self.key_field,
+                    "input": _input_fingerprint(head)}
+        checkpoint = read_build_checkpoint(build_dir) if resume else None
+        if checkpoint is not None and {key: checkpoint.get(key) for key in settings} != settings:
+            logger.warning(f"Interrupted build in {build_dir} used other settings or input ({checkpoint}); starting over.")
+            checkpoint = None
+        if checkpoint is None:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            os.makedirs(build_dir)
+            num_shards, seen = 0, 0
+        else:
+            num_shards, seen = checkpoint["num_shards"], checkpoint["documents_seen"]
+            logger.info(f"Resuming build in {build_dir} after {num_shards} shards ({seen} documents).")
+        embedding_files, metadata_files = self._completed_shards(build_dir, num_shards)
+        hashes = DocumentHashes.from_records(_iter_metadata_shards(metadata_files), self.field_to_index, self.key_field)
+
+        def save_checkpoint(shard: int, last_record: dict) -> None:
+            write_build_checkpoint(build_dir, **settings, num_shards=shard, documents_seen=last_record["id"] + 1)
+
+        # Documents without the indexed field are skipped but keep their position as id
+        stats = {"seen": seen}
+        records = (
+            (record, None)
+            for record in _iter_records(itertools.islice(documents, seen, None), self.field_to_index, stats, start=seen)
+        )
+        new_embedding_files, new_metadata_files, _ = self._write_shards(records, build_dir, num_shards + 1, hashes, save_checkpoint)
+        embedding_files += new_embedding_files
+        metadata_files += new_metadata_files
+
+        if not embedding_files:
+            raise ValueError(f"No documents with a '{self.field_to_index}' field to index.")
+        logger.info(
+            f"Skipped {stats['seen'] - len(hashes)} documents without '{self.field_to_index}' field; "
+            f"stored {len(hashes)} embeddings in {len(embedding_files)} files."
+        )
+
+        self._build_index_files(build_dir, embedding_files, metadata_files, hashes)
+        os.remove(os.path.join(build_dir, BUILD_CHECKPOINT_FILE))
+        self._publish_index(build_dir)
+        logger.info(f"All embeddings and metadata for field '{self.field_to_index}' have been processed and stored in {self.index_dir}.")
+
+    @staticmethod
+    def _completed_shards(build_dir: str, num_shards: int) -> Tuple[List[str], List[str]]:
+        """
+        Paths of the first num_shards shards of a build; files of later, unfinished shards are removed.
+        """
+        for file_name in os.listdir(build_dir):
+            if file_name.startswith(("embeddings_", "metadata_")) and shard_number(file_name) > num_shards:
+                os.remove(os.path.join(build_dir, file_name))
+        shards = range(1, num_shards + 1)
+        return ([os.path.join(build_dir, f"embeddings_{shard}.npy") for shard in shards],
+                [os.path.join(build_dir, f"metadata_{shard}.json") for shard in shards])
+
+    def _publish_index(self, staging_dir: str) -> None:
+        """
+        Swap a completed build in as index_dir, so readers never open a partially written index.
+        If index_dir is a symlink it is repointed at the build with a single atomic rename; otherwise the
+        old directory is renamed aside and the build renamed into place, two renames apart, and index_dir is
+        briefly missing in between (IndexReloader retries then). Point index_dir at a symlink to avoid that window.
+        """
+        index_dir = self.index_dir.rstrip(os.sep)
+        if os.path.islink(index_dir):
+            old_dir = os.path.realpath(index_dir)
+            version_dir = f"{index_dir}.{read_manifest(staging_dir)['version']}"
+            os.rename(staging_dir, version_dir)
+            os.symlink(os.path.basename(version_dir), index_dir + ".link")
+            os.replace(index_dir + ".link", index_dir)
+        else:
+            old_dir = index_dir + ".old"
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if os.path.exists(index_dir):
+                os.rename(index_dir, old_dir)
+            os.rename(staging_dir, index_dir)
+        # Processes still serving the old index keep their open files and mappings
+        shutil.rmtree(old_dir, ignore_errors=True)
+        logger.info(f"Published {staging_dir} as {self.index_dir}.")
+
+    def _write_shards(
+        self,
+        records: Iterable[Tuple[dict, Optional[np.ndarray]]],
+        index_dir: str,
+        first_shard: int,
+        hashes: DocumentHashes,
+        on_shard_saved: Optional[Callable[[int, dict], None]] = None,
+    ) -> Tuple[List[str], List[str], int]:
+        """
+        Encode and store metadata records as embeddings_N.npy / metadata_N.json shards of batch_size rows.
+        :param records: (record, vector) pairs; a record given with a vector reuses it instead of being encoded.
+        :param index_dir: Directory to write into.
+        :param first_shard: Number of the first shard written.
+        :param hashes: DocumentHashes to which the rows written are appended.
+        :param on_shard_saved: Called with the shard number and its last record once both files of a shard are written.
+        :return: Tuple of (embedding paths, metadata paths, number of rows written).
+        """
+        field = self.field_to_index
+        embedding_files, metadata_files = [], []
+        num_rows = 0
+        pending = None  # shard whose embeddings are still being encoded
+        with self._encoder_pool() as pool:
+            try:
+                for shard, batch in enumerate(chunked(records, self.batch_size), start=first_shard):
+                    start, num_rows = num_rows, num_rows + len(batch)
+
+                    # Encode the text field to create embeddings; with worker processes this runs
+                    # while the previous shard is saved and the next one is read
+                    to_encode = [position for position, (_, vector) in enumerate(batch) if vector is None]
+                    reused = [(position, vector) for position, (_, vector) in enumerate(batch) if vector is not None]
+                    logger.info(f"Encoding {len(to_encode)} of {len(batch)} documents for shard {shard}.")
+                    encoding = self._submit_encoding(pool, [batch[position][0][field] for position in to_encode]) if to_encode else []
+
+                    # Save metadata
+                    batch_metadata = [record for record, _ in batch]
+                    for record in batch_metadata:
+                        hashes.append(record["metadata"], record[field], self.key_field)
+                    metadata_file = os.path.join(index_dir, f"metadata_{shard}.json")
+                    with open(metadata_file, "w") as f:
+                        json.dump(batch_metadata, f)
+                    metadata_files.append(metadata_file)
+                    logger.info(f"Stored metadata {start}-{num_rows} in file: {metadata_file}")
+
+                    # Save embeddings of the previous shard, in shard order
+                    if pending:
+                        self._save_pending_shard(pending, on_shard_saved)
+                    embedding_file = os.path.join(index_dir, f"embeddings_{shard}.npy")
+                    embedding_files.append(embedding_file)
+                    pending = (shard, batch[-1][0], (embedding_file, len(batch), to_encode, encoding, reused, start, num_rows))
+            except Exception:
+                # The shard in flight is unaffected by a failing document stream: keep it, so a resumed
+                # build starts after it
+                if pending:
+                    with contextlib.suppress(Exception):
+                        self._save_pending_shard(pending, on_shard_saved)
+                raise
+
+            if pending:
+                self._save_pending_shard(pending, on_shard_saved)
+        return embedding_files, metadata_files, num_rows
+
+    def _build_index_files(self, index_dir: str, embedding_files: List[str], metadata_files: List[str], hashes: DocumentHashes) -> None:
+        """
+        Write every file derived from the shards of a full build: metadata store, normalized matrix,
+        ANN / quantized copies as configured, document hashes, sparse index and, last, the manifest.
+        """
+        # Offset-indexed record file that QueryService reads lazily instead of loading every JSON shard,
+        # streamed back from the metadata shards one at a time
+        store_file = write_metadata_store(index_dir, _iter_metadata_shards(metadata_files))
+        logger.info(f"Stored compact metadata store in file: {store_file}")
+
+        # Consolidated, pre-normalized matrix for memory-mapped serving (QueryService(mmap=True))
+        matrix_file = write_normalized_matrix(index_dir, embedding_files)
+        logger.info(f"Stored normalized embedding matrix in file: {matrix_file}")
+
+        if self.ann_nlist:
+            self.build_ann_index(matrix_file, self.ann_nlist)
+
+        if self.quantization == "pq":
+            self.build_pq_index(matrix_file)
+        elif self.quantization:
+            self.build_quantized_matrix(matrix_file, self.quantization)
+
+        field_texts = self._sparse_texts(index_dir)
+        if self.dedup_threshold:
+            self.build_dedup_index(matrix_file, field_texts)
+
+        # Per-document hashes, so later updates only re-encode new or changed documents
+        hashes.save(index_dir)
+
+        # Inverted index over the same field and document order, for lexical search
+        self.create_sparse_index(field_texts, index_dir)
+
+        # Written last: a new version stamp invalidates cached results of the previous index
+        manifest = write_manifest(
+            index_dir,
+            num_docs=len(hashes),
+            num_shards=len(embedding_files),
+            num_base_shards=len(embedding_files),
+            shard_sizes=read_shard_sizes(embedding_files),
+            num_deleted=0,
+            model=self.model_name,
+            field=self.field_to_index,
+        )
+        logger.info(f"Stored index manifest, version {manifest['version']}.")
+
+    def _load_delta_state(self, num_rows: int) -> Tuple[DocumentHashes, np.ndarray]:
+        """
+        Document hashes and deleted-row mask of the current index; hashes are recomputed from the
+        metadata for indexes built before they were stored.
+        """
+        hashes = DocumentHashes.load(self.index_dir)
+        if hashes is None:
+            logger.info(f"{DOCUMENT_HASHES_FILE} not found in {self.index_dir}, hashing the stored metadata.")
+            metadata = open_metadata(self.index_dir)
+            hashes = DocumentHashes.from_records(metadata, self.field_to_index, self.key_field)
+            if isinstance(metadata, MetadataStore):
+                metadata.close()
+        if len(hashes) != num_rows:
+            raise ValueError(f"Stale {DOCUMENT_HASHES_FILE}: {len(hashes)} documents, index has {num_rows}.")
+        if self.key_field is None:
+            hashes.rekey_by_text()
+        deleted = load_tombstones(self.index_dir, num_rows)
+        return hashes, deleted if deleted is not None else np.zeros(num_rows, dtype=bool)
+
+    def update_index(self, documents: Iterable[Document], deleted_keys: Optional[Iterable[str]] = None) -> dict:
+        """
+        Incrementally bring the index in line with the given documents instead of rebuilding it.
+        Documents are matched to indexed rows by key (`key_field`, or their indexed field when no key field is set).
+        Unchanged documents are skipped; new and changed ones are written as delta shards after the existing
+        ones, re-encoding only those whose indexed field changed; superseded and deleted rows are marked in
+        the tombstone bitmap that QueryService masks out. Derived files are extended without retraining;
+        `compact` later merges the deltas into fresh base shards.
+        Like a build, the update is applied to a copy of the index that is swapped in once complete.
+        :param documents: Document objects, as for `create_embeddings`.
+        :param deleted_keys: If None, `documents` is the full current corpus and indexed documents missing
+                             from it are deleted. Otherwise `documents` are upserts only and these keys are deleted.
+        :return: Counts of added, updated, re-encoded, deleted and unchanged documents.
+        """
+        embedding_paths, _ = list_index_files(self.index_dir)
+        if not embedding_paths:
+            logger.info(f"No index in {self.index_dir} yet, building it from scratch.")
+            self.create_embeddings(documents)
+            return {"added": len(DocumentHashes.load(self.index_dir)), "updated": 0, "encoded": 0, "deleted": 0, "unchanged": 0}
+
+        matrix = np.load(os.path.join(self.index_dir, NORMALIZED_MATRIX_FILE), mmap_mode="r")
+        num_rows = matrix.shape[0]
+        hashes, deleted = self._load_delta_state(num_rows)
+        live = hashes.live_rows(deleted)
+        field = self.field_to_index
+        stats = {"added": 0, "updated": 0, "encoded": 0, "deleted": 0, "unchanged": 0}
+
+        def changed_records():
+            next_row = num_rows
+            for doc in documents:
+                metadata = {key: value for key, value in doc.items() if value is not None}
+                text = getattr(doc, field, None)
+                record_hash, text_hash = content_hash(metadata), content_hash(text or "")
+                key = DocumentHashes.document_key(metadata, self.key_field, text_hash)
+                # Without a key field, postings sharing a title share a key; an identical one is matched first
+                rows = live.get(key) or []
+                match = next((i for i, row in enumerate(rows) if hashes.record_hashes[row] == record_hash), 0)
+                old_row = rows.pop(match) if rows else None
+                if old_row is not None and hashes.record_hashes[old_row] == record_hash:
+                    stats["unchanged"] += 1
+                    continue
+                if old_row is not None:
+                    deleted[old_row] = True
+                if not text:
+                    stats["deleted"] += old_row is not None
+                    continue
+
+                # Only a changed indexed field needs the model; otherwise the stored vector is reused
+                vector = None
+                if old_row is None or hashes.text_hashes[old_row] != text_hash:
+                    stats["encoded"] += 1
+                else:
+                    vector = np.asarray(matrix[old_row])
+                stats["updated" if old_row is not None else "added"] += 1
+                yield {"id": next_row, field: text, "metadata": metadata}, vector
+                next_row += 1
+
+        # The update is applied to a copy of the index and swapped in when complete, so a crash or a
+        # reload mid-update never sees a half-written index
+        stage_dir = self._stage_update()
+        embedding_paths, _ = list_index_files(stage_dir)
+        first_shard = shard_number(os.path.basename(embedding_paths[-1])) + 1
+        embedding_files, metadata_files, num_new = self._write_shards(changed_records(), stage_dir, first_shard, hashes)
+
+        # A snapshot deletes every row it did not match; upserts delete only the keys given
+        stale_keys = list(live) if deleted_keys is None else {str(key) for key in deleted_keys}
+        for key in stale_keys:
+            for row in live.get(key, []):
+                deleted[row] = True
+                stats["deleted"] += 1
+        logger.info(f"Index update of {self.index_dir}: {stats}")
+        if not num_new and not stats["deleted"]:
+            shutil.rmtree(stage_dir, ignore_errors=True)
+            logger.info("Index is up to date.")
+            return stats
+        deleted = np.concatenate([deleted, np.zeros(num_new, dtype=bool)])
+
+        # Extend the derived files with the delta rows; trained structures keep their centroids / codebooks
+        if num_new:
+            store_file = append_metadata_store(stage_dir, _iter_metadata_shards(metadata_files))
+            logger.info(f"Appended {num_new} records to metadata store: {store_file}")
+        matrix_file = write_normalized_matrix(stage_dir, embedding_paths + embedding_files)
+        new_rows = np.load(matrix_file, mmap_mode="r")[num_rows:]
+        if num_new and os.path.exists(os.path.join(stage_dir, IVF_INDEX_FILE)):
+            ann_index = IVFIndex.load(stage_dir)
+            ann_index.extend(new_rows)
+            logger.info(f"Extended IVF index: {ann_index.save(stage_dir)}")
+        if num_new and os.path.exists(os.path.join(stage_dir, PQ_CODES_FILE)):
+            quantizer = ProductQuantizer.load(stage_dir)
+            quantizer.extend(new_rows)
+            logger.info(f"Extended PQ codes: {quantizer.save(stage_dir)}")
+        for kind in QUANTIZATION_KINDS:
+            if num_new and os.path.exists(os.path.join(stage_dir, quantized_matrix_file(kind))):
+                self.build_quantized_matrix(matrix_file, kind)
+        # Duplicate groups are not maintained incrementally; compaction rebuilds them
+        for path in remove_duplicate_groups(stage_dir):
+            logger.info(f"Removed stale {os.path.basename(path)}; it is rebuilt by compact().")
+
+        tombstones_file = write_tombstones(stage_dir, deleted)
+        logger.info(f"Stored tombstones for {int(deleted.sum())} of {deleted.shape[0]} rows in file: {tombstones_file}")
+        hashes.save(stage_dir)
+        self.create_sparse_index(self._sparse_texts(stage_dir, deleted), stage_dir)
+
+        previous = read_manifest(stage_dir) or {}
+        manifest = write_manifest(
+            stage_dir,
+            num_docs=len(hashes),
+            num_shards=len(embedding_paths) + len(embedding_files),
+            num_base_shards=previous.get("num_base_shards", len(embedding_paths)),
+            shard_sizes=read_shard_sizes(embedding_paths + embedding_files),
+            num_deleted=int(deleted.sum()),
+            model=self.model_name,
+            field=field,
+        )
+        logger.info(f"Stored index manifest, version {manifest['version']}.")
+        self._publish_index(stage_dir)
+        return stats
+
+    def _stage_update(self) -> str:
+        """
+        Copy the current index into a sibling staging directory for `update_index`. Shard files are never
+        rewritten once stored, so they are hard-linked; every other file may be rewritten or appended to and
+        is copied, leaving the serving index untouched.
+        """
+        stage_dir = self.index_dir.rstrip(os.sep) + ".updating"
+        shutil.rmtree(stage_dir, ignore_errors=True)
+
+        def link_or_copy(src: str, dst: str) -> None:
+            name = os.path.basename(src)
+            if (name.startswith("embeddings_") and name.endswith(".npy")) or (name.startswith("metadata_") and name.endswith(".json")):
+                with contextlib.suppress(OSError):
+                    os.link(src, dst)
+                    return
+            shutil.copy2(src, dst)
+
+        shutil.copytree(os.path.realpath(self.index_dir), stage_dir, copy_function=link_or_copy)
+        return stage_dir
+
+    def compaction_due(self, max_deleted_fraction: float = 0.1, max_delta_shards: int = 16) -> bool:
+        """
+        Whether enough rows are tombstoned, or enough delta shards accumulated, to warrant `compact`.
+        """
+        manifest = read_manifest(self.index_dir) or {}
+        num_docs, num_shards = manifest.get("num_docs", 0), manifest.get("num_shards", 0)
+        delta_shards = num_shards - manifest.get("num_base_shards", num_shards)
+        deleted_fraction = manifest.get("num_deleted", 0) / num_docs if num_docs else 0.0
+        return deleted_fraction > max_deleted_fraction or delta_shards > max_delta_shards
+
+    def compact(self) -> None:
+        """
+        Merge base and delta shards into fresh base shards without the tombstoned rows, and rebuild every
+        derived file, retraining the ANN / PQ structures as configured. Nothing is re-encoded.
+        The new index is built in a sibling directory and swapped in when complete, so it can run in the
+        background while the current index keeps serving.
+        """
+        embedding_paths, metadata_paths = list_index_files(self.index_dir)
+        num_rows = sum(np.load(path, mmap_mode="r").shape[0] for path in embedding_paths)
+        _, deleted = self._load_delta_state(num_rows)
+        logger.info(f"Compacting {self.index_dir}: dropping {int(deleted.sum())} of {num_rows} rows in {len(embedding_paths)} shards.")
+
+        def live_records():
+            offset = 0
+            for embedding_path, metadata_path in zip(embedding_paths, metadata_paths):
+                embeddings = np.load(embedding_path, mmap_mode="r")
+                with open(metadata_path, "r") as f:
+                    records = json.load(f)
+                for row, record in enumerate(records):
+                    if not deleted[offset + row]:
+                        yield record, np.asarray(embeddings[row])
+                offset += len(records)
+
+        compact_dir = self.index_dir.rstrip(os.sep) + ".compacting"
+        shutil.rmtree(compact_dir, ignore_errors=True)
+        os.makedirs(compact_dir)
+        hashes = DocumentHashes([], [], [])
+        embedding_files, metadata_files, _ = self._write_shards(live_records(), compact_dir, 1, hashes)
+        if not embedding_files:
+            raise ValueError(f"Every document of {self.index_dir} is deleted; nothing to compact.")
+        self._build_index_files(compact_dir, embedding_files, metadata_files, hashes)
+        self._publish_index(compact_dir)
+        logger.info(f"Compacted {self.index_dir} to {len(hashes)} documents in {len(embedding_files)} shards.")
+
+    def _sparse_texts(self, index_dir: str, deleted: Optional[np.ndarray] = None) -> List[str]:
+        """
+        Indexed field of every row from the metadata store, empty for deleted rows so they have no postings.
+        """
+        store = MetadataStore(index_dir)
+        field = self.field_to_index
+        texts = [
+            "" if deleted is not None and deleted[row] else store.get(row, [field]).get(field) or ""
+            for row in range(len(store))
         ]
+        store.close()
+        return texts
 
-        # Encode the text field to create embeddings
-        logger.info(f"Encoding {len(field_texts)} documents for field '{self.field_to_index}' using model {self.model}.")
-        embeddings = self.model.encode(field_texts, show_progress_bar=True, convert_to_numpy=True)
+    def _encoder_pool(self):
+        """
+        Process pool holding one model copy per worker, or a null context when encoding in-process.
+        Workers are spawned (not forked) so none inherits the parent's torch thread pool, and each uses
+        an equal share of the cores so the workers do not oversubscribe the CPU.
+        """
+        if self.num_workers <= 1:
+            return contextlib.nullcontext()
+        threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+        logger.info(f"Starting {self.num_workers} encoding processes with {threads} threads each.")
+        return ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_encoder_worker,
+            initargs=(_encoder_class(), self.model_name, threads),
+        )
 
-        # Split embeddings and metadata into chunks
-        total_files = (len(embeddings) + self.batch_size - 1) // self.batch_size
-        logger.info(f"Storing embeddings in {total_files} files, each containing up to {self.batch_size} embeddings.")
+    def _submit_encoding(self, pool: Optional[ProcessPoolExecutor], texts: List[str]) -> List[Future]:
+        """
+        Start encoding texts, split into encode_chunk_size pieces across the pool's workers.
+        :return: Futures of the piece embeddings, in text order.
+        """
+        if pool is None:
+            future = Future()
+            future.set_result(self.model.encode(texts, show_progress_bar=True, convert_to_numpy=True))
+            return [future]
+        return [
+            pool.submit(_encode_in_worker, texts[start:start + self.encode_chunk_size])
+            for start in range(0, len(texts), self.encode_chunk_size)
+        ]
 
-        for i in range(total_files):
-            start = i * self.batch_size
-            end = min(start + self.batch_size, len(embeddings))
+    def _save_pending_shard(self, pending: tuple, on_shard_saved: Optional[Callable[[int, dict], None]]) -> None:
+        shard, last_record, save_args = pending
+        self._save_embeddings(*save_args)
+        if on_shard_saved is not None:
+            on_shard_saved(shard, last_record)
 
-            batch_embeddings = embeddings[start:end]
-            batch_metadata = metadata[start:end]
+    def _save_embeddings(self, embedding_file: str, size: int, to_encode: List[int], encoding: List[Future],
+                         reused: List[Tuple[int, np.ndarray]], start: int, end: int) -> None:
+        encoded = np.concatenate([future.result() for future in encoding]) if encoding else None
+        if not reused:
+            batch_embeddings = encoded
+        else:
+            batch_embeddings = np.empty((size, reused[0][1].shape[0]), dtype=np.float32)
+            if encoded is not None:
+                batch_embeddings[to_encode] = encoded
+            for position, vector in reused:
+                batch_embeddings[position] = vector
+        np.save(embedding_file, batch_embeddings)
+        logger.info(f"Stored embeddings {start}-{end} in file: {embedding_file}")
 
-            # Save embeddings
-            embedding_file = os.path.join(self.index_dir, f"embeddings_{i + 1}.npy")
-            np.save(embedding_file, batch_embeddings)
+    def build_ann_index(self, matrix_file: str, nlist: int) -> None:
+        """
+        Train an IVF index over the normalized embedding matrix and store it next to the shards.
+        :param matrix_file: Path of the normalized embedding matrix.
+        :param nlist: Number of IVF clusters.
+        """
+        matrix = np.load(matrix_file, mmap_mode="r")
+        logger.info(f"Training IVF index with {nlist} clusters over {matrix.shape[0]} embeddings...")
+        ann_file = IVFIndex.train(matrix, nlist=nlist).save(os.path.dirname(matrix_file))
+        logger.info(f"Stored IVF index in file: {ann_file}")
 
-            # Save metadata
-            metadata_file = os.path.join(self.index_dir, f"metadata_{i + 1}.json")
-            with open(metadata_file, "w") as f:
-                json.dump(batch_metadata, f)
+    def build_quantized_matrix(self, matrix_file: str, kind: str) -> None:
+        """
+        Store a float16 or int8 copy of the normalized embedding matrix next to the shards.
+        :param matrix_file: Path of the normalized embedding matrix.
+        :param kind: "float16" or "int8".
+        """
+        matrix = np.load(matrix_file, mmap_mode="r")
+        quantized_file = QuantizedMatrix.write(os.path.dirname(matrix_file), matrix, kind)
+        logger.info(
+            f"Stored {kind} embeddings in file: {quantized_file} "
+            f"({os.path.getsize(quantized_file) / 1e6:.1f} MB, float32: {matrix.nbytes / 1e6:.1f} MB)"
+        )
 
-            logger.info(f"Stored embeddings {start}-{end} in file: {embedding_file}")
-            logger.info(f"Stored metadata {start}-{end} in file: {metadata_file}")
+    def build_pq_index(self, matrix_file: str) -> None:
+        """
+        Train product-quantization codebooks over the normalized embedding matrix and store the
+        encoded corpus next to the shards. Encoding streams the matrix, so it may exceed RAM.
+        :param matrix_file: Path of the normalized embedding matrix.
+        """
+        matrix = np.load(matrix_file, mmap_mode="r")
+        logger.info(f"Training PQ codebooks with {self.pq_subspaces} subspaces over {matrix.shape[0]} embeddings...")
+        quantizer = ProductQuantizer.train(matrix, num_subspaces=self.pq_subspaces, opq_iterations=self.opq_iterations)
+        codes_file = quantizer.save(os.path.dirname(matrix_file), matrix)
+        logger.info(
+            f"Stored PQ codes in file: {codes_file} "
+            f"({quantizer.nbytes / 1e6:.1f} MB, float32: {matrix.nbytes / 1e6:.1f} MB)"
+        )
 
-        logger.info(f"All embeddings and metadata for field '{self.field_to_index}' have been processed and stored in {self.index_dir}.")
+    def build_dedup_index(self, matrix_file: str, field_texts: List[str]) -> None:
+        """
+        Group exact and near-duplicate documents over the normalized embedding matrix and store the
+        groups and one vector per group next to the shards.
+        :param matrix_file: Path of the normalized embedding matrix.
+        :param field_texts: Indexed field of every document, for exact-duplicate detection.
+        """
+        matrix = np.load(matrix_file, mmap_mode="r")
+        logger.info(f"Grouping duplicates among {matrix.shape[0]} embeddings at similarity {self.dedup_threshold}...")
+        groups = DuplicateGroups.build(matrix, field_texts, threshold=self.dedup_threshold)
+        groups_file, unique_file = groups.save(os.path.dirname(matrix_file), matrix)
+        logger.info(
+            f"Stored {groups.num_groups} unique embeddings for {len(groups)} documents in file: {unique_file} "
+            f"({os.path.getsize(unique_file) / 1e6:.1f} MB, float32: {matrix.nbytes / 1e6:.1f} MB), groups in {groups_file}"
+        )
+
+    def create_sparse_index(self, field_texts: List[str], index_dir: Optional[str] = None) -> None:
+        """
+        Build the BM25 inverted index over the indexed field and store it next to the shards.
+        :param field_texts: Indexed field of every document, in the same order as the metadata shards.
+        :param index_dir: Directory to write into; defaults to the service's index directory.
+        """
+        logger.info(f"Building sparse index over {len(field_texts)} documents for field '{self.field_to_index}'.")
+        sparse_file = BM25Index.build(field_texts).save(index_dir or self.index_dir)
+        logger.info(f"Stored sparse index in file: {sparse_file}")
 
     def _validate_index(self):
         """
         Validate that all embedding files and metadata files are consistent.
         """
         logger.info(f"Validating index files in {self.index_dir}...")
-        embedding_files = sorted([f for f in os.listdir(self.index_dir) if f.startswith("embeddings_") and f.endswith(".npy")])
-        metadata_files = sorted([f for f in os.listdir(self.index_dir) if f.startswith("metadata_") and f.endswith(".json")])
+        embedding_files = sorted([f for f in os.listdir(self.index_dir) if f.startswith("embeddings_") and f.endswith(".npy")], key=shard_number)
+        metadata_files = sorted([f for f in os.listdir(self.index_dir) if f.startswith("metadata_") and f.endswith(".json")], key=shard_number)
 
         for i, (embedding_file, metadata_file) in enumerate(zip(embedding_files, metadata_files)):
             embedding_path = os.path.join(self.index_dir, embedding_file)
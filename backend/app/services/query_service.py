@@ -1,26 +1,180 @@
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import json
 import os
 import logging
 import time
+from typing import Dict, List, Optional, Sequence
+
+from backend.app.models.ann_index import IVFIndex, IVF_INDEX_FILE
+from backend.app.models.dedup_index import DUPLICATE_GROUPS_FILE, DuplicateGroups, load_unique_matrix
+from backend.app.models.delta_index import load_tombstones
+from backend.app.models.document_store import METADATA_OFFSETS_FILE, MetadataStore, fetch_record, load_metadata
+from backend.app.models.pq_index import PQ_CODES_FILE, ProductQuantizer
+from backend.app.models.quantization import QuantizedMatrix, quantized_matrix_file
+from backend.app.models.vector_store import (
+    load_embedding_matrix,
+    merge_top_k,
+    normalize_rows,
+    list_index_files,
+    open_embedding_matrix,
+    split_shards,
+    top_k_indices,
+    NORMALIZED_MATRIX_FILE,
+)
+from backend.app.utils.cache import EmbeddingCache
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class QueryService:
-    def __init__(self, model_name: str, index_dir: str = "./index"):
+DEFAULT_MODEL = "distiluse-base-multilingual-cased-v1"
+
+# sentence_transformers.SentenceTransformer, imported on first use: with torch and transformers it takes
+# seconds to import, which would delay every process importing the API before it can accept connections
+SentenceTransformer = None
+
+# Encoders loaded before worker processes are forked (backend/app/server.py), by model name
+_preloaded_encoders: Dict[str, "SentenceTransformer"] = {}
+
+
+def load_encoder(model_name: str) -> "SentenceTransformer":
+    """
+    Load a SentenceTransformer, importing sentence_transformers on the first call.
+    """
+    global SentenceTransformer
+    if SentenceTransformer is None:
+        from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def preload_encoder(model_name: str) -> "SentenceTransformer":
+    """
+    Load the encoder for model_name once in this process; every QueryService created afterwards, here or
+    in a forked child, uses it instead of loading its own copy. Forked children share its weights'
+    memory pages, which are never written, with the parent.
+    """
+    if model_name not in _preloaded_encoders:
+        _preloaded_encoders[model_name] = load_encoder(model_name)
+    return _preloaded_encoders[model_name]
+
+
+class QueryEncoder:
+    """
+    Turns query strings into L2-normalized embeddings, consulting an embedding cache before the model.
+    Shared by the services that search an index with query embeddings.
+    """
+    def __init__(self, model_name: str, embedding_cache: Optional[EmbeddingCache] = None, model: Optional["SentenceTransformer"] = None):
+        """
+        :param model_name: Hugging Face model name for encoding.
+        :param embedding_cache: Cache of query embeddings consulted before running the encoder, or None.
+        :param model: Already loaded encoder for model_name to use instead of loading it again; defaults to
+                      the preloaded encoder (`preload_encoder`), if any.
+        """
+        if model is None:
+            model = _preloaded_encoders.get(model_name)
+        self.model = model if model is not None else load_encoder(model_name)
+        self.embedding_cache = embedding_cache
+
+    def _encode_uncached(self, queries: List[str]) -> np.ndarray:
+        """
+        Encode queries in one model call and L2-normalize them.
+        :param queries: List of query strings.
+        :return: 2D float32 array, one normalized embedding per query.
+        """
+        query_embeddings = self.model.encode(queries, convert_to_numpy=True).astype(np.float32)
+        return normalize_rows(query_embeddings)
+
+    def _encode(self, queries: List[str]) -> np.ndarray:
+        """
+        Encode and L2-normalize queries, taking embeddings from the cache where possible.
+        Cache misses are encoded together in one model call and added to the cache.
+        :param queries: List of query strings.
+        :return: 2D float32 array, one normalized embedding per query.
+        """
+        if self.embedding_cache is None:
+            return self._encode_uncached(queries)
+
+        embeddings = [self.embedding_cache.get(query) for query in queries]
+        missing = list(dict.fromkeys(query for query, embedding in zip(queries, embeddings) if embedding is None))
+        if missing:
+            encoded = dict(zip(missing, self._encode_uncached(missing)))
+            for query, embedding in encoded.items():
+                self.embedding_cache.put(query, embedding)
+            embeddings = [encoded[query] if embedding is None else embedding for query, embedding in zip(queries, embeddings)]
+        return np.stack(embeddings)
+
+    def prewarm_cache(self, queries: List[str], batch_size: int = 256):
+        """
+        Fill the embedding cache with the given queries, e.g. the head of the query-frequency log.
+        At most as many queries as the cache holds are encoded; hit/miss counters are not touched.
+        :param queries: Query strings, most important first.
+        :param batch_size: Number of queries per model call.
+        """
+        if self.embedding_cache is None:
+            return
+
+        start_time = time.perf_counter()
+        queries = list(dict.fromkeys(queries))[:self.embedding_cache.max_size]
+        for start in range(0, len(queries), batch_size):
+            batch = queries[start:start + batch_size]
+            for query, embedding in zip(batch, self._encode_uncached(batch)):
+                self.embedding_cache.put(query, embedding)
+        logger.info(f"Pre-warmed embedding cache with {len(queries)} queries in {time.perf_counter() - start_time:.2f} seconds.")
+
+
+class QueryService(QueryEncoder):
+    def __init__(
+        self,
+        model_name: str,
+        index_dir: str = "./index",
+        mmap: bool = False,
+        ann: bool = False,
+        nprobe: int = 8,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        quantization: Optional[str] = None,
+        rerank_depth: int = 200,
+        model: Optional["SentenceTransformer"] = None,
+        dedup: bool = False,
+        collapse_duplicates: bool = False,
+    ):
         """
         Initialize the query service.
         :param model_name: Hugging Face model name for encoding.
         :param index_dir: Directory containing embeddings and metadata files.
+        :param mmap: Memory-map the pre-normalized matrix written by IndexingService instead of
+                     loading a private copy, so worker processes share page-cache pages.
+        :param ann: Search with the IVF index built by IndexingService instead of exhaustively.
+        :param nprobe: IVF clusters scanned per query; higher is slower but closer to exhaustive.
+        :param embedding_cache: Cache of query embeddings consulted before running the encoder, or None.
+        :param quantization: "float16", "int8" or "pq" to scan the quantized copy written by IndexingService first
+                             and re-score the best candidates in float32. Not used when ann is enabled.
+        :param rerank_depth: Candidates from the quantized scan re-scored in float32 (at least top_k).
+        :param model: Already loaded encoder for model_name to use instead of loading it again, e.g. the
+                      one of the service being replaced when a new index version is loaded. Defaults to
+                      the preloaded encoder (`preload_encoder`), if any.
+        :param dedup: Scan one vector per group of duplicate documents (IndexingService(dedup_threshold=...))
+                      instead of every row; every member of a ranked group is returned with the group's score.
+                      Not used when ann or quantization is enabled.
+        :param collapse_duplicates: Return only the best-ranked document of each group of duplicates.
         """
-        self.model = SentenceTransformer(model_name)
+        super().__init__(model_name, embedding_cache=embedding_cache, model=model)
         self.index_dir = index_dir
-        self.embeddings = []
-        self.metadata = []
+        self.mmap = mmap
+        self.ann = ann
+        self.nprobe = nprobe
+        self.quantization = quantization
+        self.rerank_depth = rerank_depth
+        self.dedup = dedup
+        self.collapse_duplicates = collapse_duplicates
+        self.duplicate_groups = None  # DuplicateGroups when dedup or collapse_duplicates is enabled and groups were built
+        self.unique_matrix = None  # One normalized vector per duplicate group, scanned instead of every row with dedup
+        self.quantized = None  # QuantizedMatrix or ProductQuantizer for the first-pass scan when quantization is enabled
+        self.embedding_matrix = None  # Contiguous, L2-normalized float32 matrix of all shards
+        self.embeddings = []  # Per-shard row views into embedding_matrix
+        self.ann_index = None  # IVFIndex when ann is enabled and one was built for this index
+        self.metadata = []  # MetadataStore, or the list of records for indexes built without one
+        self.deleted = None  # Boolean mask of tombstoned rows after incremental updates, or None
+        self.num_deleted = 0
+        self.shard_deleted = []  # Per-shard row numbers of the tombstoned rows
 
         # Load all embeddings and metadata
         self.load_index()
@@ -28,67 +182,382 @@ class QueryService:
     def load_index(self):
         """
         Load embeddings and metadata from index files ensuring matching numbers.
+        All embedding shards are stacked and normalized once here, so queries only need a dot product.
+        Metadata is read lazily from the compact store when IndexingService wrote one.
         """
         logger.info(f"Loading embeddings and metadata from {self.index_dir}...")
         
-        # Collect all embeddings and metadata files
-        embedding_files = sorted(
-            [f for f in os.listdir(self.index_dir) if f.startswith("embeddings_") and f.endswith(".npy")]
-        )
-        metadata_files = sorted(
-            [f for f in os.listdir(self.index_dir) if f.startswith("metadata_") and f.endswith(".json")]
+        embedding_paths, metadata_paths = list_index_files(self.index_dir)
+
+        if self.mmap and os.path.exists(os.path.join(self.index_dir, NORMALIZED_MATRIX_FILE)):
+            self.embedding_matrix, shard_sizes = open_embedding_matrix(self.index_dir, embedding_paths)
+        else:
+            if self.mmap:
+                logger.warning(f"{NORMALIZED_MATRIX_FILE} not found in {self.index_dir}, loading embeddings into memory.")
+            self.embedding_matrix, shard_sizes = load_embedding_matrix(embedding_paths)
+        self.embeddings = split_shards(self.embedding_matrix, shard_sizes)
+        self.load_metadata(metadata_paths)
+        self.load_tombstones(shard_sizes)
+
+        if self.ann:
+            self.load_ann_index()
+        elif self.quantization:
+            self.load_quantized_matrix()
+        if self.dedup or self.collapse_duplicates:
+            self.load_duplicate_groups()
+
+        logger.info(f"Loaded {len(self.metadata)} documents, size of embeddings {len(self.embeddings)}.")
+
+    def close(self):
+        """
+        Release the index: close the metadata store and drop the embedding arrays, which unmaps
+        memory-mapped files once nothing else references them. The model is left to its other users.
+        """
+        if isinstance(self.metadata, MetadataStore):
+            self.metadata.close()
+        self.metadata = []
+        self.embedding_matrix = None
+        self.embeddings = []
+        self.ann_index = None
+        self.quantized = None
+        self.duplicate_groups = None
+        self.unique_matrix = None
+        self.deleted = None
+        self.shard_deleted = []
+
+    def load_metadata(self, metadata_paths: List[str]):
+        """
+        Open the compact metadata store, falling back to loading the metadata_N.json shards
+        if it is missing or was built for a different set of shards.
+        """
+        if os.path.exists(os.path.join(self.index_dir, METADATA_OFFSETS_FILE)):
+            store = MetadataStore(self.index_dir)
+            if len(store) == self.embedding_matrix.shape[0]:
+                self.metadata = store
+                return
+            logger.warning(
+                f"Stale {METADATA_OFFSETS_FILE}: {len(store)} documents, index has {self.embedding_matrix.shape[0]}. "
+                f"Loading metadata shards into memory."
+            )
+            store.close()
+        self.metadata = load_metadata(metadata_paths)
+
+    def load_tombstones(self, shard_sizes: List[int]):
+        """
+        Load the rows deleted or superseded by incremental updates, which are masked out of every ranking.
+        """
+        try:
+            deleted = load_tombstones(self.index_dir, self.embedding_matrix.shape[0])
+        except ValueError as e:
+            logger.warning(f"{e} Serving without deletions.")
+            return
+        if deleted is None or not deleted.any():
+            return
+
+        self.deleted = deleted
+        self.num_deleted = int(deleted.sum())
+        offsets = np.concatenate([[0], np.cumsum(shard_sizes)])
+        self.shard_deleted = [np.flatnonzero(deleted[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+        logger.info(f"Masking {self.num_deleted} deleted rows.")
+
+    def _live_depth(self, depth: int) -> int:
+        """
+        Candidates to fetch from an approximate first pass so that about `depth` survive the tombstone filter.
+        """
+        return depth + min(self.num_deleted, depth)
+
+    def _drop_deleted(self, indices: np.ndarray, scores: np.ndarray, top_k: int):
+        if self.deleted is None:
+            return indices, scores
+        keep = ~self.deleted[indices]
+        return indices[keep][:top_k], scores[keep][:top_k]
+
+    def load_ann_index(self):
+        """
+        Load the IVF index next to the embedding shards, falling back to exhaustive search
+        if it is missing or was built for a different set of shards.
+        """
+        if not os.path.exists(os.path.join(self.index_dir, IVF_INDEX_FILE)):
+            logger.warning(f"{IVF_INDEX_FILE} not found in {self.index_dir}, using exhaustive search.")
+            return
+
+        ann_index = IVFIndex.load(self.index_dir, nprobe=self.nprobe)
+        if ann_index.num_docs != self.embedding_matrix.shape[0]:
+            logger.warning(
+                f"Stale {IVF_INDEX_FILE}: {ann_index.num_docs} documents, index has {self.embedding_matrix.shape[0]}. "
+                f"Using exhaustive search."
+            )
+            return
+
+        self.ann_index = ann_index
+        logger.info(f"Loaded IVF index with {ann_index.nlist} clusters, nprobe={self.nprobe}.")
+
+    def load_quantized_matrix(self):
+        """
+        Load the quantized copy of the embedding matrix, falling back to the float32 scan
+        if it is missing or was built for a different set of shards.
+        """
+        file_name = PQ_CODES_FILE if self.quantization == "pq" else quantized_matrix_file(self.quantization)
+        if not os.path.exists(os.path.join(self.index_dir, file_name)):
+            logger.warning(f"{file_name} not found in {self.index_dir}, scanning float32 embeddings.")
+            return
+
+        if self.quantization == "pq":
+            quantized = ProductQuantizer.load(self.index_dir, mmap=self.mmap)
+        else:
+            quantized = QuantizedMatrix.load(self.index_dir, self.quantization, mmap=self.mmap)
+        if quantized.num_docs != self.embedding_matrix.shape[0]:
+            logger.warning(
+                f"Stale {file_name}: {quantized.num_docs} documents, index has {self.embedding_matrix.shape[0]}. "
+                f"Scanning float32 embeddings."
+            )
+            return
+
+        self.quantized = quantized
+        logger.info(
+            f"Loaded {self.quantization} embeddings: {quantized.nbytes / 1e6:.1f} MB instead of "
+            f"{self.embedding_matrix.nbytes / 1e6:.1f} MB scanned per query, re-ranking the top {self.rerank_depth}."
         )
 
-        # Ensure the number of files matches
-        if len(embedding_files) != len(metadata_files):
-            raise ValueError(f"Mismatch: {len(embedding_files)} embedding files and {len(metadata_files)} metadata files found.")
+    def load_duplicate_groups(self):
+        """
+        Load the duplicate groups, and for dedup the matrix of their vectors, ignoring them if they are
+        missing or were built for a different set of shards.
+        """
+        groups = DuplicateGroups.load(self.index_dir)
+        if groups is None:
+            logger.warning(f"{DUPLICATE_GROUPS_FILE} not found in {self.index_dir}, serving duplicates as they are.")
+            return
+        if len(groups) != self.embedding_matrix.shape[0]:
+            logger.warning(
+                f"Stale {DUPLICATE_GROUPS_FILE}: {len(groups)} documents, index has {self.embedding_matrix.shape[0]}. "
+                f"Serving duplicates as they are."
+            )
+            return
 
-        # Check matching numbers in filenames
-        for embedding_file, metadata_file in zip(embedding_files, metadata_files):
-            embedding_number = int(embedding_file.split("_")[1].split(".")[0])
-            metadata_number = int(metadata_file.split("_")[1].split(".")[0])
+        self.duplicate_groups = groups
+        if self.dedup and self.ann_index is None and self.quantized is None:
+            self.unique_matrix = load_unique_matrix(self.index_dir, mmap=self.mmap)
+            logger.info(f"Scanning {groups.num_groups} unique embeddings instead of {len(groups)}.")
 
-            if embedding_number != metadata_number:
-                raise ValueError(f"Mismatch in file numbering: {embedding_file} and {metadata_file}")
+    def _collapse_depth(self, top_k: int) -> int:
+        """
+        Rows to rank so that about top_k distinct groups remain after collapsing duplicates.
+        """
+        return min(len(self.duplicate_groups), 4 * top_k)
 
-            # Load the matched embedding and metadata
-            embedding_path = os.path.join(self.index_dir, embedding_file)
-            metadata_path = os.path.join(self.index_dir, metadata_file)
+    def _rank_groups(self, group_scores: np.ndarray, top_k: int):
+        """
+        Select the top-k documents from the scores of the duplicate groups: the top-k groups always hold
+        at least top_k documents.
+        """
+        groups = top_k_indices(group_scores, top_k)
+        if self.collapse_duplicates:
+            return self.duplicate_groups.latest(groups), group_scores[groups]
+        indices, scores = self.duplicate_groups.expand(groups, group_scores[groups])
+        return indices[:top_k], scores[:top_k]
 
-            self.embeddings.append(np.load(embedding_path))
+    def _rerank(self, query_embedding: np.ndarray, candidates: np.ndarray, top_k: int):
+        """
+        Re-score candidates from the quantized scan with the float32 matrix and keep the top-k.
+        Candidates are visited in index order, so ties break exactly as in the exhaustive search.
+        """
+        candidates = np.sort(candidates)
+        if self.deleted is not None:
+            candidates = candidates[~self.deleted[candidates]]
+        scores = self.embedding_matrix[candidates] @ query_embedding
+        order = top_k_indices(scores, top_k)
+        return candidates[order], scores[order]
 
-            with open(metadata_path, "r") as f:
-                self.metadata.extend(json.load(f))
+    @property
+    def exhaustive(self) -> bool:
+        """
+        Whether rankings consider every live document, so fewer than top_k results means there are no more.
+        The IVF and quantized scans only consider candidates, and collapsing ranks a bounded number of rows.
+        """
+        if self.unique_matrix is not None:
+            return True
+        if self.ann_index is not None or self.quantized is not None:
+            return False
+        return not (self.collapse_duplicates and self.duplicate_groups is not None)
 
-        logger.info(f"Loaded {len(self.metadata)} documents, size of embeddings {len(self.embeddings)}.")
+    def _rank(self, query_embedding: np.ndarray, top_k: int):
+        """
+        Select the top-k documents for a normalized query embedding, scanning the duplicate groups
+        or collapsing duplicates when enabled.
+        """
+        if self.unique_matrix is not None:
+            return self._rank_groups(self.unique_matrix @ query_embedding, top_k)
+        if self.collapse_duplicates and self.duplicate_groups is not None:
+            return self.duplicate_groups.collapse(*self._rank_rows(query_embedding, self._collapse_depth(top_k)), top_k)
+        return self._rank_rows(query_embedding, top_k)
 
-    def search(self, query: str, top_k: int = 1000):
+    def _rank_rows(self, query_embedding: np.ndarray, top_k: int):
         """
-        Search for the top-k documents similar to the query.
+        Exhaustively score a normalized query embedding and select the top-k documents.
+        Rows are pre-normalized, so cosine similarity is a matrix-vector product per shard;
+        each shard contributes only its own top-k, which are merged into the global top-k.
+        :param query_embedding: L2-normalized float32 query vector.
+        :param top_k: Number of top results to return.
+        :return: Tuple of (document indices, scores), best first.
+        """
+        if self.ann_index is not None:
+            ranked = self.ann_index.search(self.embedding_matrix, query_embedding, self._live_depth(top_k))
+            return self._drop_deleted(*ranked, top_k)
+        if self.quantized is not None:
+            candidates, _ = self.quantized.search(query_embedding, self._live_depth(max(top_k, self.rerank_depth)))
+            return self._rerank(query_embedding, candidates, top_k)
+
+        shard_indices, shard_scores = [], []
+        offset = 0
+        for i, shard in enumerate(self.embeddings):
+            similarities = shard @ query_embedding
+            if self.deleted is not None:
+                similarities[self.shard_deleted[i]] = -np.inf
+            indices = top_k_indices(similarities, top_k)
+            shard_indices.append(indices + offset)
+            shard_scores.append(similarities[indices])
+            offset += shard.shape[0]
+        return self._drop_deleted(*merge_top_k(shard_indices, shard_scores, top_k), top_k)
+
+    def _rank_batch(self, query_embeddings: np.ndarray, top_k: int):
+        """
+        Select the top-k documents for each of a batch of normalized query embeddings, as `_rank` does.
+        """
+        if self.unique_matrix is not None:
+            return [self._rank_groups(group_scores, top_k) for group_scores in query_embeddings @ self.unique_matrix.T]
+        if self.collapse_duplicates and self.duplicate_groups is not None:
+            return [
+                self.duplicate_groups.collapse(indices, scores, top_k)
+                for indices, scores in self._rank_rows_batch(query_embeddings, self._collapse_depth(top_k))
+            ]
+        return self._rank_rows_batch(query_embeddings, top_k)
+
+    def _rank_rows_batch(self, query_embeddings: np.ndarray, top_k: int):
+        """
+        Exhaustively score a batch of normalized query embeddings and select the top-k documents per query.
+        Each shard is scored against all queries with one matrix-matrix product.
+        :param query_embeddings: 2D array of L2-normalized float32 query vectors, one per row.
+        :param top_k: Number of top results to return per query.
+        :return: List of (document indices, scores) tuples, one per query, best first.
+        """
+        if self.ann_index is not None:
+            return [
+                self._drop_deleted(*self.ann_index.search(self.embedding_matrix, query_embedding, self._live_depth(top_k)), top_k)
+                for query_embedding in query_embeddings
+            ]
+        if self.quantized is not None:
+            candidate_lists = self.quantized.search_batch(query_embeddings, self._live_depth(max(top_k, self.rerank_depth)))
+            return [
+                self._rerank(query_embedding, candidates, top_k)
+                for query_embedding, (candidates, _) in zip(query_embeddings, candidate_lists)
+            ]
+
+        num_queries = query_embeddings.shape[0]
+        shard_indices = [[] for _ in range(num_queries)]
+        shard_scores = [[] for _ in range(num_queries)]
+        offset = 0
+        for i, shard in enumerate(self.embeddings):
+            # (num_queries, shard_rows): one contiguous row of similarities per query
+            similarities = query_embeddings @ shard.T
+            if self.deleted is not None:
+                similarities[:, self.shard_deleted[i]] = -np.inf
+            for q in range(num_queries):
+                indices = top_k_indices(similarities[q], top_k)
+                shard_indices[q].append(indices + offset)
+                shard_scores[q].append(similarities[q, indices])
+            offset += shard.shape[0]
+        return [self._drop_deleted(*merge_top_k(shard_indices[q], shard_scores[q], top_k), top_k) for q in range(num_queries)]
+
+    def fetch_metadata(self, indices: Sequence[int], fields: Optional[Sequence[str]] = None) -> List[dict]:
+        """
+        Read the metadata records of the given documents, keeping only the requested fields.
+        :param indices: Document indices (embedding rows).
+        :param fields: Field paths such as "title" or "metadata.requirements", or None for whole records.
+        :return: One record per index, in the same order.
+        """
+        return [fetch_record(self.metadata, i, fields) for i in indices]
+
+    def _build_results(self, top_indices: np.ndarray, top_scores: np.ndarray, fields: Optional[Sequence[str]] = None) -> List[dict]:
+        """
+        Pair ranked document indices with their scores and (projected) metadata.
+        """
+        return [
+            {"score": score, "index": int(i), "metadata": metadata}
+            for i, score, metadata in zip(top_indices, top_scores, self.fetch_metadata(top_indices, fields))
+        ]
+
+    def rank(self, query: str, top_k: int = 1000):
+        """
+        Rank documents for a query without fetching any metadata.
         :param query: Query string.
         :param top_k: Number of top results to return.
-        :return: List of top-k results with metadata.
+        :return: Tuple of (document indices, scores), best first.
         """
         start_time = time.perf_counter()  # Start timing
 
-          # Encode the query
-        query_embedding = self.model.encode(query, convert_to_numpy=True)
+        # Encode and normalize the query
+        query_embedding = self._encode([query])[0]
         end_time = time.perf_counter()  # End timing
         query_encoding_time = end_time - start_time  # Calculate elapsed time
 
-        # Combine all embeddings into one array
-        all_embeddings = np.vstack(self.embeddings)
-
-        # Compute cosine similarity
-        similarities = cosine_similarity([query_embedding], all_embeddings)[0]
-        top_indices = np.argsort(similarities)[-top_k:][::-1]  # Get top-k indices
+        top_indices, top_scores = self._rank(query_embedding, top_k)
 
         end_time = time.perf_counter()  # End timing
         processing_time = end_time - start_time  # Calculate elapsed time
 
         print(f"Query encoding time: {query_encoding_time:.4f} seconds and query processing time: {processing_time:.4f} seconds")  # Print
 
-        logger.info(f"Size of similarities {len(similarities)} ")
+        logger.info(f"Size of similarities {self.embedding_matrix.shape[0]} ")
+        return top_indices, top_scores
+
+    def search(self, query: str, top_k: int = 1000, fields: Optional[Sequence[str]] = None):
+        """
+        Search for the top-k documents similar to the query.
+        :param query: Query string.
+        :param top_k: Number of top results to return.
+        :param fields: Metadata fields to return, e.g. ["title", "metadata.requirements"]; None returns whole records.
+                       Only the final top-k records are read.
+        :return: List of top-k results with metadata.
+        """
+        top_indices, top_scores = self.rank(query, top_k)
         # Fetch corresponding metadata
-        results = [{"score": similarities[i], "metadata": self.metadata[i]} for i in top_indices]
-        return results
\ No newline at end of file
+        return self._build_results(top_indices, top_scores, fields)
+
+    def rank_batch(self, queries: List[str], top_k: int = 1000):
+        """
+        Rank documents for each of several queries without fetching any metadata.
+        All queries are encoded in one model call and scored with one matrix-matrix product per shard.
+        :param queries: List of query strings.
+        :param top_k: Number of top results to return per query.
+        :return: List of (document indices, scores) tuples, in the same order as `queries`.
+        """
+        if not queries:
+            return []
+
+        start_time = time.perf_counter()  # Start timing
+
+        query_embeddings = self._encode(queries)
+        end_time = time.perf_counter()  # End timing
+        query_encoding_time = end_time - start_time  # Calculate elapsed time
+
+        ranked = self._rank_batch(query_embeddings, top_k)
+
+        end_time = time.perf_counter()  # End timing
+        processing_time = end_time - start_time  # Calculate elapsed time
+
+        logger.info(
+            f"Batch of {len(queries)} queries: encoding time {query_encoding_time:.4f} seconds, "
+            f"processing time {processing_time:.4f} seconds"
+        )
+        return ranked
+
+    def search_batch(self, queries: List[str], top_k: int = 1000, fields: Optional[Sequence[str]] = None):
+        """
+        Search for the top-k documents for each of several queries.
+        :param queries: List of query strings.
+        :param top_k: Number of top results to return per query.
+        :param fields: Metadata fields to return, as in `search`.
+        :return: List of result lists, in the same order as `queries`, each shaped like `search` output.
+        """
+        return [self._build_results(top_indices, top_scores, fields) for top_indices, top_scores in self.rank_batch(queries, top_k)]
@@ -0,0 +1,350 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from multiprocessing.connection import Client
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from backend.app.models.vector_store import merge_top_k
+from backend.app.services.query_service import QueryEncoder
+from backend.app.services.shard_search import parse_address
+from backend.app.utils.cache import EmbeddingCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Hedge delay while a replica has answered fewer requests than this, and the latency samples kept per replica
+MIN_LATENCY_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+class ShardError(Exception):
+    """
+    Raised when a shard node answers a request with an error.
+    """
+
+
+class ShardUnavailable(Exception):
+    """
+    Raised when no replica of a shard group answered in time.
+    """
+
+
+class ShardClient:
+    """
+    Connections to one shard node (ShardServer), reused across requests; a connection carries one
+    request at a time, so concurrent requests open more connections.
+    """
+    def __init__(self, address: Tuple[str, int], authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._idle = queue.LifoQueue()
+        self._request_ids = itertools.count()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # Seconds per successful request, most recent last
+
+    def call(self, method: str, *args, timeout: Optional[float] = None):
+        """
+        Run a ShardSearchService method on the node.
+        :raises TimeoutError: If the node did not answer within timeout; the connection is dropped.
+        :raises ShardError: If the method failed on the node.
+        """
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = Client(self.address, authkey=self.authkey)
+        request_id = next(self._request_ids)
+        start_time = time.perf_counter()
+        try:
+            connection.send((request_id, method, args))
+            if not connection.poll(timeout):
+                raise TimeoutError(f"Shard {self.address[0]}:{self.address[1]} did not answer {method} within {timeout} s.")
+            reply_id, ok, result = connection.recv()
+            if reply_id != request_id:
+                raise ShardError(f"Shard {self.address[0]}:{self.address[1]} answered request {reply_id} instead of {request_id}.")
+        except BaseException:
+            connection.close()
+            raise
+        self._idle.put(connection)
+        if not ok:
+            raise ShardError(f"Shard {self.address[0]}:{self.address[1]}: {result}")
+        self.latencies.append(time.perf_counter() - start_time)
+        return result
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class ShardCluster:
+    """
+    Scatters requests over shard groups, each serving a disjoint part of the index from one or more
+    replica nodes, and gathers their answers. A request goes to one replica of every group, in
+    round-robin order; if that replica has not answered after the hedge delay, the same request is
+    sent to the next replica and the first answer wins. Failed replicas are skipped the same way,
+    so slow or lost nodes cost a hedge delay instead of a timeout while a replica is left.
+    """
+    def __init__(
+        self,
+        shards: Sequence[Sequence[str]],
+        authkey: bytes,
+        timeout: float = 2.0,
+        hedge_delay: Optional[float] = None,
+        hedge_percentile: float = 95.0,
+        min_hedge_delay: float = 0.002,
+        initial_hedge_delay: float = 0.05,
+        allow_partial: bool = False,
+    ):
+        """
+        :param shards: One list of "host:port" replica addresses per shard group.
+        :param authkey: Key shared with the shard nodes.
+        :param timeout: Seconds to wait for any replica of a group before giving up on it.
+        :param hedge_delay: Seconds before a request is also sent to the next replica; None adapts it to
+                            the hedge_percentile of the replica's recent latencies.
+        :param hedge_percentile: Latency percentile of the adaptive hedge delay; 95 hedges about 5% of requests.
+        :param min_hedge_delay: Lower bound of the adaptive hedge delay.
+        :param initial_hedge_delay: Hedge delay until a replica has answered MIN_LATENCY_SAMPLES requests.
+        :param allow_partial: Answer from the groups that responded when a whole group is unavailable,
+                              instead of failing the request.
+        """
+        self.groups = [[ShardClient(parse_address(address), authkey) for address in group] for group in shards]
+        if not self.groups or not all(self.groups):
+            raise ValueError("ShardCluster needs at least one replica in every shard group.")
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.initial_hedge_delay = initial_hedge_delay
+        self.allow_partial = allow_partial
+        num_replicas = sum(len(group) for group in self.groups)
+        # Group requests wait for replica requests, so they run on separate pools
+        self.scatter_executor = ThreadPoolExecutor(max_workers=4 * len(self.groups), thread_name_prefix="scatter")
+        self.replica_executor = ThreadPoolExecutor(max_workers=8 * num_replicas, thread_name_prefix="shard-rpc")
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedges_won = 0
+        self.partial = 0
+
+        self.refresh()
+        logger.info(f"Connected to {len(self.groups)} shard groups ({num_replicas} replicas), {self.num_docs} documents.")
+
+    def refresh(self) -> str:
+        """
+        Ask every group which index version and rows it serves, e.g. after the shard nodes were restarted
+        on a new index, and route metadata requests accordingly.
+        :return: The index version served by the groups.
+        """
+        infos = [self._call(group, "info") for group in range(len(self.groups))]
+        versions = {info["version"] for info in infos}
+        if len(versions) > 1:
+            logger.warning(f"Shard groups serve different index versions: {sorted(versions)}")
+        ranges = sorted((start, end, group) for group, info in enumerate(infos) for start, end in info["ranges"])
+        range_starts = np.array([start for start, _, _ in ranges], dtype=np.int64)
+        range_ends = np.array([end for _, end, _ in ranges], dtype=np.int64)
+        covered = int((range_ends - range_starts).sum())
+        if covered != infos[0]["num_docs"]:
+            logger.warning(f"Shard groups cover {covered} rows of an index of {infos[0]['num_docs']} documents.")
+        with self._lock:
+            self.version = infos[0]["version"]
+            self.num_docs = infos[0]["num_docs"]
+            self.range_starts, self.range_ends = range_starts, range_ends
+            self.range_groups = np.array([group for _, _, group in ranges], dtype=np.int64)
+        return self.version
+
+    def _hedge_delay(self, replica: ShardClient) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        latencies = list(replica.latencies)
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, float(np.percentile(latencies, self.hedge_percentile)))
+
+    @staticmethod
+    def _first_success(pending: Dict, errors: List[Exception], timeout: float):
+        """
+        Wait up to timeout for the first successful reply among the pending replica requests.
+        :return: Tuple of (whether one succeeded, its replica, its result).
+        """
+        end = time.monotonic() + max(0.0, timeout)
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, end - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                replica = pending.pop(future)
+                try:
+                    return True, replica, future.result()
+                except Exception as e:
+                    errors.append(e)
+        return False, None, None
+
+    def _call(self, group: int, method: str, *args):
+        """
+        Run a method on one replica of a group, hedging to the next replicas while it is slow or failing.
+        :raises ShardUnavailable: If no replica answered within the timeout.
+        """
+        replicas = self.groups[group]
+        start = next(self._round_robin) % len(replicas)
+        order = replicas[start:] + replicas[:start]
+        deadline = time.monotonic() + self.timeout
+        pending, errors = {}, []
+
+        for attempt, replica in enumerate(order):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if attempt:
+                with self._lock:
+                    self.hedged += 1
+            pending[self.replica_executor.submit(replica.call, method, *args, timeout=remaining)] = replica
+            # The last replica has until the deadline; the others only until the hedge delay
+            wait_for = remaining if attempt == len(order) - 1 else min(self._hedge_delay(replica), remaining)
+            succeeded, winner, result = self._first_success(pending, errors, wait_for)
+            if succeeded:
+                if winner is not order[0]:
+                    with self._lock:
+                        self.hedges_won += 1
+                return result
+
+        succeeded, winner, result = self._first_success(pending, errors, deadline - time.monotonic())
+        if succeeded:
+            if winner is not order[0]:
+                with self._lock:
+                    self.hedges_won += 1
+            return result
+        reason = "; ".join(str(e) for e in errors) or f"no answer within {self.timeout} s"
+        raise ShardUnavailable(f"Shard group {group} ({len(replicas)} replicas) is unavailable: {reason}")
+
+    def _scatter(self, calls: Dict[int, tuple]) -> Dict[int, object]:
+        """
+        Run one method call per group concurrently.
+        :param calls: Group -> (method, *args).
+        :return: Group -> result, without the groups that were unavailable if allow_partial.
+        """
+        futures = {group: self.scatter_executor.submit(self._call, group, *call) for group, call in calls.items()}
+        results = {}
+        for group, future in futures.items():
+            try:
+                results[group] = future.result()
+            except ShardUnavailable as e:
+                if not self.allow_partial:
+                    raise
+                logger.warning(f"{e} Answering without it.")
+        with self._lock:
+            self.requests += 1
+            self.partial += len(results) < len(calls)
+        return results
+
+    def rank_embeddings(self, query_embeddings: np.ndarray, top_k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Select the top-k documents for each of a batch of normalized query embeddings: every group
+        returns its own top-k, which are merged into the global top-k.
+        :return: List of (document indices, scores) tuples, one per query, best first.
+        """
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        results = self._scatter({group: ("rank_embeddings", query_embeddings, top_k) for group in range(len(self.groups))})
+        return [
+            merge_top_k([ranked[q][0] for ranked in results.values()], [ranked[q][1] for ranked in results.values()], top_k)
+            for q in range(query_embeddings.shape[0])
+        ]
+
+    def fetch_metadata(self, indices: Sequence[int], fields: Optional[Sequence[str]] = None) -> List[dict]:
+        """
+        Read the metadata records of the given documents from the groups serving them.
+        Records of unavailable groups are None if allow_partial.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        with self._lock:
+            range_starts, range_ends, range_groups = self.range_starts, self.range_ends, self.range_groups
+        ranges = np.searchsorted(range_starts, indices, side="right") - 1
+        if len(indices) and ((ranges < 0).any() or (indices >= range_ends[ranges]).any()):
+            raise KeyError("Documents outside the rows served by the shard groups.")
+        groups = range_groups[ranges]
+        positions = {int(group): np.flatnonzero(groups == group) for group in np.unique(groups)}
+        results = self._scatter({group: ("fetch_metadata", indices[rows].tolist(), fields) for group, rows in positions.items()})
+
+        records = [None] * len(indices)
+        for group, group_records in results.items():
+            for position, record in zip(positions[group], group_records):
+                records[position] = record
+        return records
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {"requests": self.requests, "hedged": self.hedged, "hedges_won": self.hedges_won, "partial": self.partial}
+        stats["hedge_delay_ms"] = [[self._hedge_delay(replica) * 1000 for replica in group] for group in self.groups]
+        return stats
+
+    def close(self):
+        self.scatter_executor.shutdown(wait=True)
+        self.replica_executor.shutdown(wait=True)
+        for group in self.groups:
+            for replica in group:
+                replica.close()
+
+
+class ScatterGatherSearchService(QueryEncoder):
+    """
+    Dense retrieval over an index split across shard nodes (shard_search.py): queries are encoded here,
+    ranked by every shard group and merged, and only the final hits' metadata is fetched from the
+    nodes holding it. Drop-in replacement for QueryService behind HybridSearchService.
+    """
+    def __init__(
+        self,
+        model_name: str,
+        cluster: ShardCluster,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        model=None,
+    ):
+        """
+        :param model_name: Hugging Face model name for encoding; the model the index was built with.
+        :param cluster: ShardCluster connected to the shard nodes.
+        :param embedding_cache: Cache of query embeddings consulted before running the encoder, or None.
+        :param model: Already loaded encoder for model_name, as in QueryService.
+        """
+        super().__init__(model_name, embedding_cache=embedding_cache, model=model)
+        self.cluster = cluster
+
+    def close(self):
+        """
+        Nothing to release: the cluster outlives index reloads and is closed by its owner.
+        """
+
+    def fetch_metadata(self, indices: Sequence[int], fields: Optional[Sequence[str]] = None) -> List[dict]:
+        return self.cluster.fetch_metadata(indices, fields)
+
+    def _build_results(self, top_indices: np.ndarray, top_scores: np.ndarray, fields: Optional[Sequence[str]] = None) -> List[dict]:
+        return [
+            {"score": score, "index": int(i), "metadata": metadata}
+            for i, score, metadata in zip(top_indices, top_scores, self.fetch_metadata(top_indices, fields))
+        ]
+
+    def rank(self, query: str, top_k: int = 1000):
+        """
+        Rank documents for a query without fetching any metadata.
+        :return: Tuple of (document indices, scores), best first.
+        """
+        return self.rank_batch([query], top_k)[0]
+
+    def rank_batch(self, queries: List[str], top_k: int = 1000):
+        """
+        Rank documents for each of several queries, encoded in one model call and scattered as one batch.
+        :return: List of (document indices, scores) tuples, in the same order as `queries`.
+        """
+        if not queries:
+            return []
+        return self.cluster.rank_embeddings(self._encode(queries), top_k)
+
+    def search(self, query: str, top_k: int = 1000, fields: Optional[Sequence[str]] = None):
+        return self._build_results(*self.rank(query, top_k), fields)
+
+    def search_batch(self, queries: List[str], top_k: int = 1000, fields: Optional[Sequence[str]] = None):
+        return [self._build_results(top_indices, top_scores, fields) for top_indices, top_scores in self.rank_batch(queries, top_k)]
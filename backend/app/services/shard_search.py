@@ -0,0 +1,234 @@
+import argparse
+import logging
+import os
+import sys
+import threading
+import numpy as np
+from multiprocessing.connection import Listener
+from typing import List, Optional, Sequence, Tuple
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from backend.app.models.delta_index import load_tombstones
+from backend.app.models.document_store import load_metadata, project_record
+from backend.app.models.index_manifest import index_version, read_manifest
+from backend.app.models.vector_store import (
+    list_index_files,
+    load_embedding_matrix,
+    merge_top_k,
+    read_shard_sizes,
+    shard_number,
+    split_shards,
+    top_k_indices,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Methods of ShardSearchService a coordinator may call
+SHARD_METHODS = ("info", "rank_embeddings", "fetch_metadata")
+
+# Environment variable holding the key shard nodes and coordinators authenticate each other with
+AUTHKEY_ENV = "SHARD_AUTHKEY"
+DEFAULT_AUTHKEY = "local-search"
+
+
+def shard_authkey(authkey: Optional[str] = None) -> bytes:
+    """
+    The key shard connections are authenticated with: the given one, $SHARD_AUTHKEY, or a well-known
+    default that is only fit for a single box.
+    """
+    authkey = authkey or os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        logger.warning(f"${AUTHKEY_ENV} is not set, using the default shard key; set it on any shared network.")
+        authkey = DEFAULT_AUTHKEY
+    return authkey.encode()
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """
+    Split "host:port" into a (host, port) tuple.
+    """
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class ShardSearchService:
+    """
+    Exhaustive search over some of the embedding shards of an index: one node of a scatter-gather
+    deployment (ScatterGatherSearchService). Only the node's own embeddings_N.npy / metadata_N.json
+    files and the manifest need to be present. Rows keep their global numbers, taken from the
+    per-shard row counts in the manifest, so the rankings of all nodes merge like the shards of one
+    QueryService.
+    """
+    def __init__(self, index_dir: str, shard_numbers: Sequence[int]):
+        """
+        :param index_dir: Index directory.
+        :param shard_numbers: N of the embeddings_N.npy files served by this node.
+        """
+        self.index_dir = index_dir
+        embedding_paths, metadata_paths = list_index_files(index_dir)
+        local = {shard_number(os.path.basename(path)): i for i, path in enumerate(embedding_paths)}
+        missing = sorted(set(shard_numbers) - set(local))
+        if missing:
+            raise FileNotFoundError(f"Shards {missing} not found in {index_dir}.")
+        self.shard_numbers = sorted(set(shard_numbers))
+
+        # Global row offset of every shard, from the manifest or, with every shard present, the files
+        manifest = read_manifest(index_dir) or {}
+        all_sizes = manifest.get("shard_sizes")
+        if all_sizes is None:
+            if sorted(local) != list(range(1, len(local) + 1)):
+                raise ValueError(f"The manifest in {index_dir} has no shard_sizes; rebuild the index to serve some of its shards.")
+            all_sizes = read_shard_sizes(embedding_paths)
+        shard_offsets = np.concatenate([[0], np.cumsum(all_sizes)]).astype(np.int64)
+        self.num_docs = int(shard_offsets[-1])
+
+        selected = [local[number] for number in self.shard_numbers]
+        self.embedding_matrix, sizes = load_embedding_matrix([embedding_paths[i] for i in selected])
+        if sizes != [all_sizes[number - 1] for number in self.shard_numbers]:
+            raise ValueError(f"Shards {self.shard_numbers} in {index_dir} do not match the row counts in the manifest.")
+        self.embeddings = split_shards(self.embedding_matrix, sizes)
+        self.offsets = np.array([shard_offsets[number - 1] for number in self.shard_numbers], dtype=np.int64)
+        self.sizes = np.array(sizes, dtype=np.int64)
+        self.metadata = [load_metadata([metadata_paths[i]]) for i in selected]
+        self.version = index_version(index_dir)
+
+        # Rows deleted by incremental updates, per shard
+        self.shard_deleted = [None] * len(selected)
+        try:
+            deleted = load_tombstones(index_dir, self.num_docs)
+        except ValueError as e:
+            logger.warning(f"{e} Serving without deletions.")
+            deleted = None
+        if deleted is not None:
+            self.shard_deleted = [np.flatnonzero(deleted[offset:offset + size]) for offset, size in zip(self.offsets, self.sizes)]
+        logger.info(f"Serving shards {self.shard_numbers} of {index_dir}: {self.embedding_matrix.shape[0]} of {self.num_docs} documents.")
+
+    def info(self) -> dict:
+        """
+        What this node serves: index version, shard numbers and their global row ranges.
+        """
+        return {
+            "version": self.version,
+            "shards": self.shard_numbers,
+            "ranges": [(int(offset), int(offset + size)) for offset, size in zip(self.offsets, self.sizes)],
+            "num_docs": self.num_docs,
+        }
+
+    def rank_embeddings(self, query_embeddings: np.ndarray, top_k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Select this node's top-k documents for each of a batch of normalized query embeddings,
+        with one matrix-matrix product per shard.
+        :return: List of (global document indices, scores) tuples, one per query, best first.
+        """
+        num_queries = query_embeddings.shape[0]
+        shard_indices = [[] for _ in range(num_queries)]
+        shard_scores = [[] for _ in range(num_queries)]
+        for shard, offset, deleted in zip(self.embeddings, self.offsets, self.shard_deleted):
+            similarities = query_embeddings @ shard.T
+            if deleted is not None:
+                similarities[:, deleted] = -np.inf
+            for q in range(num_queries):
+                indices = top_k_indices(similarities[q], top_k)
+                shard_indices[q].append(indices + offset)
+                shard_scores[q].append(similarities[q, indices])
+
+        ranked = []
+        for q in range(num_queries):
+            indices, scores = merge_top_k(shard_indices[q], shard_scores[q], top_k)
+            live = scores > -np.inf
+            ranked.append((indices[live], scores[live]))
+        return ranked
+
+    def fetch_metadata(self, indices: Sequence[int], fields: Optional[Sequence[str]] = None) -> List[dict]:
+        """
+        Read the metadata records of documents served by this node, keeping only the requested fields.
+        :param indices: Global document indices.
+        """
+        records = []
+        for index in indices:
+            shard = int(np.searchsorted(self.offsets, index, side="right")) - 1
+            if shard < 0 or index >= self.offsets[shard] + self.sizes[shard]:
+                raise KeyError(f"Document {index} is not served by shards {self.shard_numbers}.")
+            records.append(project_record(self.metadata[shard][index - self.offsets[shard]], fields))
+        return records
+
+
+class ShardServer:
+    """
+    Serves a ShardSearchService to coordinators over multiprocessing.connection, one thread per
+    connection. Requests are (request id, method, args) tuples and replies (request id, ok, result);
+    they are pickled, so only peers that know the authkey are accepted. Meant for a trusted network.
+    """
+    def __init__(self, service, address: Tuple[str, int], authkey: bytes):
+        """
+        :param service: ShardSearchService, or anything with the SHARD_METHODS.
+        :param address: (host, port) to listen on; port 0 picks a free port.
+        :param authkey: Key shared with the coordinators.
+        """
+        self.service = service
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.closed = False
+
+    def serve_forever(self):
+        logger.info(f"Shard server listening on {self.address[0]}:{self.address[1]}.")
+        while not self.closed:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                if self.closed:
+                    break
+                continue
+            except Exception as e:
+                logger.warning(f"Rejected a shard connection: {e}")
+                continue
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection):
+        with connection:
+            while True:
+                try:
+                    request_id, method, args = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if method not in SHARD_METHODS:
+                        raise ValueError(f"Unknown shard method: {method}")
+                    reply = (request_id, True, getattr(self.service, method)(*args))
+                except Exception as e:
+                    logger.error(f"Shard request {method} failed: {e}")
+                    reply = (request_id, False, f"{type(e).__name__}: {e}")
+                try:
+                    connection.send(reply)
+                except OSError:
+                    return
+
+    def close(self):
+        self.closed = True
+        self.listener.close()
+
+
+def main():
+    """
+    Serve some shards of an index:
+        SHARD_AUTHKEY=... python -m backend.app.services.shard_search --index-dir ./index --shards 1 2 --port 9001
+    """
+    parser = argparse.ArgumentParser(description="Serve some embedding shards of an index to a scatter-gather coordinator.")
+    parser.add_argument("--index-dir", default="./index")
+    parser.add_argument("--shards", type=int, nargs="+", required=True, help="N of the embeddings_N.npy files to serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    args = parser.parse_args()
+
+    server = ShardServer(ShardSearchService(args.index_dir, args.shards), (args.host, args.port), shard_authkey())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,81 @@
-def perform_sparse_search(query: str):
+import logging
+import time
+from typing import List, Optional, Sequence
+
+from backend.app.models.document_store import MetadataStore, fetch_record, open_metadata
+from backend.app.models.sparse_model import BM25Index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SparseSearchService:
     """
-    Perform sparse keyword-based search.
-    Replace this logic with actual sparse search using Elasticsearch or custom logic.
+    Lexical BM25 search over the indexed field, using the inverted index IndexingService writes
+    next to the dense shards. Needs no transformer model, so exact-title queries are cheap.
     """
-    return [
-        {"title": f"Sparse result 1 for {query}", "snippet": "Some sparse snippet 1"},
-        {"title": f"Sparse result 2 for {query}", "snippet": "Some sparse snippet 2"},
-    ]
+    def __init__(self, index_dir: str = "./index", metadata: Optional[Sequence[dict]] = None):
+        """
+        Initialize the sparse search service.
+        :param index_dir: Directory containing sparse_index.npz and metadata files (compact store or JSON shards).
+        :param metadata: Already loaded per-document metadata (e.g. QueryService.metadata) to share
+                         instead of loading it again.
+        """
+        self.index_dir = index_dir
+        self.index = BM25Index.load(index_dir)
+        self.metadata = metadata if metadata is not None else open_metadata(index_dir)
+        self._owns_metadata = metadata is None
+
+        if self.index.num_docs != len(self.metadata):
+            raise ValueError(f"Mismatch: sparse index has {self.index.num_docs} documents, metadata has {len(self.metadata)}.")
+        logger.info(f"Loaded sparse index with {len(self.index.terms)} terms over {self.index.num_docs} documents.")
+
+    def close(self):
+        """
+        Release the inverted index, and the metadata store unless it was shared by the caller.
+        """
+        if self._owns_metadata and isinstance(self.metadata, MetadataStore):
+            self.metadata.close()
+        self.metadata = []
+        self.index = None
+
+    @property
+    def exhaustive(self) -> bool:
+        """
+        BM25 scores every document containing a query term, so fewer than top_k results means there are no more.
+        """
+        return True
+
+    def rank(self, query: str, top_k: int = 1000):
+        """
+        Rank documents for a query without fetching any metadata.
+        :param query: Query string.
+        :param top_k: Number of top results to return.
+        :return: Tuple of (document indices, scores), best first.
+        """
+        start_time = time.perf_counter()
+        top_indices, top_scores = self.index.search(query, top_k)
+        processing_time = time.perf_counter() - start_time
+
+        logger.info(f"Sparse query processing time: {processing_time:.6f} seconds, {len(top_indices)} matches")
+        return top_indices, top_scores
+
+    def fetch_metadata(self, indices: Sequence[int], fields: Optional[Sequence[str]] = None) -> List[dict]:
+        """
+        Read the metadata records of the given documents, keeping only the requested fields.
+        """
+        return [fetch_record(self.metadata, i, fields) for i in indices]
+
+    def search(self, query: str, top_k: int = 1000, fields: Optional[Sequence[str]] = None):
+        """
+        Search for the top-k documents matching the query terms.
+        :param query: Query string.
+        :param top_k: Number of top results to return.
+        :param fields: Metadata fields to return, as in QueryService.search; None returns whole records.
+        :return: List of top-k results with metadata, shaped like QueryService.search output.
+        """
+        top_indices, top_scores = self.rank(query, top_k)
+        return [
+            {"score": score, "index": int(i), "metadata": metadata}
+            for i, score, metadata in zip(top_indices, top_scores, self.fetch_metadata(top_indices, fields))
+        ]
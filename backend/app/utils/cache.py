@@ -0,0 +1,239 @@
+import csv
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key for a query: NFKC-normalized with surrounding and repeated whitespace removed.
+    Case is kept because the encoder is cased and would embed "it berater" and "IT Berater" differently.
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+
+def load_query_frequencies(csv_file: str) -> List[str]:
+    """
+    Read a query log with "query" and "frequency" columns, most frequent query first.
+    :param csv_file: Path to the CSV file (e.g. queries_frequency.csv).
+    :return: List of query strings.
+    """
+    with open(csv_file, "r", encoding="utf-8") as f:
+        rows = [row for row in csv.DictReader(f) if row.get("query")]
+    rows.sort(key=lambda row: -int(row.get("frequency") or 0))
+    return [row["query"].strip() for row in rows]
+
+
+def _deep_sizeof(value) -> int:
+    """
+    Approximate memory of a JSON-like value: containers plus everything they hold.
+    """
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_deep_sizeof(key) + _deep_sizeof(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_deep_sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class EmbeddingCache:
+    """
+    Bounded, thread-safe LRU cache of query embeddings keyed on the normalized query string.
+    Entries are evicted least-recently-used first once max_size is reached, and expire after
+    ttl seconds if a ttl is set. Cached arrays are read-only so callers cannot corrupt them.
+    """
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+        :param max_size: Maximum number of cached embeddings.
+        :param ttl: Seconds after which an entry expires, or None to keep entries until evicted.
+        :param clock: Monotonic time source, replaceable in tests.
+        """
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive, got {max_size}.")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (embedding, insertion time)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """
+        Look up the embedding of a query, counting a hit or a miss.
+        :param query: Query string.
+        :return: The cached embedding, or None.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, query: str, embedding: np.ndarray):
+        """
+        Cache the embedding of a query, evicting the least recently used entries if full.
+        :param query: Query string.
+        :param embedding: Query embedding; it is copied and stored read-only.
+        """
+        embedding = np.array(embedding, copy=True)
+        embedding.setflags(write=False)
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = (embedding, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all entries; counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Current size and hit/miss counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of ranked result lists keyed on (normalized query, index version).
+    Each entry holds the ranking to a fixed depth (e.g. the top 1000), so one entry serves every
+    smaller top_k. Rankings that depend on how many candidates were considered (fused hybrid rankings)
+    are additionally keyed on that candidate depth. The cache is bounded by the estimated memory of its
+    result lists, extrapolated from the size of the first result. HybridSearchService caches
+    {"score", "index"} hits and reads metadata per request, so entries stay small even at depth 1000.
+    """
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, depth: int = 1000):
+        """
+        Initialize the cache.
+        :param max_bytes: Upper bound on the estimated memory of all cached result lists.
+        :param depth: Number of results fetched and cached per query, regardless of the requested top_k.
+        """
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive, got {max_bytes}.")
+        self.max_bytes = max_bytes
+        self.depth = depth
+        self._entries = OrderedDict()  # key -> (results, complete, nbytes)
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(query: str, version: str, candidates: Optional[int]) -> Tuple[str, str, Optional[int]]:
+        return normalize_query(query), version, candidates
+
+    @staticmethod
+    def _estimate_nbytes(results: List[dict]) -> int:
+        if not results:
+            return sys.getsizeof(results)
+        first = results[0]
+        per_result = _deep_sizeof(first)
+        return sys.getsizeof(results) + len(results) * per_result
+
+    def get(self, query: str, version: str, top_k: int, candidates: Optional[int] = None) -> Optional[List[dict]]:
+        """
+        Look up the top_k results of a query against an index version, counting a hit or a miss.
+        An entry answers any top_k up to its depth, or any top_k at all if it holds every match.
+        :param query: Query string.
+        :param version: Index version stamp the results were computed on.
+        :param top_k: Number of results requested.
+        :param candidates: Candidate depth the ranking was computed with, if the ranking depends on it.
+        :return: The cached results, or None.
+        """
+        key = self._key(query, version, candidates)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (top_k > len(entry[0]) and not entry[1]):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0][:top_k]
+
+    def put(self, query: str, version: str, results: List[dict], depth: int, exhaustive: bool = False,
+            candidates: Optional[int] = None):
+        """
+        Cache the ranking of a query, evicting least recently used entries until it fits.
+        :param query: Query string.
+        :param version: Index version stamp the results were computed on.
+        :param results: Ranked results, best first.
+        :param depth: Number of results that were requested.
+        :param exhaustive: Whether the ranker considered every document, so that fewer results than depth means
+                           the ranking is complete. Approximate rankers (ANN, quantized candidates) may return
+                           fewer results although more documents match, and must not set it.
+        :param candidates: Candidate depth the ranking was computed with, if the ranking depends on it.
+        """
+        nbytes = self._estimate_nbytes(results)
+        if nbytes > self.max_bytes:
+            return
+        key = self._key(query, version, candidates)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[2]
+            self._entries[key] = (list(results), exhaustive and len(results) < depth, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, _, evicted_nbytes) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all entries; counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Current size, estimated memory and hit/miss counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
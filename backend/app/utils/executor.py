@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is not admitted: every worker is busy and the admission queue is full,
+    or the request waited in the queue longer than its timeout.
+    """
+
+
+class BoundedExecutor:
+    """
+    Fixed pool of worker threads for query encoding and scoring, with a bounded admission queue.
+    A request is admitted only while fewer than max_workers + max_queue requests are running or waiting;
+    beyond that it is rejected at once, so overload turns into fast rejections instead of an ever-growing
+    queue in which every request eventually times out. Admitted requests that waited longer than
+    queue_timeout are dropped before doing any work.
+    """
+    def __init__(self, max_workers: int = 4, max_queue: int = 64, queue_timeout: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param max_workers: Requests processed concurrently.
+        :param max_queue: Requests allowed to wait for a worker.
+        :param queue_timeout: Seconds a request may wait for a worker before it is rejected; None waits indefinitely.
+        :param clock: Time source, replaceable in tests.
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search-worker")
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+
+    def _release_cancelled(self, future: Future):
+        """
+        Free the slot of a request cancelled while queued (e.g. its client went away), which never reaches _run.
+        """
+        if future.cancelled():
+            with self._lock:
+                self.cancelled += 1
+                self.in_flight -= 1
+                self._finished.notify_all()
+
+    def _run(self, admitted_at: float, fn, args, kwargs):
+        waited = self.clock() - admitted_at
+        with self._lock:
+            if self.queue_timeout is not None and waited > self.queue_timeout:
+                self.timed_out += 1
+                self.in_flight -= 1
+                self._finished.notify_all()
+                raise Overloaded(f"Request waited {waited:.2f} s for a worker (limit {self.queue_timeout} s).")
+            self.running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.in_flight -= 1
+                self.completed += 1
+                self._finished.notify_all()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Admit fn(*args, **kwargs) and schedule it on a worker.
+        :return: concurrent.futures.Future of the result, raising Overloaded if the request timed out in the queue.
+        :raises Overloaded: If the admission queue is full.
+        """
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"{self.in_flight} requests running or queued (limit {self.max_workers + self.max_queue}).")
+            self.in_flight += 1
+        try:
+            future = self.executor.submit(self._run, self.clock(), fn, args, kwargs)
+        except RuntimeError:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        future.add_done_callback(self._release_cancelled)
+        return future
+
+    def wait_for_idle_worker(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until fewer than max_workers requests are running or queued, i.e. a new one would start at once.
+        :return: Whether a worker is idle; False if the timeout expired first.
+        """
+        with self._lock:
+            return self._finished.wait_for(lambda: self.in_flight < self.max_workers, timeout)
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Await fn(*args, **kwargs) on a worker without blocking the event loop.
+        :raises Overloaded: If the request is not admitted or times out in the queue.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": self.in_flight - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "cancelled": self.cancelled,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+
+class MicroBatcher:
+    """
+    Coalesces single requests arriving close together into batches, so that e.g. concurrent /search
+    calls are encoded in one model call and scored with one matrix-matrix product instead of one each.
+    Batches run on a BoundedExecutor shared with other requests, so batching adds no threads: a
+    dispatcher waits for an idle worker, then takes the oldest pending request and waits until max_wait
+    after its arrival, or until max_batch_size requests with the same key are pending, and submits them
+    as one task. While every worker is busy, requests accumulate and the next batch is larger, so
+    batches grow with the load. Admission works as in BoundedExecutor: at most max_queue requests wait,
+    and requests that waited longer than queue_timeout are rejected with Overloaded.
+    """
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any], Hashable], List[Any]],
+        executor: BoundedExecutor,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        max_queue: int = 256,
+        queue_timeout: Optional[float] = None,
+    ):
+        """
+        :param process_batch: Called as process_batch(items, key) with requests sharing a key;
+                              returns one result per item, in the same order.
+        :param executor: Runs the batches; its max_workers bounds the batches processed concurrently.
+        :param max_batch_size: Requests processed together at most.
+        :param max_wait: Seconds the oldest request waits for others to join its batch; 0 only batches
+                         requests that are already pending.
+        :param max_queue: Requests allowed to wait for a batch before new ones are rejected.
+        :param queue_timeout: Seconds a request may wait before it is rejected; None waits indefinitely.
+        """
+        self.process_batch = process_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._pending = deque()  # (key, item, future, arrival time), oldest first
+        self._condition = threading.Condition()
+        self._closed = False
+        self.running = 0
+        self.batches = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.dispatcher = threading.Thread(target=self._dispatch, name="micro-batcher", daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, item, key: Hashable = None) -> Future:
+        """
+        Queue one request; requests are only batched with others of the same key (e.g. the same top_k).
+        :return: concurrent.futures.Future of its result.
+        :raises Overloaded: If max_queue requests are already waiting.
+        """
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is shut down.")
+            if len(self._pending) >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"{len(self._pending)} requests waiting for a batch (limit {self.max_queue}).")
+            self._pending.append((key, item, future, time.monotonic()))
+            self._condition.notify_all()
+        return future
+
+    async def run(self, item, key: Hashable = None):
+        """
+        Await the result of one request without blocking the event loop.
+        :raises Overloaded: If the request is not admitted or times out in the queue.
+        """
+        return await asyncio.wrap_future(self.submit(item, key))
+
+    def _take_batch(self):
+        """
+        Block until a batch is due and remove it from the queue.
+        :return: Tuple of (key, pending entries), or None once shut down and drained.
+        """
+        with self._condition:
+            while True:
+                if not self._pending:
+                    if self._closed:
+                        return None
+                    self._condition.wait()
+                    continue
+                key, _, _, arrived = self._pending[0]
+                same_key = sum(1 for entry in self._pending if entry[0] == key)
+                remaining = arrived + self.max_wait - time.monotonic()
+                if same_key >= self.max_batch_size or remaining <= 0 or self._closed:
+                    break
+                self._condition.wait(remaining)
+
+            batch, rest = [], deque()
+            while self._pending:
+                entry = self._pending.popleft()
+                if entry[0] == key and len(batch) < self.max_batch_size:
+                    batch.append(entry)
+                else:
+                    rest.append(entry)
+            self._pending = rest
+            return key, batch
+
+    def _admit(self, batch):
+        """
+        Drop requests that were cancelled or waited too long.
+        """
+        now = time.monotonic()
+        admitted = []
+        for entry in batch:
+            _, _, future, arrived = entry
+            if not future.set_running_or_notify_cancel():
+                continue
+            waited = now - arrived
+            if self.queue_timeout is not None and waited > self.queue_timeout:
+                with self._condition:
+                    self.timed_out += 1
+                future.set_exception(Overloaded(f"Request waited {waited:.2f} s for a batch (limit {self.queue_timeout} s)."))
+                continue
+            admitted.append(entry)
+        return admitted
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+            # Requests keep joining the queue while every worker is busy
+            self.executor.wait_for_idle_worker()
+            taken = self._take_batch()
+            if taken is None:
+                return
+            key, batch = taken
+            batch = self._admit(batch)
+            if not batch:
+                continue
+            try:
+                self.executor.submit(self._process, key, batch)
+            except (Overloaded, RuntimeError) as e:
+                for _, _, future, _ in batch:
+                    future.set_exception(e)
+
+    def _process(self, key: Hashable, batch):
+        with self._condition:
+            self.running += len(batch)
+        try:
+            results = self.process_batch([item for _, item, _, _ in batch], key)
+            for (_, _, future, _), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            logger.error(f"Error processing a batch of {len(batch)} requests: {e}")
+            for _, _, future, _ in batch:
+                future.set_exception(e)
+        finally:
+            with self._condition:
+                self.running -= len(batch)
+                self.batches += 1
+                self.completed += len(batch)
+
+    def stats(self) -> Dict[str, float]:
+        with self._condition:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "running": self.running,
+                "queued": len(self._pending),
+                "batches": self.batches,
+                "completed": self.completed,
+                "mean_batch_size": self.completed / self.batches if self.batches else 0.0,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting requests; pending requests are still submitted to the executor, which the caller shuts down.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            self.dispatcher.join()
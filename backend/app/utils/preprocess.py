@@ -0,0 +1,43 @@
+import re
+import unicodedata
+from typing import List
+
+# Fold umlauts and ß so "Bürokaufmann" and "Buerokaufmann" match
+_UMLAUT_FOLDING = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+# Gendered title forms such as "Kaufmann/-frau", "Mitarbeiter/-in" or "Verkäufer/in"
+_GENDER_SUFFIX_PATTERN = re.compile(r"(\w+)\s*/\s*-?\s*(innen|in|frau|mann)\b")
+
+# Letters and digits; underscores and punctuation separate tokens
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+# Gender markers like "(m/w/d)" and common German function words carry no ranking signal
+STOPWORDS = {
+    "m", "w", "d", "f", "x", "i", "gn", "div", "mwd",
+    "und", "oder", "der", "die", "das", "den", "dem", "des", "ein", "eine", "einen",
+    "fuer", "mit", "in", "im", "am", "an", "auf", "zu", "zum", "zur", "von", "vom", "bei", "als", "ab",
+}
+
+
+def _expand_gender_suffix(match: re.Match) -> str:
+    word, suffix = match.groups()
+    if suffix in ("frau", "mann") and word.endswith(("mann", "frau")):
+        variant = word[:-4] + suffix
+    else:
+        variant = word + suffix
+    return f"{word} {variant}"
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenize German job titles and queries for lexical search.
+    Lowercases, folds umlauts, expands gendered forms ("Bürokaufmann/-frau" -> buerokaufmann, buerokauffrau)
+    and drops gender markers and stopwords.
+    :param text: Raw title or query text.
+    :return: List of tokens, in order, with repeats.
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKC", text).lower().translate(_UMLAUT_FOLDING)
+    text = _GENDER_SUFFIX_PATTERN.sub(_expand_gender_suffix, text)
+    return [token for token in _TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
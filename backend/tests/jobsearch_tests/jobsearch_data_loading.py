@@ -39,7 +39,7 @@ class TestDataLoader(unittest.TestCase):
         print("\nTop 10 documents:")
         for idx, doc in enumerate(documents[:10], 1):
             print(f"\nDocument {idx}:")
-            for key, value in vars(doc).items():
+            for key, value in doc.to_dict().items():
                 print(f"  {key}: {value}")
 
         # Ensure documents are loaded
@@ -7,7 +7,7 @@ import yaml
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 
 from backend.app.services.indexing_service import IndexingService
-from backend.app.services.data_loader import load_documents
+from backend.app.services.data_loader import iter_documents
 # Path to the configuration file
 CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../config/config.yml"))
 
@@ -19,37 +19,52 @@ def load_config():
         config = yaml.safe_load(file)
     return config
 
-# Load configuration
-config = load_config()
-
-# # Extract relevant settings from config
-# retrieval_model = config["retrieval"]["model"]
-# index_directory = config["indexing"]["directory"]
-# data_file = config["data"]["documents"]
-# metadata_file = config["data"]["metadata"]
-# temp_dir = config.get("indexing", {}).get("temp_dir", "./temp_test")  # Default to "./temp_test" if not in config
-# field_to_index = config["indexing"]["field_to_index"]
-
-# # Initialize QueryService with config values
-# from backend.app.services.query_service import QueryService
-# query_service = QueryService(model_name=retrieval_model, index_dir=index_directory)
-# Paths
-model_name = config["retrieval"]["model"]
-index_dir = config["indexing"]["directory"]
-field_to_index = config["indexing"]["field_to_index"]
-temp_dir = config.get("indexing", {}).get("temp_dir", "./temp_test")  # Default to "./temp_test" if not in config
-# Load documents
-data_file = config["data"]["documents"]
-metadata_file = config["data"]["metadata"]
-
-
-documents = load_documents(data_file, metadata_file)
-
-# Load documents
-documents = load_documents(data_file, metadata_file, temp_dir=temp_dir)
-print(f"Loaded {len(documents)} documents.")
-
-# Index documents
-# indexing_service = IndexingService(model_name=retrieval_model)
-indexing_service = IndexingService(model_name=model_name, index_dir=index_dir, field_to_index=field_to_index)
-indexing_service.create_embeddings(documents)
\ No newline at end of file
+
+def main():
+    """
+    Build the index from the configured data. Run as a script only: with indexing.num_workers > 1 the
+    encoding processes are spawned and re-import this module, so nothing may be built at import time.
+    """
+    # Load configuration
+    config = load_config()
+
+    # # Extract relevant settings from config
+    # retrieval_model = config["retrieval"]["model"]
+    # index_directory = config["indexing"]["directory"]
+    # data_file = config["data"]["documents"]
+    # metadata_file = config["data"]["metadata"]
+    # temp_dir = config.get("indexing", {}).get("temp_dir", "./temp_test")  # Default to "./temp_test" if not in config
+    # field_to_index = config["indexing"]["field_to_index"]
+
+    # # Initialize QueryService with config values
+    # from backend.app.services.query_service import QueryService
+    # query_service = QueryService(model_name=retrieval_model, index_dir=index_directory)
+    # Paths
+    model_name = config["retrieval"]["model"]
+    index_dir = config["indexing"]["directory"]
+    field_to_index = config["indexing"]["field_to_index"]
+    temp_dir = config.get("indexing", {}).get("temp_dir", "./temp_test")  # Default to "./temp_test" if not in config
+    # Load documents
+    data_file = config["data"]["documents"]
+    metadata_file = config["data"]["metadata"]
+
+
+    # Stream documents straight out of the ZIP; each shard is encoded while the next one is read
+    documents = iter_documents(data_file, metadata_file)
+
+    # Index documents
+    # indexing_service = IndexingService(model_name=retrieval_model)
+    indexing_service = IndexingService(model_name=model_name, index_dir=index_dir, field_to_index=field_to_index,
+                                       ann_nlist=config["indexing"].get("ann_nlist"),
+                                       quantization=config["indexing"].get("quantization"),
+                                       pq_subspaces=config["indexing"].get("pq_subspaces", 32),
+                                       opq_iterations=config["indexing"].get("opq_iterations", 0),
+                                       num_workers=config["indexing"].get("num_workers", 1),
+                                       encode_chunk_size=config["indexing"].get("encode_chunk_size", 1000),
+                                       key_field=config["indexing"].get("key_field"),
+                                       dedup_threshold=config["indexing"].get("dedup_threshold"))
+    indexing_service.create_embeddings(documents)
+
+
+if __name__ == "__main__":
+    main()
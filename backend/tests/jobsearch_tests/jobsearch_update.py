@@ -0,0 +1,51 @@
+import os
+import sys
+import yaml
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from backend.app.services.indexing_service import IndexingService
+from backend.app.services.data_loader import iter_documents
+# Path to the configuration file
+CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../config/config.yml"))
+
+
+def load_config():
+    """
+    Loading the configuration from the YAML file.
+    """
+    with open(CONFIG_PATH, "r") as file:
+        config = yaml.safe_load(file)
+    return config
+
+
+def main():
+    """
+    Apply the configured export to the index and compact it when due. Run as a script only: encoding
+    processes are spawned and re-import this module.
+    """
+    config = load_config()
+    indexing = config["indexing"]
+
+    # Apply the current export as a snapshot: only new and changed postings are encoded
+    indexing_service = IndexingService(model_name=config["retrieval"]["model"], index_dir=indexing["directory"],
+                                       field_to_index=indexing["field_to_index"], batch_size=indexing["batch_size"],
+                                       ann_nlist=indexing.get("ann_nlist"),
+                                       quantization=indexing.get("quantization"),
+                                       pq_subspaces=indexing.get("pq_subspaces", 32),
+                                       opq_iterations=indexing.get("opq_iterations", 0),
+                                       num_workers=indexing.get("num_workers", 1),
+                                       encode_chunk_size=indexing.get("encode_chunk_size", 1000),
+                                       key_field=indexing.get("key_field"),
+                                       dedup_threshold=indexing.get("dedup_threshold"))
+    stats = indexing_service.update_index(iter_documents(config["data"]["documents"], config["data"]["metadata"]))
+    print(stats)
+
+    if indexing_service.compaction_due(max_deleted_fraction=indexing.get("max_deleted_fraction", 0.1),
+                                       max_delta_shards=indexing.get("max_delta_shards", 16)):
+        indexing_service.compact()
+
+
+if __name__ == "__main__":
+    main()
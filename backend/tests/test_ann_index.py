@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.ann_index import IVFIndex
+from backend.app.models.vector_store import normalize_rows, top_k_indices
+
+
+class TestIVFIndex(unittest.TestCase):
+    def setUp(self):
+        """
+        Build a small clustered corpus and an IVF index over it.
+        """
+        rng = np.random.default_rng(7)
+        topics = normalize_rows(rng.standard_normal((20, 32)).astype(np.float32))
+        self.matrix = topics[rng.integers(0, 20, 2000)] + 0.05 * rng.standard_normal((2000, 32)).astype(np.float32)
+        self.matrix = normalize_rows(self.matrix.astype(np.float32))
+        self.queries = self.matrix[rng.choice(2000, 10, replace=False)]
+        self.index = IVFIndex.train(self.matrix, nlist=16)
+
+    def test_every_document_is_assigned_once(self):
+        self.assertEqual(self.index.list_offsets[-1], self.matrix.shape[0])
+        np.testing.assert_array_equal(np.sort(self.index.list_ids), np.arange(self.matrix.shape[0]))
+
+    def test_probing_all_clusters_is_exhaustive(self):
+        """
+        With nprobe == nlist the index returns exactly the exhaustive ranking.
+        """
+        for query in self.queries:
+            indices, scores = self.index.search(self.matrix, query, 20, nprobe=self.index.nlist)
+            expected = top_k_indices(self.matrix @ query, 20)
+            np.testing.assert_array_equal(indices, expected)
+            np.testing.assert_allclose(scores, (self.matrix @ query)[expected], rtol=1e-5)
+
+    def test_recall_on_clustered_data(self):
+        recalls = []
+        for query in self.queries:
+            indices, _ = self.index.search(self.matrix, query, 10, nprobe=4)
+            recalls.append(len(np.intersect1d(indices, top_k_indices(self.matrix @ query, 10))) / 10)
+        self.assertGreaterEqual(np.mean(recalls), 0.9)
+
+    def test_extend_matches_assigning_all_rows(self):
+        """
+        Extending keeps the centroids and gives the same lists as assigning every row to them.
+        """
+        base = IVFIndex.train(self.matrix[:1500], nlist=16)
+        base.extend(self.matrix[1500:], block_size=128)
+
+        self.assertEqual(base.num_docs, 2000)
+        full = IVFIndex(base.centroids, None, None)
+        assignments = np.argmax(self.matrix @ base.centroids.T, axis=1)
+        full.list_ids = np.argsort(assignments, kind="stable")
+        full.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=16))])
+        np.testing.assert_array_equal(base.list_offsets, full.list_offsets)
+        np.testing.assert_array_equal(base.list_ids, full.list_ids)
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            self.index.save(index_dir)
+            loaded = IVFIndex.load(index_dir, nprobe=3)
+
+        self.assertEqual(loaded.nprobe, 3)
+        np.testing.assert_array_equal(loaded.centroids, self.index.centroids)
+        np.testing.assert_array_equal(loaded.list_ids, self.index.list_ids)
+        np.testing.assert_array_equal(loaded.list_offsets, self.index.list_offsets)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import importlib
+import os
+import sys
+import tempfile
+import threading
+from unittest import mock
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.services import query_service
+
+
+class GatedEncoder:
+    """
+    Stand-in for SentenceTransformer whose loading blocks until the test releases it.
+    """
+    loaded = threading.Event()
+
+    def __init__(self, model_name):
+        GatedEncoder.loaded.wait(timeout=30)
+
+    def encode(self, texts, show_progress_bar=False, convert_to_numpy=True):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class ApiTestCase(unittest.TestCase):
+    """
+    Serves a 4-document index through a fresh import of the API modules with lazy loading on, so
+    importing them loads nothing and each test points them at its own index first.
+    """
+    retrieval_config = {}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        np.save(os.path.join(self.tmp_dir.name, "embeddings_1.npy"), np.eye(4, dtype=np.float32))
+        with open(os.path.join(self.tmp_dir.name, "metadata_1.json"), "w") as f:
+            f.write('[{"title": "a"}, {"title": "b"}, {"title": "c"}, {"title": "d"}]')
+        GatedEncoder.loaded.clear()
+        self.patch = mock.patch.object(query_service, "SentenceTransformer", GatedEncoder)
+        self.patch.start()
+
+        config = {"retrieval": {"lazy_load": True, "result_cache_mb": 0, "embedding_cache_size": 0,
+                                "search_batch_max_size": 1, "search_workers": 1, **self.retrieval_config}}
+        with mock.patch("backend.app.config.load_config", return_value=config):
+            sys.modules.pop("backend.app.routes.search", None)
+            sys.modules.pop("backend.app.main", None)
+            self.search = importlib.import_module("backend.app.routes.search")
+            self.app = importlib.import_module("backend.app.main").app
+        self.assertIsNone(self.search.reloader)
+        self.search.index_dir = self.tmp_dir.name
+
+    def tearDown(self):
+        GatedEncoder.loaded.set()
+        if self.search._loader is not None:
+            self.search._loader.join()
+        if self.search.reloader is not None:
+            self.search.reloader.close()
+        self.search.search_executor.shutdown()
+        sys.modules.pop("backend.app.routes.search", None)
+        sys.modules.pop("backend.app.main", None)
+        self.patch.stop()
+        self.tmp_dir.cleanup()
+
+
+class TestLazyStartup(ApiTestCase):
+
+    def test_serves_health_checks_while_loading(self):
+        with TestClient(self.app) as client:
+            self.assertEqual(client.get("/").status_code, 200)
+            response = client.get("/ready")
+            self.assertEqual((response.status_code, response.json()["status"]), (503, "loading"))
+            response = client.get("/search", params={"query": "a"})
+            self.assertEqual((response.status_code, response.headers["Retry-After"]), (503, "5"))
+
+            GatedEncoder.loaded.set()
+            self.search._loader.join()
+            response = client.get("/ready")
+            self.assertEqual((response.status_code, response.json()["status"]), (200, "ready"))
+            response = client.get("/search", params={"query": "a", "top_k": 2})
+            self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_reports_failed_load(self):
+        self.search.index_dir = os.path.join(self.tmp_dir.name, "missing")
+        with TestClient(self.app) as client:
+            self.search._loader.join()
+            response = client.get("/ready")
+            self.assertEqual((response.status_code, response.json()["status"]), (503, "failed"))
+            self.assertIn("not found", response.json()["error"])
+
+
+class TestBatchRoute(ApiTestCase):
+    retrieval_config = {"search_batch_max_queries": 3}
+
+    def setUp(self):
+        super().setUp()
+        GatedEncoder.loaded.set()
+
+    def test_batch_matches_single_searches(self):
+        with TestClient(self.app) as client:
+            self.search._loader.join()
+            response = client.post("/search/batch", json={"queries": ["a", "b"], "top_k": 3})
+            self.assertEqual(response.status_code, 200)
+            batch = response.json()["results"]
+            self.assertEqual([entry["query"] for entry in batch], ["a", "b"])
+            for entry in batch:
+                single = client.get("/search", params={"query": entry["query"], "top_k": 3}).json()["results"]
+                self.assertEqual(entry["results"], single)
+
+    def test_empty_batch(self):
+        with TestClient(self.app) as client:
+            self.search._loader.join()
+            response = client.post("/search/batch", json={"queries": []})
+            self.assertEqual((response.status_code, response.json()), (200, {"results": []}))
+
+    def test_oversized_batch_is_rejected(self):
+        with TestClient(self.app) as client:
+            self.search._loader.join()
+            response = client.post("/search/batch", json={"queries": ["a", "b", "c", "d"]})
+            self.assertEqual(response.status_code, 413)
+            self.assertIn("limit of 3", response.json()["detail"])
+
+
+if __name__ == "__main__":
+    unittest.main()
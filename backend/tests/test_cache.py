@@ -0,0 +1,164 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.index_manifest import index_version, read_manifest, write_manifest
+from backend.app.utils.cache import EmbeddingCache, ResultCache, load_query_frequencies, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def test_hits_and_misses_are_counted(self):
+        cache = EmbeddingCache(max_size=4)
+        self.assertIsNone(cache.get("Grafikdesign"))
+        cache.put("Grafikdesign", np.ones(3, dtype=np.float32))
+
+        np.testing.assert_array_equal(cache.get("  Grafikdesign "), np.ones(3))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 0.5)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = EmbeddingCache(max_size=2)
+        cache.put("a", np.zeros(2))
+        cache.put("b", np.zeros(2))
+        cache.get("a")
+        cache.put("c", np.zeros(2))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = EmbeddingCache(max_size=2, ttl=10, clock=clock)
+        cache.put("a", np.zeros(2))
+        clock.now = 5
+        self.assertIsNotNone(cache.get("a"))
+        clock.now = 11
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_cached_embeddings_are_read_only_copies(self):
+        cache = EmbeddingCache()
+        embedding = np.ones(2, dtype=np.float32)
+        cache.put("a", embedding)
+        embedding[0] = 5
+        cached = cache.get("a")
+
+        self.assertEqual(cached[0], 1)
+        with self.assertRaises(ValueError):
+            cached[0] = 5
+
+    def test_concurrent_access_keeps_size_bounded(self):
+        cache = EmbeddingCache(max_size=50)
+
+        def worker(offset):
+            for i in range(500):
+                query = f"q{(i + offset) % 80}"
+                if cache.get(query) is None:
+                    cache.put(query, np.zeros(2))
+
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.stats()
+        self.assertLessEqual(stats["size"], 50)
+        self.assertEqual(stats["hits"] + stats["misses"], 8 * 500)
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query(" IT   Berater\t"), "IT Berater")
+        self.assertNotEqual(normalize_query("it berater"), normalize_query("IT Berater"))
+
+    def test_load_query_frequencies_orders_by_frequency(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as f:
+            f.write("query,frequency\nVertrieb,20\nGrafikdesign,585\nIT Berater,243\n")
+        try:
+            self.assertEqual(load_query_frequencies(f.name), ["Grafikdesign", "IT Berater", "Vertrieb"])
+        finally:
+            os.remove(f.name)
+
+
+def make_results(count):
+    return [{"score": 1.0 - i / 1000, "metadata": {"id": i}} for i in range(count)]
+
+
+class TestResultCache(unittest.TestCase):
+    def test_deep_entry_serves_smaller_top_k(self):
+        cache = ResultCache(depth=100)
+        cache.put("IT Berater", "v1", make_results(100), depth=100)
+
+        results = cache.get("IT Berater", "v1", top_k=10)
+        self.assertEqual([result["metadata"]["id"] for result in results], list(range(10)))
+        self.assertIsNone(cache.get("IT Berater", "v1", top_k=200))
+
+    def test_complete_entry_serves_any_top_k(self):
+        cache = ResultCache(depth=100)
+        cache.put("Astronaut", "v1", make_results(3), depth=100, exhaustive=True)
+        self.assertEqual(len(cache.get("Astronaut", "v1", top_k=500)), 3)
+
+        # A short ranking from an approximate ranker may have missed matches
+        cache.put("Astronaut", "v1", make_results(3), depth=100)
+        self.assertEqual(len(cache.get("Astronaut", "v1", top_k=3)), 3)
+        self.assertIsNone(cache.get("Astronaut", "v1", top_k=4))
+
+    def test_candidate_depth_is_part_of_the_key(self):
+        cache = ResultCache()
+        cache.put("Koch", "v1", make_results(200), depth=200, candidates=200)
+        self.assertIsNone(cache.get("Koch", "v1", top_k=10, candidates=100))
+        self.assertEqual(len(cache.get("Koch", "v1", top_k=200, candidates=200)), 200)
+
+    def test_new_index_version_misses(self):
+        cache = ResultCache()
+        cache.put("Vertrieb", "v1", make_results(10), depth=1000)
+        self.assertIsNone(cache.get("Vertrieb", "v2", top_k=10))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_eviction_keeps_memory_bounded(self):
+        entry_nbytes = ResultCache._estimate_nbytes(make_results(100))
+        cache = ResultCache(max_bytes=3 * entry_nbytes)
+        for i in range(5):
+            cache.put(f"q{i}", "v1", make_results(100), depth=1000)
+
+        stats = cache.stats()
+        self.assertEqual((stats["size"], stats["evictions"]), (3, 2))
+        self.assertLessEqual(stats["nbytes"], 3 * entry_nbytes)
+        self.assertIsNone(cache.get("q0", "v1", top_k=10))
+        self.assertIsNotNone(cache.get("q4", "v1", top_k=10))
+
+
+class TestIndexManifest(unittest.TestCase):
+    def test_version_changes_on_rebuild(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            np.save(os.path.join(index_dir, "embeddings_1.npy"), np.zeros((2, 2), dtype=np.float32))
+            fingerprint = index_version(index_dir)
+            self.assertTrue(fingerprint.startswith("files-"))
+
+            first = write_manifest(index_dir, num_docs=2)
+            self.assertEqual(index_version(index_dir), first["version"])
+            self.assertEqual(read_manifest(index_dir)["num_docs"], 2)
+
+            second = write_manifest(index_dir, num_docs=2)
+            self.assertNotEqual(first["version"], second["version"])
+            self.assertEqual(index_version(index_dir), second["version"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import zipfile
+from unittest import mock
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.document_store import MetadataStore
+from backend.app.services import indexing_service
+from backend.app.services.data_loader import (
+    Document,
+    chunked,
+    document_type,
+    iter_csv_documents,
+    iter_document_chunks,
+    iter_documents,
+    iter_json_documents,
+    load_documents,
+)
+
+FIELDS = ["title", "company", "requirements"]
+ROWS = [
+    ["Bürokaufmann/-frau", "Firma A", "Ausbildung"],
+    ["", "Firma B", "keine"],
+    ["IT Berater SAP", "Firma C", "SAP, \"ABAP\"\nmehrzeilig"],
+    ["Grafikdesign", "Firma D"],
+]
+
+
+class HashEncoder:
+    """
+    Stand-in for SentenceTransformer: deterministic vectors, records batch sizes.
+    """
+    def __init__(self, model_name):
+        self.batches = []
+
+    def encode(self, texts, show_progress_bar=False, convert_to_numpy=True):
+        self.batches.append(len(texts))
+        rng = [np.random.default_rng(sum(map(ord, text))) for text in texts]
+        return np.array([r.standard_normal(8) for r in rng], dtype=np.float32)
+
+
+class TestStreamingLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.metadata_file = os.path.join(self.tmp_dir.name, "metadata.csv")
+        with open(self.metadata_file, "w") as f:
+            f.write(",".join(FIELDS) + "\n")
+
+        csv_text = io.StringIO()
+        csv.writer(csv_text).writerows(ROWS)
+        self.zip_path = os.path.join(self.tmp_dir.name, "postings.zip")
+        with zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+            zip_ref.writestr("postings.csv", csv_text.getvalue())
+            zip_ref.writestr("more.json", json.dumps([{"title": "Koch", "company": "Firma E", "extra": 1}]))
+            zip_ref.writestr("more.jsonl", '{"title": "Pfleger"}\n{"title": "Lehrer", "company": "Schule"}\n')
+            zip_ref.writestr("readme.txt", "ignored")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_zip_members_are_streamed_without_extraction(self):
+        documents = list(iter_documents(self.zip_path, self.metadata_file))
+
+        self.assertEqual([doc.title for doc in documents], ["Bürokaufmann/-frau", "", "IT Berater SAP", "Grafikdesign", "Koch", "Pfleger", "Lehrer"])
+        self.assertEqual(documents[2].requirements, "SAP, \"ABAP\"\nmehrzeilig")
+        self.assertIsNone(documents[3].requirements)
+        self.assertEqual(documents[4].to_dict(), {"title": "Koch", "company": "Firma E", "requirements": None})
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["metadata.csv", "postings.zip"])
+        self.assertEqual([doc.to_dict() for doc in load_documents(self.zip_path, self.metadata_file)], [doc.to_dict() for doc in documents])
+
+    def test_chunks_have_fixed_size(self):
+        chunks = list(iter_document_chunks(self.zip_path, self.metadata_file, chunk_size=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual(list(chunked(range(4), 2)), [[0, 1], [2, 3]])
+        with self.assertRaises(ValueError):
+            list(chunked(range(4), 0))
+
+    def test_json_objects_spanning_reads(self):
+        objects = [{"title": f"Stelle {i}", "company": "x" * 50} for i in range(20)]
+        stream = io.StringIO(json.dumps(objects, indent=2))
+        documents = list(iter_json_documents(stream, FIELDS, read_size=7))
+        self.assertEqual([doc.title for doc in documents], [obj["title"] for obj in objects])
+
+    def test_slotted_documents(self):
+        document = next(iter_documents(self.zip_path, self.metadata_file))
+        self.assertFalse(hasattr(document, "__dict__"))
+        self.assertIs(type(document), document_type(tuple(FIELDS)))
+        with self.assertRaises(AttributeError):
+            document.unknown = 1
+
+        legacy = next(iter_documents(self.zip_path, self.metadata_file, slots=False))
+        self.assertIsInstance(legacy, Document)
+        self.assertEqual(legacy.to_dict(), document.to_dict())
+        self.assertEqual(document_type(("a", "b")).from_values(["x"]).to_dict(), {"a": "x", "b": None})
+        with self.assertRaises(ValueError):
+            document_type(("job title",))
+
+    def test_fields_named_like_document_attributes_are_renamed(self):
+        stream = io.StringIO("Koch,3,x,y,z\n")
+        fields = ["title", "items", "to_dict", "_values", "_2"]
+        document = next(iter_csv_documents(stream, fields))
+
+        self.assertEqual(document.to_dict(), {"title": "Koch", "items": "3", "to_dict": "x", "_values": "y", "_2": "z"})
+        self.assertEqual(list(dict(document.items())), fields)
+        self.assertEqual((document.title, document._2), ("Koch", "z"))
+        self.assertEqual(type(document).__slots__, ("title", "_1", "_2_", "_3", "_2"))
+        self.assertEqual(type(document)(items="3").to_dict()["items"], "3")
+
+    def test_indexing_consumes_a_document_stream(self):
+        index_dir = os.path.join(self.tmp_dir.name, "index")
+        with mock.patch.object(indexing_service, "SentenceTransformer", HashEncoder):
+            service = indexing_service.IndexingService("fake", index_dir=index_dir, batch_size=2)
+            service.create_embeddings(iter_documents(self.zip_path, self.metadata_file))
+
+        self.assertEqual(service.model.batches, [2, 2, 2])
+        store = MetadataStore(index_dir)
+        self.assertEqual([record["id"] for record in store], [0, 2, 3, 4, 5, 6])
+        self.assertEqual(store[1]["metadata"]["company"], "Firma C")
+        self.assertEqual(np.load(os.path.join(index_dir, "embeddings_3.npy")).shape, (2, 8))
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import os
+import re
+import sys
+import tempfile
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.dedup_index import DuplicateGroups, load_unique_matrix, normalize_title, remove_duplicate_groups
+
+
+def normalized(matrix):
+    return (matrix / np.linalg.norm(matrix, axis=1, keepdims=True)).astype(np.float32)
+
+
+class TestDuplicateGroups(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        base = rng.standard_normal((300, 32))
+        # Rows 300-399 repost rows 0-99 with slightly perturbed vectors
+        reposts = base[:100] + 0.02 * rng.standard_normal((100, 32))
+        self.matrix = normalized(np.vstack([base, reposts]))
+        self.texts = [f"Stelle {i}" for i in range(300)] + [f"Stelle {i} (neu)" for i in range(100)]
+        self.texts[299] = "  STELLE   7 "
+
+    def test_exact_and_near_duplicates_are_grouped(self):
+        groups = DuplicateGroups.build(self.matrix, self.texts, threshold=0.95)
+
+        self.assertEqual(normalize_title(self.texts[299]), "stelle 7")
+        self.assertEqual(groups.num_groups, 299)
+        self.assertEqual(groups.group_of[299], groups.group_of[7])
+        for row in range(100):
+            self.assertEqual(groups.group_of[300 + row], groups.group_of[row])
+            self.assertEqual(groups.representatives[groups.group_of[row]], row)
+        self.assertEqual(len(set(groups.group_of[100:299].tolist())), 199)
+
+    def test_blocking_does_not_compare_all_pairs(self):
+        with self.assertLogs("backend.app.models.dedup_index", level="INFO") as logs:
+            DuplicateGroups.build(self.matrix, self.texts, threshold=0.95)
+        num_compared = int(re.search(r"(\d+) pairs compared", logs.output[-1]).group(1))
+        self.assertLess(num_compared, 399 * 398 // 2 // 10)
+
+    def test_expand_and_collapse(self):
+        groups = DuplicateGroups(np.array([0, 1, 0, 2, 1]), np.array([0, 1, 3]))
+        indices, scores = groups.expand(np.array([1, 0]), np.array([0.9, 0.5], dtype=np.float32))
+        self.assertEqual(indices.tolist(), [4, 1, 2, 0])
+        self.assertEqual(scores.tolist(), [np.float32(0.9)] * 2 + [np.float32(0.5)] * 2)
+
+        indices, scores = groups.collapse(np.array([4, 2, 1, 3, 0]), np.arange(5, 0, -1, dtype=np.float32), 2)
+        self.assertEqual(indices.tolist(), [4, 2])
+        self.assertEqual(scores.tolist(), [5.0, 4.0])
+
+    def test_save_and_load(self):
+        groups = DuplicateGroups.build(self.matrix, self.texts, threshold=0.95)
+        with tempfile.TemporaryDirectory() as index_dir:
+            groups.save(index_dir, self.matrix, block_size=64)
+            loaded = DuplicateGroups.load(index_dir)
+            np.testing.assert_array_equal(loaded.group_of, groups.group_of)
+            np.testing.assert_array_equal(load_unique_matrix(index_dir), self.matrix[groups.representatives])
+
+            self.assertEqual(len(remove_duplicate_groups(index_dir)), 2)
+            self.assertIsNone(DuplicateGroups.load(index_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.delta_index import DocumentHashes, content_hash, load_tombstones, write_tombstones
+
+
+class TestDeltaIndex(unittest.TestCase):
+    def test_content_hash_ignores_key_order(self):
+        self.assertEqual(content_hash({"a": 1, "b": "Köln"}), content_hash({"b": "Köln", "a": 1}))
+        self.assertNotEqual(content_hash({"a": 1}), content_hash({"a": 2}))
+        self.assertNotEqual(content_hash("Koch"), content_hash("Köchin"))
+
+    def test_tombstones_round_trip(self):
+        deleted = np.zeros(13, dtype=bool)
+        deleted[[0, 7, 12]] = True
+        with tempfile.TemporaryDirectory() as index_dir:
+            self.assertIsNone(load_tombstones(index_dir, 13))
+            write_tombstones(index_dir, deleted)
+            self.assertEqual(np.load(os.path.join(index_dir, "tombstones.npy")).nbytes, 2)
+            np.testing.assert_array_equal(load_tombstones(index_dir, 13), deleted)
+            with self.assertRaises(ValueError):
+                load_tombstones(index_dir, 17)
+
+    def test_hashes_and_live_rows(self):
+        records = [
+            {"id": 0, "title": "Koch", "metadata": {"ref": "a", "title": "Koch"}},
+            {"id": 1, "title": "Koch", "metadata": {"ref": "b", "title": "Koch"}},
+            {"id": 2, "title": "Koch", "metadata": {"ref": "a", "title": "Koch"}},
+        ]
+        keyed = DocumentHashes.from_records(records, "title", "ref")
+        self.assertEqual(keyed.live_rows(np.array([False, False, False])), {"a": [0, 2], "b": [1]})
+        self.assertEqual(keyed.live_rows(np.array([True, False, False])), {"a": [2], "b": [1]})
+
+        # Without a key field, rows are keyed by their indexed field
+        by_text = DocumentHashes.from_records(records, "title", None)
+        self.assertEqual(by_text.live_rows(np.array([False, False, False])), {f"{content_hash('Koch'):016x}": [0, 1, 2]})
+        self.assertEqual(len(set(by_text.record_hashes)), 2)
+        keyed.rekey_by_text()
+        self.assertEqual(keyed.keys, by_text.keys)
+
+        with tempfile.TemporaryDirectory() as index_dir:
+            by_text.save(index_dir)
+            loaded = DocumentHashes.load(index_dir)
+            self.assertEqual((loaded.keys, loaded.text_hashes, loaded.record_hashes),
+                             (by_text.keys, by_text.text_hashes, by_text.record_hashes))
+
+
+if __name__ == "__main__":
+    unittest.main()
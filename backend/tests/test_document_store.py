@@ -0,0 +1,150 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models import document_store
+from backend.app.models.document_store import (
+    METADATA_FIELDS_FILE,
+    METADATA_OFFSETS_FILE,
+    MetadataStore,
+    append_metadata_store,
+    load_metadata,
+    open_metadata,
+    project_record,
+    write_metadata_store,
+)
+
+RECORDS = [
+    {"id": 0, "title": "Bürokaufmann/-frau", "metadata": {"title": "Bürokaufmann/-frau", "requirements": "Ausbildung", "resposibilities": "Büro"}},
+    {"id": 2, "title": "IT Berater SAP", "metadata": {"title": "IT Berater SAP", "location": "Köln"}},
+    {"id": 3, "title": "Grafikdesign", "metadata": {"title": "Grafikdesign"}},
+]
+
+
+class TestMetadataStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_records_round_trip(self):
+        write_metadata_store(self.index_dir, iter(RECORDS))
+        store = MetadataStore(self.index_dir)
+
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store[1], RECORDS[1])
+        self.assertEqual(store[np.int64(2)], RECORDS[2])
+        self.assertEqual(store[-1], RECORDS[-1])
+        self.assertEqual(list(store), RECORDS)
+        with self.assertRaises(IndexError):
+            store[3]
+        store.close()
+
+    def test_empty_store(self):
+        write_metadata_store(self.index_dir, [])
+        store = MetadataStore(self.index_dir)
+        self.assertEqual(len(store), 0)
+        self.assertEqual(list(store), [])
+        store.close()
+
+    def test_truncated_store_is_rejected(self):
+        path = write_metadata_store(self.index_dir, RECORDS)
+        with open(path, "r+b") as f:
+            f.truncate(10)
+        with self.assertRaises(ValueError):
+            MetadataStore(self.index_dir)
+
+    def test_append_extends_store(self):
+        write_metadata_store(self.index_dir, RECORDS[:2])
+        reader = MetadataStore(self.index_dir)
+        append_metadata_store(self.index_dir, iter(RECORDS[2:]))
+
+        self.assertEqual(len(reader), 2)
+        self.assertEqual(list(MetadataStore(self.index_dir)), RECORDS)
+        reader.close()
+
+    def test_projected_fields(self):
+        write_metadata_store(self.index_dir, RECORDS)
+        store = MetadataStore(self.index_dir)
+
+        self.assertEqual(
+            store.get(0, ["title", "metadata.requirements"]),
+            {"id": 0, "title": "Bürokaufmann/-frau", "metadata": {"requirements": "Ausbildung"}},
+        )
+        self.assertEqual(store.get(2, ["metadata.requirements", "missing.field"]), {"id": 3, "metadata": {}})
+        self.assertEqual(store.get(1), RECORDS[1])
+        self.assertIs(project_record(RECORDS[0], None), RECORDS[0])
+        store.close()
+
+    def test_projection_decodes_only_the_requested_fields(self):
+        records = RECORDS + [
+            {"id": 4, "title": "Koch", "metadata": {}},
+            {"id": 5, "title": "Koch", "metadata": {"title": "Koch", "tags": ["a", "b"], "salary": {"min": 1, "max": 2}}},
+            {"title": "ohne id"},
+        ]
+        write_metadata_store(self.index_dir, records)
+        store = MetadataStore(self.index_dir)
+
+        field_sets = [["title"], ["metadata.requirements"], ["metadata"], ["metadata.salary.max", "metadata.tags"],
+                      ["title.x", "missing.field"], ["metadata.salary"], []]
+        for index, record in enumerate(records):
+            self.assertEqual(store[index], record)
+            for fields in field_sets:
+                self.assertEqual(store.get(index, fields), project_record(record, fields), (index, fields))
+
+        with mock.patch.object(document_store.json, "loads", wraps=json.loads) as loads:
+            store.get(0, ["metadata.requirements"])
+        self.assertEqual([call.args[0] for call in loads.call_args_list], ['[0,"Ausbildung"]'.encode()])
+        store.close()
+
+    def test_append_adds_new_fields(self):
+        write_metadata_store(self.index_dir, RECORDS[:1])
+        append_metadata_store(self.index_dir, [{"id": 9, "title": "Neu", "metadata": {"remote": True}}])
+
+        store = MetadataStore(self.index_dir)
+        self.assertEqual(store.get(1, ["metadata.remote"]), {"id": 9, "metadata": {"remote": True}})
+        self.assertEqual(store[0], RECORDS[0])
+        store.close()
+
+    def test_store_without_fields_file_is_read_whole(self):
+        # Stores written before fields were encoded separately hold one JSON object per record
+        with open(os.path.join(self.index_dir, "metadata_store.bin"), "wb") as f:
+            encoded = [json.dumps(record).encode("utf-8") for record in RECORDS[:2]]
+            f.write(b"".join(encoded))
+        np.save(os.path.join(self.index_dir, METADATA_OFFSETS_FILE), np.cumsum([0] + [len(e) for e in encoded]))
+        append_metadata_store(self.index_dir, RECORDS[2:])
+
+        store = MetadataStore(self.index_dir)
+        self.assertFalse(os.path.exists(os.path.join(self.index_dir, METADATA_FIELDS_FILE)))
+        self.assertEqual(list(store), RECORDS)
+        self.assertEqual(store.get(1, ["title"]), {"id": 2, "title": "IT Berater SAP"})
+        store.close()
+
+    def test_open_metadata_prefers_store_and_falls_back_to_json(self):
+        np.save(os.path.join(self.index_dir, "embeddings_1.npy"), np.zeros((3, 2), dtype=np.float32))
+        with open(os.path.join(self.index_dir, "metadata_1.json"), "w") as f:
+            json.dump(RECORDS, f)
+
+        metadata = open_metadata(self.index_dir)
+        self.assertIsInstance(metadata, list)
+        self.assertEqual(metadata, load_metadata([os.path.join(self.index_dir, "metadata_1.json")]))
+
+        write_metadata_store(self.index_dir, metadata)
+        store = open_metadata(self.index_dir)
+        self.assertIsInstance(store, MetadataStore)
+        self.assertEqual(list(store), metadata)
+        self.assertTrue(os.path.exists(os.path.join(self.index_dir, METADATA_OFFSETS_FILE)))
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+import unittest
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.utils.executor import BoundedExecutor, MicroBatcher, Overloaded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBoundedExecutor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.executor = BoundedExecutor(max_workers=2, max_queue=1, queue_timeout=1.0, clock=self.clock)
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown()
+
+    def block(self):
+        self.started.release()
+        self.release.wait()
+        return "done"
+
+    def test_rejects_beyond_workers_and_queue(self):
+        running = [self.executor.submit(self.block) for _ in range(2)]
+        self.started.acquire()
+        self.started.acquire()
+        queued = self.executor.submit(lambda: "queued")
+        with self.assertRaises(Overloaded):
+            self.executor.submit(lambda: "rejected")
+        self.assertEqual(self.executor.stats()["running"], 2)
+        self.assertEqual(self.executor.stats()["queued"], 1)
+
+        self.release.set()
+        self.assertEqual([future.result() for future in running], ["done", "done"])
+        self.assertEqual(queued.result(), "queued")
+        stats = self.executor.stats()
+        self.assertEqual((stats["completed"], stats["rejected"], stats["queued"]), (3, 1, 0))
+        self.assertEqual(self.executor.submit(lambda: 1).result(), 1)
+
+    def test_requests_waiting_too_long_are_dropped(self):
+        running = [self.executor.submit(self.block) for _ in range(2)]
+        self.started.acquire()
+        self.started.acquire()
+        calls = []
+        queued = self.executor.submit(calls.append, 1)
+        self.clock.now = 1.5
+        self.release.set()
+
+        with self.assertRaises(Overloaded):
+            queued.result()
+        self.assertEqual(calls, [])
+        self.assertEqual(self.executor.stats()["timed_out"], 1)
+        for future in running:
+            future.result()
+
+    def test_run_awaits_without_blocking_the_loop(self):
+        async def main():
+            ticks = 0
+            task = asyncio.ensure_future(self.executor.run(self.block))
+            while not self.started.acquire(blocking=False):
+                await asyncio.sleep(0.001)
+            for _ in range(3):
+                await asyncio.sleep(0)
+                ticks += 1
+            self.release.set()
+            return await task, ticks
+
+        self.assertEqual(asyncio.run(main()), ("done", 3))
+
+    def test_cancelled_queued_request_frees_its_slot(self):
+        async def main():
+            running = [self.executor.submit(self.block) for _ in range(2)]
+            self.started.acquire()
+            self.started.acquire()
+            calls = []
+            task = asyncio.ensure_future(self.executor.run(calls.append, 1))
+            await asyncio.sleep(0)
+            self.assertEqual(self.executor.stats()["queued"], 1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.release.set()
+            for future in running:
+                future.result()
+            return calls
+
+        self.assertEqual(asyncio.run(main()), [])
+        self.assertTrue(self.executor.wait_for_idle_worker(timeout=1))
+        self.assertEqual(self.executor.in_flight, 0)
+        stats = self.executor.stats()
+        self.assertEqual((stats["queued"], stats["cancelled"], stats["completed"]), (0, 1, 2))
+
+    def test_errors_free_their_slot(self):
+        def fail():
+            raise ValueError("broken")
+
+        for _ in range(5):
+            with self.assertRaises(ValueError):
+                self.executor.submit(fail).result()
+        self.assertEqual(self.executor.stats()["queued"], 0)
+
+
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def make_batcher(self, **kwargs):
+        self.executor = BoundedExecutor(max_workers=1, max_queue=4)
+        batcher = MicroBatcher(self.process_batch, self.executor, **{"max_wait": 0, **kwargs})
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(batcher.shutdown)
+        self.addCleanup(self.release.set)
+        return batcher
+
+    def process_batch(self, items, key):
+        self.batches.append((key, list(items)))
+        self.started.set()
+        self.release.wait()
+        if "fail" in items:
+            raise ValueError("broken batch")
+        return [f"{key}:{item}" for item in items]
+
+    def occupy_worker(self, batcher):
+        """
+        Keep the only worker busy so that the following requests queue up.
+        """
+        future = batcher.submit("first", key=1)
+        self.started.wait()
+        return future
+
+    def test_pending_requests_are_processed_together(self):
+        batcher = self.make_batcher(max_batch_size=2)
+        first = self.occupy_worker(batcher)
+        futures = [batcher.submit(i, key=1) for i in range(5)]
+        self.release.set()
+
+        self.assertEqual(first.result(), "1:first")
+        self.assertEqual([future.result() for future in futures], [f"1:{i}" for i in range(5)])
+        self.assertEqual([items for _, items in self.batches], [["first"], [0, 1], [2, 3], [4]])
+        stats = batcher.stats()
+        self.assertEqual((stats["batches"], stats["completed"], stats["mean_batch_size"]), (4, 6, 1.5))
+
+    def test_only_requests_with_the_same_key_are_batched(self):
+        batcher = self.make_batcher()
+        self.occupy_worker(batcher)
+        futures = [batcher.submit(item, key=key) for item, key in (("a", 10), ("b", 20), ("c", 10))]
+        self.release.set()
+
+        self.assertEqual([future.result() for future in futures], ["10:a", "20:b", "10:c"])
+        self.assertEqual(self.batches[1:], [(10, ["a", "c"]), (20, ["b"])])
+
+    def test_requests_wait_for_others_to_join(self):
+        self.release.set()
+        batcher = self.make_batcher(max_wait=0.5, max_batch_size=3)
+        start = time.monotonic()
+        futures = [batcher.submit(i) for i in range(3)]
+        self.assertEqual([future.result() for future in futures], ["None:0", "None:1", "None:2"])
+        # A full batch does not wait out max_wait
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(self.batches, [(None, [0, 1, 2])])
+
+    def test_admission_queue_and_timeout(self):
+        batcher = self.make_batcher(max_queue=1, queue_timeout=0.05)
+        self.occupy_worker(batcher)
+        queued = batcher.submit("late", key=1)
+        with self.assertRaises(Overloaded):
+            batcher.submit("rejected", key=1)
+        time.sleep(0.1)
+        self.release.set()
+
+        with self.assertRaises(Overloaded):
+            queued.result()
+        stats = batcher.stats()
+        self.assertEqual((stats["rejected"], stats["timed_out"], stats["completed"]), (1, 1, 1))
+
+    def test_batches_share_the_executor_workers(self):
+        batcher = self.make_batcher(max_batch_size=4)
+        # A request running directly on the executor holds its only worker, so nothing is batched yet
+        direct = self.executor.submit(self.process_batch, ["direct"], "direct")
+        self.started.wait()
+        futures = [batcher.submit(i, key=1) for i in range(3)]
+        time.sleep(0.05)
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(batcher.stats()["queued"], 3)
+        self.release.set()
+
+        self.assertEqual(direct.result(), ["direct:direct"])
+        self.assertEqual([future.result() for future in futures], ["1:0", "1:1", "1:2"])
+        self.assertEqual(self.batches[1:], [(1, [0, 1, 2])])
+        self.assertEqual(self.executor.stats()["completed"], 2)
+
+    def test_errors_reach_every_request_of_the_batch(self):
+        batcher = self.make_batcher()
+        self.occupy_worker(batcher)
+        futures = [batcher.submit(item, key=1) for item in ("ok", "fail")]
+        self.release.set()
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result()
+        self.assertEqual(batcher.submit("again", key=1).result(), "1:again")
+
+    def test_run_from_event_loop(self):
+        self.release.set()
+        batcher = self.make_batcher(max_wait=0.5, max_batch_size=4)
+
+        async def main():
+            return await asyncio.gather(*(batcher.run(i, key=5) for i in range(4)))
+
+        self.assertEqual(asyncio.run(main()), ["5:0", "5:1", "5:2", "5:3"])
+        self.assertEqual(len(self.batches), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
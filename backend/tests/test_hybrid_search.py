@@ -0,0 +1,164 @@
+import unittest
+import os
+import sys
+import threading
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.document_store import project_record
+from backend.app.utils.cache import ResultCache
+from backend.app.services.hybrid_search import HybridSearchService, reciprocal_rank_fusion, weighted_score_fusion
+
+
+def make_results(doc_ids, scores):
+    return [{"score": score, "index": doc_id} for doc_id, score in zip(doc_ids, scores)]
+
+
+def ids(results):
+    return [result["metadata"]["id"] for result in results]
+
+
+class RecordingRetriever:
+    """
+    Retriever returning a fixed ranking and recording the thread it ran on and the metadata it read.
+    """
+    def __init__(self, results):
+        self.results = results
+        self.threads = []
+        self.calls = []
+        self.fetched = []
+
+    def rank(self, query, top_k):
+        self.threads.append(threading.get_ident())
+        self.calls.append((query, top_k))
+        results = self.results[:top_k]
+        return [result["index"] for result in results], [result["score"] for result in results]
+
+    def rank_batch(self, queries, top_k):
+        return [self.rank(query, top_k) for query in queries]
+
+    def fetch_metadata(self, indices, fields=None):
+        self.fetched.extend(indices)
+        records = [{"id": i, "title": f"doc {i}", "metadata": {"requirements": "r", "location": "x"}} for i in indices]
+        return [project_record(record, fields) for record in records]
+
+
+class TestFusion(unittest.TestCase):
+    def test_reciprocal_rank_fusion_rewards_agreement(self):
+        dense = make_results([1, 2, 3], [0.9, 0.8, 0.7])
+        sparse = make_results([3, 4, 1], [12.0, 8.0, 2.0])
+        fused = reciprocal_rank_fusion([dense, sparse], k=60)
+
+        self.assertEqual([result["index"] for result in fused], [1, 3, 2, 4])
+        self.assertAlmostEqual(fused[0]["score"], 1 / 61 + 1 / 63)
+
+    def test_weighted_fusion_normalizes_each_list(self):
+        dense = make_results([1, 2], [0.9, 0.5])
+        sparse = make_results([2, 3], [20.0, 10.0])
+        fused = weighted_score_fusion([dense, sparse], [0.5, 0.5])
+
+        self.assertEqual([result["index"] for result in fused], [1, 2, 3])
+        self.assertAlmostEqual(fused[0]["score"], 0.5)
+        self.assertAlmostEqual(fused[1]["score"], 0.5)
+
+
+class TestHybridSearchService(unittest.TestCase):
+    def test_hybrid_search_runs_retrievers_concurrently(self):
+        dense = RecordingRetriever(make_results([1, 2, 3], [0.9, 0.8, 0.7]))
+        sparse = RecordingRetriever(make_results([3, 4], [5.0, 4.0]))
+        service = HybridSearchService(dense, sparse, parallel=True)
+
+        results, timings = service.search("query", top_k=2)
+
+        self.assertEqual(service.mode, "hybrid")
+        self.assertEqual(ids(results), [3, 1])
+        self.assertEqual(set(timings), {"dense_ms", "sparse_ms", "fusion_ms", "fetch_ms", "total_ms"})
+        self.assertNotEqual(dense.threads[0], sparse.threads[0])
+
+    def test_hybrid_batch_runs_retrievers_concurrently(self):
+        dense = RecordingRetriever(make_results([1, 2, 3], [0.9, 0.8, 0.7]))
+        sparse = RecordingRetriever(make_results([3, 4], [5.0, 4.0]))
+        service = HybridSearchService(dense, sparse, parallel=True)
+
+        batch, timings = service.search_batch_timed(["a", "b"], top_k=2)
+
+        self.assertEqual([ids(results) for results in batch], [ids(service.search("a", top_k=2)[0])] * 2)
+        self.assertEqual(set(timings), {"dense_ms", "sparse_ms", "fusion_ms", "fetch_ms", "total_ms"})
+        self.assertNotEqual(dense.threads[0], sparse.threads[0])
+
+    def test_single_retriever_modes(self):
+        sparse = RecordingRetriever(make_results([3, 4], [5.0, 4.0]))
+        service = HybridSearchService(sparse_service=sparse)
+
+        results, timings = service.search("query", top_k=1)
+
+        self.assertEqual(service.mode, "sparse")
+        self.assertEqual(ids(results), [3])
+        self.assertEqual(set(timings), {"sparse_ms", "fetch_ms", "total_ms"})
+        self.assertEqual(len(service.search_batch(["a", "b"], top_k=2)), 2)
+
+    def test_result_cache_answers_repeated_queries(self):
+        dense = RecordingRetriever(make_results(list(range(50)), [1.0 - i / 100 for i in range(50)]))
+        service = HybridSearchService(dense_service=dense, result_cache=ResultCache(depth=1000), index_version="v1")
+
+        first, _ = service.search("query", top_k=10)
+        second, timings = service.search("query", top_k=5)
+        batch = service.search_batch(["query", "query"], top_k=3)
+
+        self.assertEqual(dense.calls, [("query", 1000)])
+        self.assertEqual(second, first[:5])
+        self.assertEqual(set(timings), {"cache_ms", "fetch_ms", "total_ms"})
+        self.assertEqual(batch, [first[:3], first[:3]])
+
+    def test_hybrid_cache_entries_stop_at_fusion_depth(self):
+        dense = RecordingRetriever(make_results([1, 2, 3], [0.9, 0.8, 0.7]))
+        sparse = RecordingRetriever(make_results([3, 4], [5.0, 4.0]))
+        service = HybridSearchService(dense, sparse, fusion_depth=100, result_cache=ResultCache(depth=1000))
+
+        uncached, _ = HybridSearchService(dense, sparse, fusion_depth=100).search("query", top_k=2)
+        cached, _ = service.search("query", top_k=2)
+
+        self.assertEqual(dense.calls[-1], ("query", 100))
+        self.assertEqual(cached, uncached)
+
+    def test_hybrid_entries_serve_only_their_candidate_depth(self):
+        dense = RecordingRetriever(make_results([1, 2, 3, 4], [0.9, 0.8, 0.7, 0.6]))
+        sparse = RecordingRetriever(make_results([4, 3, 5], [5.0, 4.0, 3.0]))
+        service = HybridSearchService(dense, sparse, fusion_depth=2, result_cache=ResultCache())
+
+        service.search("query", top_k=3)
+        cached, timings = service.search("query", top_k=2)
+        self.assertNotIn("cache_ms", timings)
+        self.assertEqual(dense.calls, [("query", 3), ("query", 2)])
+        self.assertEqual(ids(cached), ids(HybridSearchService(dense, sparse, fusion_depth=2).search("query", top_k=2)[0]))
+        self.assertIn("cache_ms", service.search("query", top_k=1)[1])
+
+    def test_short_rankings_are_complete_only_from_exhaustive_retrievers(self):
+        for exhaustive in (False, True):
+            dense = RecordingRetriever(make_results([1, 2, 3], [0.9, 0.8, 0.7]))
+            dense.exhaustive = exhaustive
+            service = HybridSearchService(dense_service=dense, result_cache=ResultCache(depth=5))
+            service.search("query", top_k=2)
+            service.search("query", top_k=10)
+            self.assertEqual(len(dense.calls), 1 if exhaustive else 2)
+
+    def test_metadata_is_fetched_for_final_hits_only(self):
+        dense = RecordingRetriever(make_results([1, 2, 3], [0.9, 0.8, 0.7]))
+        sparse = RecordingRetriever(make_results([3, 4], [5.0, 4.0]))
+        service = HybridSearchService(dense, sparse, fusion_depth=100)
+
+        results, _ = service.search("query", top_k=2, fields=["title", "metadata.requirements"])
+
+        self.assertEqual(dense.fetched, [3, 1])
+        self.assertEqual(sparse.fetched, [])
+        self.assertEqual(results[0]["metadata"], {"id": 3, "title": "doc 3", "metadata": {"requirements": "r"}})
+        self.assertEqual(results[0]["index"], 3)
+
+    def test_requires_a_retriever(self):
+        with self.assertRaises(ValueError):
+            HybridSearchService()
+
+
+if __name__ == "__main__":
+    unittest.main()
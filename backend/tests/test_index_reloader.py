@@ -0,0 +1,153 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.index_manifest import write_manifest
+from backend.app.services.index_reloader import IndexReloader
+from backend.app.utils.cache import ResultCache
+
+
+class FakeService:
+    """
+    Stand-in for HybridSearchService recording whether it was closed.
+    """
+    def __init__(self, index_dir, version, previous, result_cache):
+        self.index_dir = index_dir
+        self.index_version = version
+        self.previous = previous
+        self.result_cache = result_cache
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestIndexReloader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = self.tmp_dir.name
+        write_manifest(self.index_dir, num_docs=1)
+        self.result_cache = ResultCache()
+        self.loads = []
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load_service(self, index_dir, version, previous):
+        self.loads.append(version)
+        return FakeService(index_dir, version, previous, self.result_cache)
+
+    def test_reload_swaps_and_drains_the_old_service(self):
+        reloader = IndexReloader(self.load_service, self.index_dir, drain_timeout=5)
+        old = reloader.service
+        self.assertEqual(reloader.reload()["status"], "unchanged")
+        self.assertEqual(len(self.loads), 1)
+
+        new_version = write_manifest(self.index_dir, num_docs=2)["version"]
+        self.result_cache.put("q", old.index_version, [{"score": 1.0, "index": 0}], 10)
+        request_started, release_request = threading.Event(), threading.Event()
+
+        def request():
+            with reloader.acquire() as service:
+                request_started.set()
+                release_request.wait()
+                self.assertIs(service, old)
+
+        thread = threading.Thread(target=request)
+        thread.start()
+        request_started.wait()
+        reload_thread = threading.Thread(target=reloader.reload)
+        reload_thread.start()
+
+        # New requests are served by the new version while the old one drains
+        while reloader.service is old:
+            time.sleep(0.001)
+        with reloader.acquire() as service:
+            self.assertEqual(service.index_version, new_version)
+            self.assertIs(service.previous, old)
+        self.assertFalse(old.closed)
+
+        release_request.set()
+        thread.join()
+        reload_thread.join()
+        self.assertTrue(old.closed)
+        self.assertEqual(reloader.last_reload["status"], "reloaded")
+        self.assertTrue(reloader.last_reload["drained"])
+        self.assertEqual(len(self.result_cache), 0)
+
+    def test_service_outlasting_the_drain_timeout_is_closed_by_its_last_request(self):
+        reloader = IndexReloader(self.load_service, self.index_dir, drain_timeout=0.01)
+        old = reloader.service
+        write_manifest(self.index_dir, num_docs=2)
+
+        with reloader.acquire():
+            with reloader.acquire():
+                outcome = reloader.reload()
+            self.assertFalse(outcome["drained"])
+            self.assertFalse(old.closed)
+        self.assertTrue(old.closed)
+
+        # Requests on the new version close nothing
+        with reloader.acquire() as service:
+            pass
+        self.assertFalse(service.closed)
+
+    def test_version_published_during_load_is_loaded_again(self):
+        def load_service(index_dir, version, previous):
+            if not self.loads:
+                write_manifest(self.index_dir, num_docs=2)
+            return self.load_service(index_dir, version, previous)
+
+        reloader = IndexReloader(load_service, self.index_dir)
+        self.assertEqual(len(self.loads), 2)
+        self.assertEqual(reloader.reload()["status"], "unchanged")
+
+    def test_reload_waits_for_a_directory_being_swapped(self):
+        index_dir = os.path.join(self.tmp_dir.name, "index")
+        new_dir = os.path.join(self.tmp_dir.name, "index.building")
+        os.makedirs(index_dir)
+        os.makedirs(new_dir)
+        write_manifest(index_dir, num_docs=1)
+        reloader = IndexReloader(self.load_service, index_dir)
+
+        # Between the two renames of a publish, index_dir is missing
+        new_version = write_manifest(new_dir, num_docs=2)["version"]
+        os.rename(index_dir, index_dir + ".old")
+        threading.Timer(0.05, os.rename, (new_dir, index_dir)).start()
+
+        self.assertEqual(reloader.reload()["index_version"], new_version)
+        self.assertEqual(reloader.service.index_dir, os.path.realpath(index_dir))
+
+    def test_failed_reload_keeps_serving(self):
+        reloader = IndexReloader(self.load_service, self.index_dir)
+        old = reloader.service
+        write_manifest(self.index_dir, num_docs=2)
+        reloader.load_service = lambda *args: (_ for _ in ()).throw(ValueError("broken index"))
+
+        self.assertTrue(reloader.reload_in_background())
+        while reloader.last_reload is None:
+            time.sleep(0.001)
+        self.assertEqual(reloader.last_reload["status"], "failed")
+        self.assertIs(reloader.service, old)
+        self.assertFalse(old.closed)
+
+    def test_watcher_picks_up_new_versions(self):
+        reloader = IndexReloader(self.load_service, self.index_dir, poll_interval=0.01)
+        new_version = write_manifest(self.index_dir, num_docs=2)["version"]
+        deadline = time.monotonic() + 5
+        while reloader.service.index_version != new_version and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(reloader.service.index_version, new_version)
+
+        reloader.close()
+        self.assertTrue(reloader.service.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,346 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.delta_index import DocumentHashes, load_tombstones
+from backend.app.models.document_store import MetadataStore
+from backend.app.models.index_manifest import index_version, read_build_checkpoint, read_manifest
+from backend.app.models.vector_store import list_index_files
+from backend.app.services import indexing_service, query_service
+from backend.app.services.sparse_search import SparseSearchService
+from backend.app.services.data_loader import document_type
+
+
+class HashEncoder:
+    """
+    Stand-in for SentenceTransformer: deterministic per-text vectors. Module-level so that
+    spawned encoding processes can unpickle it.
+    """
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def encode(self, texts, show_progress_bar=False, convert_to_numpy=True):
+        return np.array([np.random.default_rng(sum(map(ord, text))).standard_normal(8) for text in texts], dtype=np.float32)
+
+
+# A script building an index with spawned encoding processes, like jobsearch_tests/jobsearch_indexing.py
+BUILD_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+from backend.app.services import indexing_service
+from backend.tests.test_indexing_service import HashEncoder, make_documents
+
+indexing_service.SentenceTransformer = HashEncoder
+
+
+def main():
+    service = indexing_service.IndexingService("fake", index_dir={index_dir!r}, batch_size=5, num_workers=2)
+    service.create_embeddings(make_documents(23))
+
+
+{entry_point}
+"""
+
+
+def make_documents(count):
+    document = document_type(("title", "company"))
+    return [document(title=f"Stelle {i}" if i % 4 else "", company=f"Firma {i}") for i in range(count)]
+
+
+class TestIndexingService(unittest.TestCase):
+    def build(self, index_dir, **kwargs):
+        with mock.patch.object(indexing_service, "SentenceTransformer", HashEncoder):
+            service = indexing_service.IndexingService("fake", index_dir=index_dir, batch_size=5, **kwargs)
+            service.create_embeddings(iter(make_documents(23)))
+        embedding_paths, _ = list_index_files(index_dir)
+        return [np.load(path) for path in embedding_paths]
+
+    def test_worker_pool_matches_single_process(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            expected = self.build(os.path.join(tmp_dir, "single"))
+            shards = self.build(os.path.join(tmp_dir, "pool"), num_workers=2, encode_chunk_size=2)
+
+        self.assertEqual([len(shard) for shard in shards], [5, 5, 5, 2])
+        for shard, expected_shard in zip(shards, expected):
+            np.testing.assert_array_equal(shard, expected_shard)
+
+    def run_build_script(self, tmp_dir, entry_point):
+        script = os.path.join(tmp_dir, "build.py")
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+        with open(script, "w") as f:
+            f.write(BUILD_SCRIPT.format(root=root, index_dir=os.path.join(tmp_dir, "index"), entry_point=entry_point))
+        return subprocess.run([sys.executable, script], capture_output=True, text=True, timeout=120)
+
+    def test_script_with_main_guard_builds_with_worker_pool(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            result = self.run_build_script(tmp_dir, 'if __name__ == "__main__":\n    main()')
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(read_manifest(os.path.join(tmp_dir, "index"))["num_docs"], 17)
+
+    def test_script_without_main_guard_fails_with_worker_pool(self):
+        # Spawned workers re-import the script, and an unguarded build starts a pool from each of them
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            result = self.run_build_script(tmp_dir, "main()")
+            self.assertNotEqual(result.returncode, 0)
+            self.assertIn("bootstrapping phase", result.stderr)
+
+
+class Crash(Exception):
+    pass
+
+
+def crash_after(documents, count):
+    yield from documents[:count]
+    raise Crash()
+
+
+class TestResumableBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmp_dir.name, "index")
+        self.documents = make_documents(23)
+        self.patch = mock.patch.object(indexing_service, "SentenceTransformer", HashEncoder)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp_dir.cleanup()
+
+    def service(self, index_dir=None, **kwargs):
+        return indexing_service.IndexingService("fake", index_dir=index_dir or self.index_dir, batch_size=5, **kwargs)
+
+    def test_interrupted_build_resumes_and_keeps_serving_previous_index(self):
+        self.service().create_embeddings(self.documents[:7])
+        previous_version = index_version(self.index_dir)
+
+        with self.assertRaises(Crash):
+            self.service().create_embeddings(crash_after(self.documents, 17))
+        # Shard 2 was being encoded when the stream failed and is still saved; shard 3 was incomplete
+        checkpoint = read_build_checkpoint(self.index_dir + ".building")
+        self.assertEqual((checkpoint["num_shards"], checkpoint["documents_seen"]), (2, 14))
+        self.assertEqual(index_version(self.index_dir), previous_version)
+
+        service = self.service()
+        with mock.patch.object(service.model, "encode", wraps=service.model.encode) as encode:
+            service.create_embeddings(iter(self.documents))
+        # Only documents 14-22 are read again, and the 7 of them with a title encoded
+        self.assertEqual(sum(len(call.args[0]) for call in encode.call_args_list), 7)
+
+        reference_dir = os.path.join(self.tmp_dir.name, "reference")
+        self.service(reference_dir).create_embeddings(self.documents)
+        for path, reference_path in zip(*(list_index_files(d)[0] for d in (self.index_dir, reference_dir))):
+            np.testing.assert_array_equal(np.load(path), np.load(reference_path))
+        self.assertEqual(len(DocumentHashes.load(self.index_dir)), len(DocumentHashes.load(reference_dir)))
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["index", "reference"])
+
+    def test_changed_settings_restart_the_build(self):
+        with self.assertRaises(Crash):
+            self.service().create_embeddings(crash_after(self.documents, 17))
+        self.service(field_to_index="company").create_embeddings(self.documents)
+        self.assertEqual(read_manifest(self.index_dir)["num_docs"], 23)
+
+    def test_changed_input_restarts_the_build(self):
+        with self.assertRaises(Crash):
+            self.service().create_embeddings(crash_after(self.documents, 17))
+        documents = self.documents[::-1]
+
+        service = self.service()
+        with mock.patch.object(service.model, "encode", wraps=service.model.encode) as encode:
+            service.create_embeddings(documents)
+
+        reference_dir = os.path.join(self.tmp_dir.name, "reference")
+        self.service(reference_dir).create_embeddings(documents)
+        self.assertEqual(sum(len(call.args[0]) for call in encode.call_args_list), len(DocumentHashes.load(reference_dir)))
+        for path, reference_path in zip(*(list_index_files(d)[0] for d in (self.index_dir, reference_dir))):
+            np.testing.assert_array_equal(np.load(path), np.load(reference_path))
+
+    def test_symlinked_index_is_repointed(self):
+        target = os.path.join(self.tmp_dir.name, "index.v0")
+        os.makedirs(target)
+        os.symlink("index.v0", self.index_dir)
+
+        self.service().create_embeddings(self.documents)
+
+        version = read_manifest(self.index_dir)["version"]
+        self.assertEqual(os.readlink(self.index_dir), f"index.{version}")
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["index", f"index.{version}"])
+
+
+Posting = document_type(("ref", "title", "company"))
+
+
+class TestIncrementalIndexing(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmp_dir.name, "index")
+        self.postings = [Posting(ref=f"p{i}", title=f"Stelle {i}", company=f"Firma {i % 3}") for i in range(12)]
+        self.patch = mock.patch.object(indexing_service, "SentenceTransformer", HashEncoder)
+        self.patch.start()
+        self.service = indexing_service.IndexingService("fake", index_dir=self.index_dir, batch_size=5, key_field="ref",
+                                                        ann_nlist=2, quantization="int8")
+        self.service.create_embeddings(self.postings)
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp_dir.cleanup()
+
+    def query_service(self, **kwargs):
+        with mock.patch.object(query_service, "SentenceTransformer", HashEncoder):
+            return query_service.QueryService("fake", index_dir=self.index_dir, **kwargs)
+
+    def snapshot(self):
+        snapshot = list(self.postings)
+        snapshot[1] = Posting(ref="p1", title="Stelle 1 (m/w/d)", company="Firma 1")  # re-encoded
+        snapshot[2] = Posting(ref="p2", title="Stelle 2", company="Firma X")  # metadata only
+        del snapshot[3]  # deleted
+        snapshot.append(Posting(ref="p12", title="Stelle 12", company="Firma 0"))  # new
+        return snapshot
+
+    def update(self):
+        return self.service.update_index(self.snapshot())
+
+    def test_update_writes_delta_shards_and_tombstones(self):
+        stats = self.update()
+
+        self.assertEqual(stats, {"added": 1, "updated": 2, "encoded": 2, "deleted": 1, "unchanged": 9})
+        embedding_paths, _ = list_index_files(self.index_dir)
+        self.assertEqual(len(embedding_paths), 4)
+        manifest = read_manifest(self.index_dir)
+        self.assertEqual((manifest["num_docs"], manifest["num_deleted"], manifest["num_base_shards"]), (15, 3, 3))
+
+        # Applying the same snapshot again is a no-op; upserts only touch the given keys
+        self.assertEqual(self.update(), {"added": 0, "updated": 0, "encoded": 0, "deleted": 0, "unchanged": 12})
+        stats = self.service.update_index([Posting(ref="p5", title="Stelle 5", company="Firma 9")], deleted_keys=["p0"])
+        self.assertEqual(stats, {"added": 0, "updated": 1, "encoded": 0, "deleted": 1, "unchanged": 0})
+        self.assertEqual(read_manifest(self.index_dir)["num_deleted"], 5)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["index"])
+
+    def test_without_key_field_metadata_changes_keep_the_vector(self):
+        index_dir = os.path.join(self.tmp_dir.name, "by_text")
+        service = indexing_service.IndexingService("fake", index_dir=index_dir, batch_size=5)
+        service.create_embeddings(self.postings)
+
+        snapshot = list(self.postings)
+        snapshot[2] = Posting(ref="p2", title="Stelle 2", company="Firma X")  # metadata only
+        snapshot[4] = Posting(ref="p4", title="Stelle 4 (m/w/d)", company="Firma 1")  # new title
+        with mock.patch.object(service.model, "encode", wraps=service.model.encode) as encode:
+            stats = service.update_index(snapshot)
+
+        self.assertEqual(stats, {"added": 1, "updated": 1, "encoded": 1, "deleted": 1, "unchanged": 10})
+        self.assertEqual(sum(len(call.args[0]) for call in encode.call_args_list), 1)
+        with mock.patch.object(query_service, "SentenceTransformer", HashEncoder):
+            top = query_service.QueryService("fake", index_dir=index_dir).search("Stelle 2", top_k=1)[0]
+        self.assertEqual(top["metadata"]["metadata"]["company"], "Firma X")
+
+    def test_without_key_field_upserts_keep_postings_with_the_same_title(self):
+        index_dir = os.path.join(self.tmp_dir.name, "by_text")
+        service = indexing_service.IndexingService("fake", index_dir=index_dir, batch_size=5)
+        service.create_embeddings([Posting(ref="A", title="Koch", company="A"), Posting(ref="B", title="Koch", company="B"),
+                                   Posting(ref="C", title="Maler", company="C")])
+
+        def live_companies():
+            store = MetadataStore(index_dir)
+            deleted = load_tombstones(index_dir, len(store))
+            companies = sorted(store[row]["metadata"]["company"] for row in range(len(store)) if not deleted[row])
+            store.close()
+            return companies
+
+        stats = service.update_index([Posting(ref="Z", title="Koch", company="Z")], deleted_keys=[])
+        self.assertEqual(stats, {"added": 0, "updated": 1, "encoded": 0, "deleted": 0, "unchanged": 0})
+        self.assertEqual(live_companies(), ["B", "C", "Z"])
+
+        # A posting identical to an indexed one matches that row, not the oldest with its title
+        stats = service.update_index([Posting(ref="Z", title="Koch", company="Z")], deleted_keys=[])
+        self.assertEqual(stats, {"added": 0, "updated": 0, "encoded": 0, "deleted": 0, "unchanged": 1})
+        self.assertEqual(live_companies(), ["B", "C", "Z"])
+
+    def test_interrupted_update_leaves_index_untouched(self):
+        files = {name: os.path.getmtime(os.path.join(self.index_dir, name)) for name in os.listdir(self.index_dir)}
+        version = index_version(self.index_dir)
+
+        with self.assertRaises(Crash):
+            self.service.update_index(crash_after(self.snapshot(), 12))
+
+        self.assertEqual(index_version(self.index_dir), version)
+        self.assertEqual({name: os.path.getmtime(os.path.join(self.index_dir, name)) for name in os.listdir(self.index_dir)}, files)
+        self.assertEqual(self.update()["added"], 1)
+
+    def test_queries_mask_deleted_rows(self):
+        self.update()
+        for kwargs in ({}, {"mmap": True, "ann": True, "nprobe": 2}, {"quantization": "int8"}):
+            service = self.query_service(**kwargs)
+            refs = [result["metadata"]["metadata"]["ref"] for result in service.search("Stelle 3", top_k=20)]
+            self.assertEqual(sorted(refs), sorted(f"p{i}" for i in range(13) if i != 3), kwargs)
+            top = service.search("Stelle 2", top_k=1)[0]
+            self.assertEqual(top["metadata"]["metadata"]["company"], "Firma X")
+
+        sparse = SparseSearchService(self.index_dir)
+        self.assertEqual([result["metadata"]["metadata"]["ref"] for result in sparse.search("3", top_k=5)], [])
+
+    def test_compaction_drops_tombstoned_rows(self):
+        self.update()
+        self.assertTrue(self.service.compaction_due(max_deleted_fraction=0.1))
+        self.assertFalse(self.service.compaction_due(max_deleted_fraction=0.5))
+        expected = [result["metadata"] for result in self.query_service().search("Stelle 1 (m/w/d)", top_k=20)]
+
+        self.service.compact()
+
+        self.assertFalse(os.path.exists(os.path.join(self.index_dir, "tombstones.npy")))
+        self.assertEqual(read_manifest(self.index_dir)["num_docs"], 12)
+        self.assertEqual([result["metadata"] for result in self.query_service().search("Stelle 1 (m/w/d)", top_k=20)], expected)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["index"])
+
+
+class TestDuplicateCollapsing(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmp_dir.name, "index")
+        # "Koch" reposted as an exact ("koch ") and a near duplicate (same HashEncoder vector as "hcoK")
+        titles = ["Koch", "Pfleger", "koch ", "Lehrer", "hcoK", "Koch"]
+        document = document_type(("title",))
+        with mock.patch.object(indexing_service, "SentenceTransformer", HashEncoder):
+            self.service = indexing_service.IndexingService("fake", index_dir=self.index_dir, batch_size=4, dedup_threshold=0.99)
+            self.service.create_embeddings([document(title=title) for title in titles])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def query_service(self, **kwargs):
+        with mock.patch.object(query_service, "SentenceTransformer", HashEncoder):
+            return query_service.QueryService("fake", index_dir=self.index_dir, **kwargs)
+
+    def test_unique_vectors_are_scanned_and_expanded(self):
+        service = self.query_service(dedup=True)
+        self.assertEqual(service.unique_matrix.shape, (3, 8))
+
+        indices, scores = service.rank("Koch", top_k=6)
+        self.assertEqual(indices.tolist()[:4], [5, 4, 2, 0])
+        self.assertEqual(sorted(indices.tolist()), list(range(6)))
+        expected_indices, expected_scores = self.query_service().rank("Koch", top_k=6)
+        self.assertAlmostEqual(float(scores[0]), float(expected_scores[0]), places=5)
+        self.assertEqual(service.rank("Koch", top_k=2)[0].tolist(), [5, 4])
+
+    def test_collapse_returns_one_document_per_group(self):
+        for kwargs in ({"dedup": True}, {"mmap": True}):
+            service = self.query_service(collapse_duplicates=True, **kwargs)
+            indices, _ = service.rank("Koch", top_k=5)
+            self.assertEqual(sorted(indices.tolist()), [1, 3, 5], kwargs)
+            batch = service.rank_batch(["Koch", "Lehrer"], top_k=2)
+            self.assertEqual(len(set(service.duplicate_groups.group_of[batch[0][0]].tolist())), 2)
+
+    def test_updates_remove_stale_groups(self):
+        document = document_type(("title",))
+        with mock.patch.object(indexing_service, "SentenceTransformer", HashEncoder):
+            self.service.update_index([document(title="Bäcker")], deleted_keys=[])
+        self.assertIsNone(self.query_service(dedup=True).unique_matrix)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.pq_index import ProductQuantizer
+from backend.app.models.vector_store import normalize_rows, top_k_indices
+
+
+class TestProductQuantizer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Small clustered corpus and a PQ index over it.
+        """
+        rng = np.random.default_rng(5)
+        topics = normalize_rows(rng.standard_normal((50, 32)).astype(np.float32))
+        matrix = topics[rng.integers(0, 50, 4000)] + 0.1 * rng.standard_normal((4000, 32)).astype(np.float32)
+        cls.matrix = normalize_rows(matrix.astype(np.float32))
+        cls.queries = cls.matrix[rng.choice(4000, 10, replace=False)]
+        cls.quantizer = ProductQuantizer.train(cls.matrix, num_subspaces=8, iterations=8)
+        cls.quantizer.encode(cls.matrix, block_size=1500)
+
+    def test_codes_are_one_byte_per_subspace(self):
+        self.assertEqual(self.quantizer.codes.shape, (8, 4000))
+        self.assertEqual(self.quantizer.codes.dtype, np.uint8)
+        self.assertEqual(self.quantizer.codes.nbytes * 16, self.matrix.nbytes)
+
+    def test_adc_scores_match_reconstruction(self):
+        """
+        ADC scores equal the dot product of the query with the decoded vectors.
+        """
+        reconstructed = self.quantizer._reconstruct(self.quantizer.codes)
+        for query in self.queries:
+            indices, scores = self.quantizer.search(query, 50, block_size=1000)
+            np.testing.assert_allclose(scores, reconstructed[indices] @ query, rtol=1e-4, atol=1e-5)
+            np.testing.assert_array_equal(indices, top_k_indices(reconstructed @ query, 50)[:len(indices)])
+
+    def test_reranked_candidates_recover_exact_top_k(self):
+        recalls = []
+        for query in self.queries:
+            candidates, _ = self.quantizer.search(query, 100)
+            expected = top_k_indices(self.matrix @ query, 10)
+            recalls.append(len(np.intersect1d(candidates, expected)) / 10)
+        self.assertGreaterEqual(np.mean(recalls), 0.9)
+
+    def test_opq_rotation_is_orthogonal(self):
+        quantizer = ProductQuantizer.train(self.matrix, num_subspaces=8, iterations=4, opq_iterations=2)
+        np.testing.assert_allclose(quantizer.rotation @ quantizer.rotation.T, np.eye(32), atol=1e-4)
+        quantizer.encode(self.matrix)
+        indices, _ = quantizer.search(self.queries[0], 100)
+        self.assertIn(top_k_indices(self.matrix @ self.queries[0], 1)[0], indices)
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            quantizer = ProductQuantizer(self.quantizer.codebooks)
+            quantizer.save(index_dir, self.matrix, block_size=1500)
+            loaded = ProductQuantizer.load(index_dir, mmap=True)
+            np.testing.assert_array_equal(loaded.codes, self.quantizer.codes)
+            self.assertIsNone(loaded.rotation)
+            del quantizer, loaded
+
+    def test_extend_appends_codes_of_new_rows(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            quantizer = ProductQuantizer(self.quantizer.codebooks)
+            quantizer.save(index_dir, self.matrix[:3000])
+            loaded = ProductQuantizer.load(index_dir, mmap=True)
+            loaded.extend(self.matrix[3000:], block_size=300)
+            loaded.save(index_dir)
+            np.testing.assert_array_equal(ProductQuantizer.load(index_dir).codes, self.quantizer.codes)
+            del quantizer, loaded
+
+    def test_subspaces_must_divide_dimension(self):
+        with self.assertRaises(ValueError):
+            ProductQuantizer.train(self.matrix, num_subspaces=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
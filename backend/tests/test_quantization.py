@@ -0,0 +1,64 @@
+import unittest
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.quantization import QuantizedMatrix, quantized_matrix_file
+from backend.app.models.vector_store import normalize_rows, top_k_indices
+
+
+class TestQuantizedMatrix(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.matrix = normalize_rows(rng.standard_normal((3000, 64)).astype(np.float32))
+        self.queries = normalize_rows(rng.standard_normal((10, 64)).astype(np.float32))
+
+    def test_int8_scores_approximate_float32(self):
+        quantized = QuantizedMatrix.quantize(self.matrix, "int8", block_size=700)
+        self.assertEqual(quantized.codes.dtype, np.int8)
+        self.assertLess(quantized.nbytes, self.matrix.nbytes / 3)
+
+        for query in self.queries:
+            indices, scores = quantized.search(query, 3000, block_size=700)
+            np.testing.assert_allclose(scores, (self.matrix @ query)[indices], atol=0.02)
+
+    def test_candidates_contain_exact_top_k(self):
+        """
+        Re-ranking a modest candidate list recovers the exact top-10 on random data.
+        """
+        for kind in ("float16", "int8"):
+            quantized = QuantizedMatrix.quantize(self.matrix, kind)
+            for query in self.queries:
+                candidates, _ = quantized.search(query, 100)
+                expected = top_k_indices(self.matrix @ query, 10)
+                self.assertTrue(set(expected.tolist()) <= set(candidates.tolist()), kind)
+
+    def test_batch_matches_single_query_search(self):
+        quantized = QuantizedMatrix.quantize(self.matrix, "int8")
+        for query, (indices, scores) in zip(self.queries, quantized.search_batch(self.queries, 20, block_size=1000)):
+            expected_indices, expected_scores = quantized.search(query, 20, block_size=1000)
+            np.testing.assert_array_equal(indices, expected_indices)
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+    def test_write_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            for kind in ("float16", "int8"):
+                path = QuantizedMatrix.write(index_dir, self.matrix, kind, block_size=1000)
+                self.assertEqual(os.path.basename(path), quantized_matrix_file(kind))
+                loaded = QuantizedMatrix.load(index_dir, kind, mmap=True)
+                expected = QuantizedMatrix.quantize(self.matrix, kind)
+                np.testing.assert_array_equal(loaded.codes, expected.codes)
+                self.assertEqual(loaded.kind, kind)
+                del loaded
+
+    def test_rejects_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            QuantizedMatrix.quantize(self.matrix, "int4")
+
+
+if __name__ == "__main__":
+    unittest.main()
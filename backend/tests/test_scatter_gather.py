@@ -0,0 +1,142 @@
+import unittest
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.index_manifest import read_manifest
+from backend.app.services import indexing_service, query_service
+from backend.app.services.data_loader import document_type
+from backend.app.services.scatter_gather import ScatterGatherSearchService, ShardCluster, ShardUnavailable
+from backend.app.services.shard_search import ShardSearchService, ShardServer
+from backend.tests.test_indexing_service import HashEncoder
+
+AUTHKEY = b"test"
+Posting = document_type(("ref", "title", "company"))
+
+
+class SwitchableShard:
+    """
+    Wraps a ShardSearchService to make a node slow or failing on demand.
+    """
+    def __init__(self, service):
+        self.service = service
+        self.delay = 0.0
+        self.down = False
+
+    def __getattr__(self, name):
+        method = getattr(self.service, name)
+
+        def call(*args):
+            time.sleep(self.delay)
+            if self.down:
+                raise RuntimeError("shard is down")
+            return method(*args)
+        return call
+
+
+def free_address():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+
+class TestScatterGather(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.index_dir = os.path.join(cls.tmp_dir.name, "index")
+        postings = [Posting(ref=f"p{i}", title=f"Stelle {i % 9}", company=f"Firma {i}") for i in range(17)]
+        with mock.patch.object(indexing_service, "SentenceTransformer", HashEncoder):
+            service = indexing_service.IndexingService("fake", index_dir=cls.index_dir, batch_size=5, key_field="ref")
+            service.create_embeddings(postings)
+            # A delta shard and tombstones, so the shards have uneven sizes and deleted rows
+            service.update_index([Posting(ref="p17", title="Stelle 3", company="Firma 17")], deleted_keys=["p3", "p12"])
+        with mock.patch.object(query_service, "SentenceTransformer", HashEncoder):
+            cls.expected = query_service.QueryService("fake", index_dir=cls.index_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def setUp(self):
+        self.servers = []
+        # Shards 1-2 and 3-5 (the delta shard), each group on two nodes
+        self.nodes = [[self.serve([1, 2]), self.serve([1, 2])], [self.serve([3, 4, 5]), self.serve([3, 4, 5])]]
+
+    def tearDown(self):
+        for server in self.servers:
+            server.close()
+
+    def serve(self, shard_numbers):
+        node = SwitchableShard(ShardSearchService(self.index_dir, shard_numbers))
+        server = ShardServer(node, ("127.0.0.1", 0), AUTHKEY)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.servers.append(server)
+        node.address = f"127.0.0.1:{server.address[1]}"
+        return node
+
+    def cluster(self, **kwargs):
+        cluster = ShardCluster([[node.address for node in group] for group in self.nodes], AUTHKEY, **kwargs)
+        self.addCleanup(cluster.close)
+        return cluster
+
+    def search_service(self, cluster):
+        with mock.patch.object(query_service, "SentenceTransformer", HashEncoder):
+            return ScatterGatherSearchService("fake", cluster)
+
+    def test_manifest_records_shard_sizes(self):
+        self.assertEqual(read_manifest(self.index_dir)["shard_sizes"], [5, 5, 5, 2, 1])
+
+    def test_matches_single_node_search(self):
+        service = self.search_service(self.cluster())
+        queries = ["Stelle 3", "Stelle 7", "Firma"]
+        for (indices, scores), (expected_indices, expected_scores) in zip(service.rank_batch(queries, 20),
+                                                                           self.expected.rank_batch(queries, 20)):
+            np.testing.assert_array_equal(indices, expected_indices)
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+            self.assertEqual(len(indices), 16)
+        self.assertEqual(service.search("Stelle 3", top_k=5, fields=["metadata.ref"]),
+                         self.expected.search("Stelle 3", top_k=5, fields=["metadata.ref"]))
+
+    def test_hedged_request_beats_slow_replica(self):
+        cluster = self.cluster(hedge_delay=0.02)
+        service = self.search_service(cluster)
+        for node in (self.nodes[0][0], self.nodes[1][0]):
+            node.delay = 1.0
+        start = time.perf_counter()
+        for _ in range(4):
+            indices, _ = service.rank("Stelle 3", 5)
+            np.testing.assert_array_equal(indices, self.expected.rank("Stelle 3", 5)[0])
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertGreater(cluster.stats()["hedges_won"], 0)
+
+    def test_failed_replica_is_skipped(self):
+        self.nodes[0].insert(0, type("Dead", (), {"address": free_address()})())
+        service = self.search_service(self.cluster())
+        for _ in range(3):
+            self.assertEqual(service.search("Stelle 7", top_k=3), self.expected.search("Stelle 7", top_k=3))
+
+    def test_unavailable_group(self):
+        cluster = self.cluster(timeout=0.5)
+        for node in self.nodes[1]:
+            node.down = True
+        with self.assertRaises(ShardUnavailable):
+            cluster.rank_embeddings(np.ones((1, 8), dtype=np.float32), 5)
+
+        cluster.allow_partial = True
+        indices, _ = cluster.rank_embeddings(np.ones((1, 8), dtype=np.float32), 20)[0]
+        self.assertTrue(len(indices) and (indices < 10).all())
+        self.assertEqual(cluster.fetch_metadata([0, 12])[1], None)
+        self.assertEqual(cluster.stats()["partial"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.services import indexing_service, query_service
+from backend.app.services.data_loader import document_type
+from backend.tests.test_indexing_service import HashEncoder
+
+Posting = document_type(("title", "company"))
+QUERIES = ["Stelle 3", "Firma", "Stelle 12", "Stelle 3"]
+
+
+class TestSearchBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.index_dir = os.path.join(cls.tmp_dir.name, "index")
+        # "Stelle 12" and "Stelle 21" get the same vector, so rankings contain ties
+        postings = [Posting(title=f"Stelle {i}", company=f"Firma {i % 4}") for i in range(23)]
+        with mock.patch.object(indexing_service, "SentenceTransformer", HashEncoder):
+            indexing_service.IndexingService("fake", index_dir=cls.index_dir, batch_size=5, quantization="int8").create_embeddings(postings)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def query_service(self, **kwargs):
+        with mock.patch.object(query_service, "SentenceTransformer", HashEncoder):
+            return query_service.QueryService("fake", index_dir=self.index_dir, **kwargs)
+
+    def assert_same_results(self, batch, single):
+        self.assertEqual(len(batch), len(single))
+        for batch_results, results in zip(batch, single):
+            self.assertEqual([result["index"] for result in batch_results], [result["index"] for result in results])
+            for batch_result, result in zip(batch_results, results):
+                self.assertAlmostEqual(batch_result["score"], result["score"], places=5)
+                self.assertEqual(batch_result["metadata"], result["metadata"])
+
+    def test_search_batch_matches_search(self):
+        for kwargs in ({}, {"mmap": True}, {"quantization": "int8"}):
+            service = self.query_service(**kwargs)
+            for top_k in (1, 5, 100):
+                batch = service.search_batch(QUERIES, top_k=top_k, fields=["title"])
+                self.assert_same_results(batch, [service.search(query, top_k=top_k, fields=["title"]) for query in QUERIES])
+                self.assertEqual([len(results) for results in batch], [min(top_k, 23)] * len(QUERIES))
+
+    def test_rank_batch_matches_rank(self):
+        service = self.query_service()
+        for top_k in (1, 7, 100):
+            for (batch_indices, batch_scores), query in zip(service.rank_batch(QUERIES, top_k=top_k), QUERIES):
+                indices, scores = service.rank(query, top_k=top_k)
+                self.assertEqual(list(batch_indices), list(indices))
+                self.assertEqual(len(batch_scores), len(scores))
+                for batch_score, score in zip(batch_scores, scores):
+                    self.assertAlmostEqual(float(batch_score), float(score), places=5)
+
+    def test_only_full_scans_are_exhaustive(self):
+        self.assertTrue(self.query_service().exhaustive)
+        self.assertTrue(self.query_service(mmap=True).exhaustive)
+        self.assertFalse(self.query_service(quantization="int8").exhaustive)
+
+    def test_empty_batch(self):
+        service = self.query_service()
+        self.assertEqual(service.rank_batch([], top_k=5), [])
+        self.assertEqual(service.search_batch([], top_k=5), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app import server
+from backend.app.services import query_service
+
+
+class CountingEncoder:
+    """
+    Stand-in for SentenceTransformer counting how often a model is loaded.
+    """
+    loads = 0
+
+    def __init__(self, model_name):
+        CountingEncoder.loads += 1
+
+    def encode(self, texts, show_progress_bar=False, convert_to_numpy=True):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class TestPreloadedEncoder(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        np.save(os.path.join(self.tmp_dir.name, "embeddings_1.npy"), np.eye(4, dtype=np.float32))
+        with open(os.path.join(self.tmp_dir.name, "metadata_1.json"), "w") as f:
+            f.write('[{"title": "a"}, {"title": "b"}, {"title": "c"}, {"title": "d"}]')
+        self.patch = mock.patch.object(query_service, "SentenceTransformer", CountingEncoder)
+        self.patch.start()
+        CountingEncoder.loads = 0
+
+    def tearDown(self):
+        self.patch.stop()
+        query_service._preloaded_encoders.clear()
+        self.tmp_dir.cleanup()
+
+    def test_services_share_the_preloaded_encoder(self):
+        encoder = query_service.preload_encoder("fake")
+        self.assertIs(query_service.preload_encoder("fake"), encoder)
+        services = [query_service.QueryService("fake", index_dir=self.tmp_dir.name) for _ in range(2)]
+        self.assertTrue(all(service.model is encoder for service in services))
+        self.assertEqual(CountingEncoder.loads, 1)
+
+        # Other models are still loaded per service
+        query_service.QueryService("other", index_dir=self.tmp_dir.name)
+        self.assertEqual(CountingEncoder.loads, 2)
+
+
+class TestPreforkServer(unittest.TestCase):
+    def test_workers_failing_at_startup_stop_the_server(self):
+        sock = server.bind_socket("127.0.0.1", 0)
+        with mock.patch.object(server, "run_worker", lambda *args: os._exit(3)):
+            prefork = server.PreforkServer(sock, num_workers=2)
+            prefork.run()
+        self.assertTrue(prefork.stopping)
+        self.assertEqual(prefork.workers, {})
+        self.assertEqual(sock.fileno(), -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import json
+import math
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.sparse_model import BM25Index
+from backend.app.services.sparse_search import SparseSearchService
+from backend.app.utils.preprocess import tokenize
+
+TITLES = [
+    "Bürokaufmann/-frau",
+    "Kaufmann/-frau für Büromanagement (m/w/d)",
+    "IT Berater SAP",
+    "Senior IT Berater (m/w/d)",
+    "Grafikdesign Werkstudent",
+    "Vertrieb Manager Außendienst",
+    "Mitarbeiter/-in Vertrieb",
+    "Bürokauffrau in Teilzeit",
+]
+
+
+def brute_force_bm25(texts, query, k1=1.2, b=0.75):
+    """
+    Textbook BM25 over every document, for reference.
+    """
+    docs = [tokenize(text) for text in texts]
+    avg_length = sum(len(doc) for doc in docs) / len(docs)
+    scores = np.zeros(len(docs))
+    for term in tokenize(query):
+        doc_freq = sum(term in doc for doc in docs)
+        if not doc_freq:
+            continue
+        idf = math.log(1 + (len(docs) - doc_freq + 0.5) / (doc_freq + 0.5))
+        for i, doc in enumerate(docs):
+            tf = doc.count(term)
+            scores[i] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avg_length)) if tf else 0.0
+    return scores
+
+
+class TestTokenize(unittest.TestCase):
+    def test_gendered_titles_are_expanded(self):
+        self.assertEqual(tokenize("Bürokaufmann/-frau"), ["buerokaufmann", "buerokauffrau"])
+        self.assertEqual(tokenize("Mitarbeiter/-in Vertrieb (m/w/d)"), ["mitarbeiter", "mitarbeiterin", "vertrieb"])
+
+    def test_umlauts_are_folded(self):
+        self.assertEqual(tokenize("Straßenbauer Köln"), tokenize("Strassenbauer Koeln"))
+
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.index = BM25Index.build(TITLES)
+
+    def test_scores_match_reference_bm25(self):
+        for query in ("IT Berater", "Bürokauffrau", "Vertrieb", "Kaufmann Büromanagement"):
+            expected = brute_force_bm25(TITLES, query)
+            indices, scores = self.index.search(query, top_k=len(TITLES))
+            np.testing.assert_allclose(scores, expected[indices], rtol=1e-5)
+            self.assertEqual(set(indices.tolist()), set(np.flatnonzero(expected).tolist()))
+
+    def test_exact_title_ranks_first(self):
+        indices, _ = self.index.search("Bürokaufmann/-frau", top_k=3)
+        self.assertEqual(indices[0], 0)
+
+    def test_maxscore_matches_full_evaluation(self):
+        rng = np.random.default_rng(3)
+        words = [f"w{i}" for i in range(300)]
+        weights = 1.0 / np.arange(1, 301)
+        texts = [" ".join(rng.choice(words, rng.integers(1, 6), p=weights / weights.sum())) for _ in range(5000)]
+        index = BM25Index.build(texts)
+        for query in ("w0 w1 w250", "w2 w3", "w0 w1 w2 w3 w4", "w299"):
+            for top_k in (1, 10, 100):
+                pruned = index.search(query, top_k, prune=True)
+                full = index.search(query, top_k, prune=False)
+                np.testing.assert_array_equal(pruned[0], full[0])
+                np.testing.assert_array_equal(pruned[1], full[1])
+
+    def test_unknown_terms_return_nothing(self):
+        indices, scores = self.index.search("Astronaut", top_k=10)
+        self.assertEqual(len(indices), 0)
+        self.assertEqual(len(scores), 0)
+
+
+class TestSparseSearchService(unittest.TestCase):
+    def test_search_returns_metadata_records(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            metadata = [{"id": i, "title": title, "metadata": {"title": title}} for i, title in enumerate(TITLES)]
+            np.save(os.path.join(index_dir, "embeddings_1.npy"), np.zeros((len(TITLES), 4), dtype=np.float32))
+            with open(os.path.join(index_dir, "metadata_1.json"), "w") as f:
+                json.dump(metadata, f)
+            BM25Index.build(TITLES).save(index_dir)
+
+            results = SparseSearchService(index_dir=index_dir).search("IT Berater SAP", top_k=2)
+
+        self.assertEqual([result["metadata"]["id"] for result in results], [2, 3])
+        self.assertGreater(results[0]["score"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
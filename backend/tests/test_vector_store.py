@@ -0,0 +1,117 @@
+import unittest
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.models.vector_store import (
+    load_embedding_matrix,
+    merge_top_k,
+    normalize_rows,
+    open_embedding_matrix,
+    split_shards,
+    top_k_indices,
+    write_normalized_matrix,
+)
+
+
+class TestVectorStore(unittest.TestCase):
+    def setUp(self):
+        """
+        Write a small synthetic index of three uneven shards.
+        """
+        rng = np.random.default_rng(42)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.shards = [rng.standard_normal((n, 16)).astype(np.float32) for n in (7, 5, 3)]
+        self.shards[1][2] = 0.0  # A zero vector must not produce NaNs
+        self.paths = []
+        for i, shard in enumerate(self.shards, start=1):
+            path = os.path.join(self.temp_dir.name, f"embeddings_{i}.npy")
+            np.save(path, shard)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_matrix_matches_cosine_similarity(self):
+        """
+        Dot products against the normalized matrix equal sklearn's cosine similarity.
+        """
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        matrix, shard_sizes = load_embedding_matrix(self.paths)
+        query = np.random.default_rng(0).standard_normal(16).astype(np.float32)
+
+        expected = cosine_similarity([query], np.vstack(self.shards))[0]
+        actual = matrix @ normalize_rows(query.reshape(1, -1))[0]
+
+        self.assertEqual(shard_sizes, [7, 5, 3])
+        self.assertEqual(matrix.dtype, np.float32)
+        self.assertTrue(matrix.flags["C_CONTIGUOUS"])
+        np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+    def test_split_shards_returns_views(self):
+        """
+        Per-shard views share memory with the stacked matrix.
+        """
+        matrix, shard_sizes = load_embedding_matrix(self.paths)
+        views = split_shards(matrix, shard_sizes)
+
+        self.assertEqual([view.shape[0] for view in views], shard_sizes)
+        for view in views:
+            self.assertTrue(np.shares_memory(view, matrix))
+
+    def test_memory_mapped_matrix_matches_in_memory_load(self):
+        """
+        The consolidated file written at index time maps to the same matrix as the in-memory load.
+        """
+        expected, expected_sizes = load_embedding_matrix(self.paths)
+        write_normalized_matrix(self.temp_dir.name, self.paths)
+        matrix, shard_sizes = open_embedding_matrix(self.temp_dir.name, self.paths)
+
+        self.assertIsInstance(matrix, np.memmap)
+        self.assertFalse(matrix.flags["WRITEABLE"])
+        self.assertEqual(shard_sizes, expected_sizes)
+        np.testing.assert_array_equal(matrix, expected)
+
+    def test_stale_memory_mapped_matrix_is_rejected(self):
+        """
+        A consolidated file that no longer matches the shards raises instead of misaligning metadata.
+        """
+        write_normalized_matrix(self.temp_dir.name, self.paths[:2])
+        with self.assertRaises(ValueError):
+            open_embedding_matrix(self.temp_dir.name, self.paths)
+
+    def test_top_k_matches_stable_argsort_with_ties(self):
+        """
+        Partial selection returns exactly the order of a full stable argsort, including tied scores.
+        """
+        scores = np.round(np.random.default_rng(1).uniform(0, 1, 500), 1).astype(np.float32)
+        for top_k in (1, 10, 37, 499, 500, 1000):
+            expected = np.argsort(scores, kind="stable")[-top_k:][::-1]
+            np.testing.assert_array_equal(top_k_indices(scores, top_k), expected)
+        self.assertEqual(len(top_k_indices(scores, 0)), 0)
+
+    def test_merged_shard_top_k_matches_global_top_k(self):
+        """
+        Merging per-shard top-k lists gives the same ranking as selecting over all scores at once.
+        """
+        scores = np.round(np.random.default_rng(2).uniform(0, 1, 300), 2).astype(np.float32)
+        top_k = 25
+        shard_indices, shard_scores = [], []
+        for offset in range(0, len(scores), 70):
+            shard = scores[offset:offset + 70]
+            indices = top_k_indices(shard, top_k)
+            shard_indices.append(indices + offset)
+            shard_scores.append(shard[indices])
+
+        indices, merged_scores = merge_top_k(shard_indices, shard_scores, top_k)
+        np.testing.assert_array_equal(indices, top_k_indices(scores, top_k))
+        np.testing.assert_array_equal(merged_scores, scores[indices])
+
+
+if __name__ == "__main__":
+    unittest.main()
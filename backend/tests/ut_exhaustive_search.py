@@ -3,11 +3,13 @@ import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 import os
 import sys
+import time
 
 # Add the project root directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
 from backend.app.services.query_service import QueryService
+from backend.app.models.ann_index import IVFIndex
 
 class TestQueryService(unittest.TestCase):
     def setUp(self):
@@ -67,5 +69,28 @@ class TestQueryService(unittest.TestCase):
             "Total embeddings used during query processing do not match loaded embeddings."
         )
 
+    def test_ann_recall_against_exhaustive(self):
+        """
+        Report recall@k and latency of the IVF index against exhaustive search as ground truth.
+        """
+        queries = ["Grafikdesign", "Bürokaufmann/-frau", "IT Berater", "Vertrieb Manager", "Fachingenieur"]
+        top_k = 10
+        matrix = self.query_service.embedding_matrix
+        ann_index = IVFIndex.train(matrix, nlist=int(4 * np.sqrt(matrix.shape[0])))
+        query_embeddings = self.query_service._encode(queries)
+        truth = [self.query_service._rank(q, top_k)[0] for q in query_embeddings]
+
+        print(f"IVF index with {ann_index.nlist} clusters over {matrix.shape[0]} embeddings")
+        for nprobe in (1, 4, 16, 64, ann_index.nlist):
+            start = time.perf_counter()
+            found = [ann_index.search(matrix, q, top_k, nprobe=nprobe)[0] for q in query_embeddings]
+            elapsed = (time.perf_counter() - start) / len(queries)
+            recall = np.mean([len(np.intersect1d(f, t)) / top_k for f, t in zip(found, truth)])
+            print(f"nprobe={nprobe}: recall@{top_k}={recall:.3f}, {elapsed * 1000:.2f} ms/query")
+
+        # Probing every cluster is exhaustive search
+        for f, t in zip(found, truth):
+            np.testing.assert_array_equal(f, t)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
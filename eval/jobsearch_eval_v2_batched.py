@@ -107,15 +107,9 @@ def search_batch(query_texts: List[str], top_k=100):
         model_name="distiluse-base-multilingual-cased-v1", index_dir=index_dir
     )
 
-    # Encode all queries in one batch
-    batch_results = []
+    # Encode and score all queries in one batch
     logger.info(f"Performing batch inference for {len(query_texts)} queries...")
-    all_query_results = query_service.model.encode(query_texts, convert_to_numpy=True)
-
-    for i, query_text in enumerate(query_texts):
-        # Perform search for each query
-        result = query_service.search(query=query_text, top_k=top_k)
-        batch_results.append(result)
+    batch_results = query_service.search_batch(query_texts, top_k=top_k)
 
     return batch_results
 
@@ -0,0 +1,84 @@
+"""
+Recall@k versus latency of the IVF index across nprobe values, with exhaustive search as ground truth.
+
+By default runs on a synthetic clustered corpus (embeddings of job titles are strongly clustered, so uniform
+random vectors would understate IVF recall). Point --index-dir at a real index containing
+normalized_embeddings.npy to sample queries from the corpus itself instead.
+
+    python experiments/bench_ann_recall.py --num-docs 1000000 --nlist 1024
+    python experiments/bench_ann_recall.py --index-dir ./index/title --nlist 1024
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.models.ann_index import IVFIndex
+from backend.app.models.vector_store import NORMALIZED_MATRIX_FILE, normalize_rows, top_k_indices
+
+
+def synthetic_corpus(rng, num_docs, dim, num_topics=2000, noise=0.6):
+    """
+    Unit vectors scattered around random topic directions.
+    """
+    topics = normalize_rows(rng.standard_normal((num_topics, dim), dtype=np.float32))
+    matrix = topics[rng.integers(0, num_topics, num_docs)]
+    matrix += noise / np.sqrt(dim) * rng.standard_normal((num_docs, dim), dtype=np.float32)
+    return normalize_rows(matrix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", default=None)
+    parser.add_argument("--num-docs", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[10, 100])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.index_dir:
+        matrix = np.load(os.path.join(args.index_dir, NORMALIZED_MATRIX_FILE), mmap_mode="r")
+    else:
+        matrix = synthetic_corpus(rng, args.num_docs, args.dim)
+    # Perturbed corpus rows stand in for queries
+    queries = np.asarray(matrix[rng.choice(matrix.shape[0], args.queries, replace=False)], dtype=np.float32)
+    queries += 0.3 / np.sqrt(matrix.shape[1]) * rng.standard_normal(queries.shape, dtype=np.float32)
+    queries = normalize_rows(queries)
+
+    start = time.perf_counter()
+    index = IVFIndex.train(matrix, nlist=args.nlist)
+    print(f"{matrix.shape[0]} docs x {matrix.shape[1]} dims, nlist={index.nlist}, "
+          f"trained in {time.perf_counter() - start:.1f} s")
+
+    max_k = max(args.top_k)
+    truth, exhaustive_times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        truth.append(top_k_indices(matrix @ query, max_k))
+        exhaustive_times.append(time.perf_counter() - start)
+
+    header = f"{'nprobe':>8}{'ms/query':>10}" + "".join(f"{f'recall@{k}':>12}" for k in args.top_k)
+    print(header)
+    print(f"{'exact':>8}{np.median(exhaustive_times) * 1e3:>10.2f}" + "".join(f"{1.0:>12.3f}" for _ in args.top_k))
+    nprobe = 1
+    while nprobe <= index.nlist:
+        timings, recalls = [], {k: [] for k in args.top_k}
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            indices, _ = index.search(matrix, query, max_k, nprobe=nprobe)
+            timings.append(time.perf_counter() - start)
+            for k in args.top_k:
+                recalls[k].append(len(np.intersect1d(indices[:k], expected[:k])) / k)
+        print(f"{nprobe:>8}{np.median(timings) * 1e3:>10.2f}" + "".join(f"{np.mean(recalls[k]):>12.3f}" for k in args.top_k))
+        nprobe *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Latency of the BM25 sparse index with and without MaxScore early termination, replaying the
+query-frequency log against a synthetic job-title corpus (titles are built from the logged queries
+plus common title noise, so posting-list lengths resemble the real index).
+Results of both modes are checked to be identical.
+
+    python experiments/bench_bm25.py --num-docs 1000000 --queries-csv queries_frequency.csv
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.models.sparse_model import BM25Index
+
+TITLE_NOISE = ["(m/w/d)", "Senior", "Junior", "in Teilzeit", "Vollzeit", "Berlin", "München", "Hamburg", "Köln",
+               "Leitung", "Assistenz", "Mitarbeiter/-in", "Fachkraft", "Quereinsteiger", "Werkstudent"]
+
+
+def load_queries(csv_file):
+    with open(csv_file, "r", encoding="utf-8") as f:
+        return [row["query"].strip() for row in csv.DictReader(f) if row.get("query")]
+
+
+def synthetic_titles(rng, queries, num_docs):
+    """
+    Titles drawn Zipf-like from the logged queries, each with zero to two noise words.
+    """
+    weights = 1.0 / np.arange(1, len(queries) + 1)
+    picks = rng.choice(len(queries), num_docs, p=weights / weights.sum())
+    noise = rng.integers(0, len(TITLE_NOISE), (num_docs, 2))
+    counts = rng.integers(0, 3, num_docs)
+    return [" ".join([queries[p]] + [TITLE_NOISE[n] for n in noise[i, :counts[i]]]) for i, p in enumerate(picks)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-docs", type=int, default=1_000_000)
+    parser.add_argument("--queries-csv", default=os.path.join(os.path.dirname(__file__), "../queries_frequency.csv"))
+    parser.add_argument("--top-k", type=int, default=20)
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries_csv)
+    titles = synthetic_titles(np.random.default_rng(0), queries, args.num_docs)
+
+    start = time.perf_counter()
+    index = BM25Index.build(titles)
+    print(f"Built index over {args.num_docs} titles in {time.perf_counter() - start:.1f} s: "
+          f"{len(index.terms)} terms, {len(index.doc_ids)} postings, "
+          f"{(index.doc_ids.nbytes + index.impacts.nbytes + index.term_offsets.nbytes) / 1e6:.1f} MB")
+
+    print(f"{'mode':<10}{'median ms':>12}{'p99 ms':>10}{'max ms':>10}")
+    results = {}
+    for prune in (False, True):
+        timings, results[prune] = [], []
+        for query in queries:
+            start = time.perf_counter()
+            results[prune].append(index.search(query, args.top_k, prune=prune))
+            timings.append(time.perf_counter() - start)
+        timings = np.array(timings) * 1e3
+        print(f"{'maxscore' if prune else 'full':<10}{np.median(timings):>12.3f}{np.percentile(timings, 99):>10.3f}{timings.max():>10.3f}")
+
+    for (full_ids, full_scores), (pruned_ids, pruned_scores) in zip(results[False], results[True]):
+        assert np.array_equal(full_ids, pruned_ids) and np.array_equal(full_scores, pruned_scores)
+    print(f"MaxScore results identical to full evaluation for all {len(queries)} queries.")
+
+
+if __name__ == "__main__":
+    main()
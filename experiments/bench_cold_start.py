@@ -0,0 +1,91 @@
+"""
+Cold start of the API: how long importing the API modules takes in a fresh interpreter, and for a server
+started with retrieval.lazy_load off and on, how long until it answers health checks (GET /), until it is
+ready (GET /ready) and until the first search succeeds. Uses config/config.yml and the index in ./index.
+
+    python experiments/bench_cold_start.py --port 8100
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import yaml
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+CONFIG_PATH = os.path.join(PROJECT_ROOT, "config/config.yml")
+
+MODULES = ["backend.app.services.query_service", "backend.app.services.indexing_service", "sentence_transformers"]
+
+
+def import_seconds(module: str) -> float:
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError):
+        return 0
+
+
+def cold_start(lazy: bool, port: int, timeout: float) -> dict:
+    """
+    Start a server and time the first successful health check, readiness probe and search.
+    """
+    with open(CONFIG_PATH) as f:
+        config = yaml.safe_load(f)
+    config.setdefault("retrieval", {})["lazy_load"] = lazy
+    with tempfile.NamedTemporaryFile("w", suffix=".yml", delete=False) as f:
+        yaml.safe_dump(config, f)
+    env = dict(os.environ, SEARCH_CONFIG=f.name)
+
+    base = f"http://127.0.0.1:{port}"
+    checks = {"live": f"{base}/", "ready": f"{base}/ready", "search": f"{base}/search?query=Vertrieb&top_k=10"}
+    times = {}
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "backend.app.main:app", "--port", str(port)],
+                               cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for name, url in checks.items():
+            while status(url) != 200:
+                if process.poll() is not None or time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"Server did not pass {name} check")
+                time.sleep(0.02)
+            times[name] = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        os.unlink(f.name)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    print(f"{'module':<42}{'import s':>10}")
+    for module in MODULES:
+        print(f"{module:<42}{statistics.median(import_seconds(module) for _ in range(args.repeats)):>10.2f}")
+
+    print(f"\n{'lazy_load':<12}{'live s':>10}{'ready s':>10}{'search s':>10}")
+    for lazy in (False, True):
+        runs = [cold_start(lazy, args.port, args.timeout) for _ in range(args.repeats)]
+        print(f"{str(lazy):<12}" + "".join(f"{statistics.median(run[name] for run in runs):>10.2f}" for name in ("live", "ready", "search")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Duplicate grouping at index time: build time, groups found, and per-query scan time of the unique-vector
+matrix against the full matrix. The synthetic corpus reposts a share of the postings, as exact copies
+(same title) or near copies (slightly perturbed vectors); the report shows how many reposts were grouped
+and how many distinct postings the top-k holds with and without collapsing.
+
+    python experiments/bench_dedup.py --num-docs 1000000 --repost-share 0.3
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.models.dedup_index import DuplicateGroups
+from backend.app.models.vector_store import normalize_rows, top_k_indices
+
+
+def synthetic_corpus(rng, num_docs, dim, repost_share, noise):
+    """
+    Unit vectors of which repost_share are copies of earlier rows: half exact, half perturbed.
+    :return: Tuple of (matrix, titles, original row of every row).
+    """
+    num_originals = int(num_docs * (1 - repost_share))
+    matrix = rng.standard_normal((num_docs, dim), dtype=np.float32)
+    original = np.arange(num_docs)
+    original[num_originals:] = rng.integers(0, num_originals, num_docs - num_originals)
+    reposts = np.arange(num_originals, num_docs)
+    matrix[reposts] = matrix[original[reposts]]
+    near = reposts[::2]
+    matrix[near] += noise * rng.standard_normal((len(near), dim), dtype=np.float32)
+    titles = [f"Stelle {row}" for row in original]
+    for row in near:
+        titles[row] += " (neu)"
+    return normalize_rows(matrix), titles, original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-docs", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--repost-share", type=float, default=0.3)
+    parser.add_argument("--noise", type=float, default=0.01, help="Perturbation of near copies (per coordinate)")
+    parser.add_argument("--threshold", type=float, default=0.95)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix, titles, original = synthetic_corpus(rng, args.num_docs, args.dim, args.repost_share, args.noise)
+
+    start = time.perf_counter()
+    groups = DuplicateGroups.build(matrix, titles, threshold=args.threshold)
+    build_s = time.perf_counter() - start
+    expected_groups = len(np.unique(original))
+    unique = matrix[groups.representatives]
+    print(f"{args.num_docs} documents, {expected_groups} distinct postings; grouping took {build_s:.1f} s")
+    merged = (args.num_docs - groups.num_groups) / max(1, args.num_docs - expected_groups)
+    print(f"groups found: {groups.num_groups} ({merged:.1%} of reposts merged), "
+          f"scanned matrix {matrix.nbytes / 1e6:.0f} MB -> {unique.nbytes / 1e6:.0f} MB")
+
+    queries = normalize_rows(matrix[rng.integers(0, args.num_docs, args.queries)]
+                             + 0.05 * rng.standard_normal((args.queries, args.dim), dtype=np.float32))
+    print(f"{'scan':<12}{'ms/query':>10}{'distinct in top-k':>20}")
+    for name, scanned in (("full", matrix), ("unique", unique)):
+        distinct = 0
+        start = time.perf_counter()
+        for query in queries:
+            top = top_k_indices(scanned @ query, args.top_k)
+            rows = top if scanned is matrix else groups.representatives[top]
+            distinct += len(np.unique(original[rows]))
+        elapsed = (time.perf_counter() - start) * 1000 / args.queries
+        print(f"{name:<12}{elapsed:>10.2f}{distinct / args.queries:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
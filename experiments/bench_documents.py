@@ -0,0 +1,98 @@
+"""
+Ingestion time and resident memory of the document records: dict-backed Document versus the slotted
+type from `document_type`. A synthetic ZIP with one CSV member is streamed through `iter_documents`
+and every document is kept in a list, as `load_documents` does; then every document is turned into
+its metadata record, as IndexingService does. Each variant runs in a fresh process.
+
+    python experiments/bench_documents.py --num-docs 1000000
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.services.data_loader import iter_documents
+
+FIELDS = ["title", "publisher", "location", "company", "contract", "salary", "category", "date", "requirements", "resposibilities"]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def write_corpus(data_dir, num_docs):
+    rng = np.random.default_rng(0)
+    metadata_file = os.path.join(data_dir, "metadata.csv")
+    with open(metadata_file, "w") as f:
+        f.write(",".join(FIELDS) + "\n")
+    zip_path = os.path.join(data_dir, "job_postings.csv.zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        with zip_ref.open("job_postings.csv", "w") as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as stream:
+            writer = csv.writer(stream)
+            for i in range(num_docs):
+                values = [f"{field} {rng.integers(0, 1000)}" for field in FIELDS[1:8]]
+                # Some postings lack a salary, as in the real data
+                if i % 3 == 0:
+                    values[4] = ""
+                writer.writerow([f"Job title {rng.integers(0, 50000)}", *values, "Anforderung " * 8, "Aufgabe " * 12])
+    return zip_path, metadata_file
+
+
+def measure(zip_path, metadata_file, slots):
+    logging.disable(logging.INFO)
+    baseline = rss_mb()
+    start = time.perf_counter()
+    documents = list(iter_documents(zip_path, metadata_file, slots=slots))
+    load_time = time.perf_counter() - start
+    rss = rss_mb() - baseline
+
+    start = time.perf_counter()
+    for i, doc in enumerate(documents):
+        {"id": i, "title": doc.title, "metadata": {key: value for key, value in doc.items() if value is not None}}
+    record_time = time.perf_counter() - start
+    print(json.dumps({"load_s": load_time, "rss_mb": rss, "record_s": record_time}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-docs", type=int, default=1_000_000)
+    parser.add_argument("--measure", choices=["dict", "slots"], default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        zip_path = os.path.join(args.data_dir, "job_postings.csv.zip")
+        measure(zip_path, os.path.join(args.data_dir, "metadata.csv"), args.measure == "slots")
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        zip_path, _ = write_corpus(data_dir, args.num_docs)
+        print(f"{args.num_docs} rows x {len(FIELDS)} fields, {os.path.getsize(zip_path) / 1e6:.0f} MB ZIP")
+        print(f"{'document':<10}{'load s':>10}{'RSS MB':>10}{'records s':>12}")
+        for mode in ("dict", "slots"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--measure", mode, "--data-dir", data_dir],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<10}{result['load_s']:>10.2f}{result['rss_mb']:>10.0f}{result['record_s']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Encoding throughput of IndexingService by number of worker processes. Synthetic job titles are
+encoded with the configured model through the same pool and chunking as `create_embeddings`;
+pool start-up (model load in every worker) is reported separately from steady-state throughput.
+
+    python experiments/bench_encoding_workers.py --num-docs 50000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import yaml
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.services.indexing_service import IndexingService
+
+CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../config/config.yml"))
+WORDS = ["Mitarbeiter", "Vertrieb", "Senior", "Entwickler", "Java", "Pflegefachkraft", "Lager", "Buchhaltung",
+         "Teamleiter", "Kundenservice", "Ingenieur", "Elektrotechnik", "Werkstudent", "Marketing", "SAP", "Berater"]
+
+
+def synthetic_titles(num_docs, seed=0):
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, rng.integers(2, 7))) for _ in range(num_docs)]
+
+
+def main():
+    with open(CONFIG_PATH, "r") as f:
+        config = yaml.safe_load(f)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=config["retrieval"]["model"])
+    parser.add_argument("--num-docs", type=int, default=50000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--encode-chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    texts = synthetic_titles(args.num_docs)
+    print(f"{args.num_docs} titles, model {args.model}, {os.cpu_count()} cores")
+    print(f"{'workers':>8}{'startup s':>12}{'docs/s':>10}{'speedup':>10}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as index_dir:
+        for num_workers in args.workers:
+            start = time.perf_counter()
+            service = IndexingService(args.model, index_dir=index_dir, num_workers=num_workers,
+                                      encode_chunk_size=args.encode_chunk_size)
+            with service._encoder_pool() as pool:
+                # Warm-up task so every worker has loaded its model before timing
+                if pool is not None:
+                    [future.result() for future in service._submit_encoding(pool, texts[:num_workers * 8])]
+                startup = time.perf_counter() - start
+
+                start = time.perf_counter()
+                encoding = service._submit_encoding(pool, texts)
+                embeddings = np.concatenate([future.result() for future in encoding])
+                throughput = len(embeddings) / (time.perf_counter() - start)
+
+            baseline = baseline or throughput
+            print(f"{num_workers:>8}{startup:>12.1f}{throughput:>10.0f}{throughput / baseline:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
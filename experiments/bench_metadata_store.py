@@ -0,0 +1,108 @@
+"""
+Startup time, resident memory and per-hit fetch latency of the metadata: every metadata_N.json shard
+loaded into Python dicts versus the memory-mapped MetadataStore. Fetches are timed for whole records and
+for the fields the /search endpoints return, which the store decodes without parsing the rest of the record.
+Each variant is measured in a fresh process so RSS is not polluted by the other. Synthetic records mimic a
+job posting with every CSV column.
+
+    python experiments/bench_metadata_store.py --num-docs 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.models.document_store import MetadataStore, fetch_record, load_metadata, write_metadata_store
+
+FIELDS = ["publisher", "location", "company", "contract", "salary", "category", "date"]
+# Fields returned by the /search endpoints (routes/search.py RESPONSE_FIELDS)
+RESPONSE_FIELDS = ["title", "metadata.requirements", "metadata.resposibilities"]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def synthetic_records(num_docs, rng):
+    for i in range(num_docs):
+        title = f"Job title {rng.integers(0, 50000)}"
+        metadata = {"title": title, "requirements": "Anforderung " * 20, "resposibilities": "Aufgabe " * 30}
+        metadata.update({field: f"{field} {rng.integers(0, 1000)}" for field in FIELDS})
+        yield {"id": i, "title": title, "metadata": metadata}
+
+
+def write_index(index_dir, num_docs, batch_size):
+    rng = np.random.default_rng(0)
+    records = list(synthetic_records(num_docs, rng))
+    for shard, start in enumerate(range(0, num_docs, batch_size), start=1):
+        with open(os.path.join(index_dir, f"metadata_{shard}.json"), "w") as f:
+            json.dump(records[start:start + batch_size], f)
+    write_metadata_store(index_dir, records)
+
+
+def measure(index_dir, mode, top_k, queries):
+    baseline = rss_mb()
+    start = time.perf_counter()
+    if mode == "json":
+        paths = sorted((os.path.join(index_dir, f) for f in os.listdir(index_dir) if f.startswith("metadata_") and f.endswith(".json")),
+                       key=lambda path: int(path.rsplit("_", 1)[1].split(".")[0]))
+        metadata = load_metadata(paths)
+    else:
+        metadata = MetadataStore(index_dir)
+    load_time = time.perf_counter() - start
+    rss = rss_mb() - baseline
+
+    fetch_ms = {}
+    for name, fields in (("fetch_ms", None), ("fetch_fields_ms", RESPONSE_FIELDS)):
+        rng = np.random.default_rng(1)
+        start = time.perf_counter()
+        for _ in range(queries):
+            [fetch_record(metadata, int(i), fields) for i in rng.integers(0, len(metadata), top_k)]
+        fetch_ms[name] = (time.perf_counter() - start) / queries * 1e3
+    print(json.dumps({"load_s": load_time, "rss_mb": rss, **fetch_ms}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-docs", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=25000)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--measure", choices=["json", "store"], default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--index-dir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.index_dir, args.measure, args.top_k, args.queries)
+        return
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        write_index(index_dir, args.num_docs, args.batch_size)
+        json_mb = sum(os.path.getsize(os.path.join(index_dir, f)) for f in os.listdir(index_dir) if f.endswith(".json")) / 1e6
+        print(f"{args.num_docs} records, {json_mb:.0f} MB of JSON shards")
+        print(f"{'metadata':<10}{'load s':>10}{'RSS MB':>10}{f'fetch {args.top_k} ms':>14}{'fields ms':>12}")
+        for mode in ("json", "store"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--measure", mode, "--index-dir", index_dir,
+                 "--top-k", str(args.top_k), "--queries", str(args.queries)],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<10}{result['load_s']:>10.2f}{result['rss_mb']:>10.0f}{result['fetch_ms']:>14.3f}"
+                  f"{result['fetch_fields_ms']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
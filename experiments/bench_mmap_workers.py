@@ -0,0 +1,99 @@
+"""
+Compare startup time and per-worker memory of the in-memory and memory-mapped QueryService loading modes.
+
+Writes a synthetic index (embeddings_N.npy shards plus normalized_embeddings.npy) to a temp directory,
+then starts N worker processes that each load the matrix and run a few full scans, as uvicorn workers would.
+Memory is read from /proc/self/smaps_rollup (Linux): Private grows with every in-memory worker,
+while memory-mapped workers share the page cache, which shows up as Pss = Rss / N.
+
+    python experiments/bench_mmap_workers.py --num-docs 1000000 --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.models.vector_store import load_embedding_matrix, open_embedding_matrix, write_normalized_matrix
+
+
+def read_memory_kb():
+    """
+    Return Rss, Pss and private memory of the current process in kB.
+    """
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return values["Rss"], values["Pss"], values["Private_Clean"] + values["Private_Dirty"]
+
+
+def worker(mode, index_dir, embedding_paths, barrier, results):
+    start = time.perf_counter()
+    if mode == "mmap":
+        matrix, _ = open_embedding_matrix(index_dir, embedding_paths)
+    else:
+        matrix, _ = load_embedding_matrix(embedding_paths)
+    startup = time.perf_counter() - start
+
+    query = np.ones(matrix.shape[1], dtype=np.float32)
+    for _ in range(3):
+        matrix @ query
+
+    # Measure only once every worker holds its matrix, as in steady-state serving
+    barrier.wait()
+    results.put((startup,) + read_memory_kb())
+    barrier.wait()
+
+
+def run(mode, index_dir, embedding_paths, workers):
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(mode, index_dir, embedding_paths, barrier, results)) for _ in range(workers)]
+    for p in processes:
+        p.start()
+    rows = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    return np.array(rows, dtype=np.float64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-docs", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--shard-size", type=int, default=25000)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as index_dir:
+        embedding_paths = []
+        for i, start in enumerate(range(0, args.num_docs, args.shard_size), start=1):
+            rows = min(args.shard_size, args.num_docs - start)
+            path = os.path.join(index_dir, f"embeddings_{i}.npy")
+            np.save(path, rng.standard_normal((rows, args.dim), dtype=np.float32))
+            embedding_paths.append(path)
+        write_normalized_matrix(index_dir, embedding_paths)
+
+        print(f"Synthetic index: {args.num_docs} docs x {args.dim} dims in {len(embedding_paths)} shards, "
+              f"{args.workers} workers")
+        print(f"{'mode':<10}{'startup s':>12}{'RSS MB':>10}{'PSS MB':>10}{'private MB':>12}{'total private MB':>18}")
+        for mode in ("memory", "mmap"):
+            rows = run(mode, index_dir, embedding_paths, args.workers)
+            startup, rss, pss, private = rows.mean(axis=0)
+            print(f"{mode:<10}{startup:>12.3f}{rss / 1024:>10.1f}{pss / 1024:>10.1f}{private / 1024:>12.1f}"
+                  f"{rows[:, 3].sum() / 1024:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
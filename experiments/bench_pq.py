@@ -0,0 +1,126 @@
+"""
+Memory, ADC scan latency and recall@k of the product-quantized index on synthetic corpora too large to
+hold as float32 (10M x 512 dims is 20 GB). The corpus is generated block by block from a fixed seed and
+never materialized: a first pass trains on the first block, encodes every block and computes the exact
+top-k as ground truth; a second pass regenerates the blocks to re-score the PQ candidates in float32,
+as QueryService does with the memory-mapped matrix.
+
+    python experiments/bench_pq.py --num-docs 1000000 10000000 --subspaces 32
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.models.pq_index import ProductQuantizer
+from backend.app.models.vector_store import merge_top_k, normalize_rows, top_k_indices
+
+
+def corpus_block(topics, block, block_size, num_docs, noise=0.6, seed=0):
+    """
+    Rows [block * block_size, ...) of the synthetic corpus: unit vectors scattered around topic directions.
+    """
+    rng = np.random.default_rng([seed, block])
+    rows = min(block_size, num_docs - block * block_size)
+    matrix = topics[rng.integers(0, topics.shape[0], rows)]
+    matrix += noise / np.sqrt(topics.shape[1]) * rng.standard_normal((rows, topics.shape[1]), dtype=np.float32)
+    return normalize_rows(matrix)
+
+
+def run(args, num_docs, topics, queries):
+    num_blocks = (num_docs + args.block_size - 1) // args.block_size
+    k = args.top_k
+
+    start = time.perf_counter()
+    quantizer = ProductQuantizer.train(corpus_block(topics, 0, args.block_size, num_docs),
+                                       num_subspaces=args.subspaces, opq_iterations=args.opq_iterations)
+    train_time = time.perf_counter() - start
+
+    # Pass 1: encode and exact ground truth
+    codes = np.empty((args.subspaces, num_docs), dtype=np.uint8)
+    truth_indices = [[] for _ in queries]
+    truth_scores = [[] for _ in queries]
+    exact_time = 0.0
+    start = time.perf_counter()
+    for block in range(num_blocks):
+        matrix = corpus_block(topics, block, args.block_size, num_docs)
+        offset = block * args.block_size
+        codes[:, offset:offset + matrix.shape[0]] = quantizer._encode_block(quantizer._rotate(matrix))
+        query_start = time.perf_counter()
+        matrix @ queries[0]
+        exact_time += time.perf_counter() - query_start
+        similarities = queries @ matrix.T
+        for q in range(len(queries)):
+            indices = top_k_indices(similarities[q], k)
+            truth_indices[q].append(indices + offset)
+            truth_scores[q].append(similarities[q, indices])
+    encode_time = time.perf_counter() - start
+    truth = [merge_top_k(truth_indices[q], truth_scores[q], k)[0] for q in range(len(queries))]
+    quantizer.codes = codes
+
+    max_depth = max(args.rerank_depth)
+    timings, candidates = [], []
+    for query in queries:
+        start = time.perf_counter()
+        indices, _ = quantizer.search(query, max_depth)
+        timings.append(time.perf_counter() - start)
+        candidates.append(indices)
+
+    # Pass 2: exact scores of the candidates, block by block
+    exact = [np.empty(len(indices), dtype=np.float32) for indices in candidates]
+    for block in range(num_blocks):
+        matrix = corpus_block(topics, block, args.block_size, num_docs)
+        offset = block * args.block_size
+        for q, indices in enumerate(candidates):
+            in_block = (indices >= offset) & (indices < offset + matrix.shape[0])
+            exact[q][in_block] = matrix[indices[in_block] - offset] @ queries[q]
+
+    float32_mb = num_docs * topics.shape[1] * 4 / 1e6
+    print(f"\n{num_docs} docs x {topics.shape[1]} dims, {args.subspaces} subspaces"
+          f"{f', OPQ x{args.opq_iterations}' if args.opq_iterations else ''}: "
+          f"trained in {train_time:.1f} s, encoded in {encode_time:.1f} s")
+    print(f"float32 {float32_mb:.1f} MB, PQ {quantizer.nbytes / 1e6:.1f} MB ({quantizer.nbytes / 1e6 / float32_mb:.1%})")
+    print(f"exact scan {exact_time * 1e3:.1f} ms/query, ADC scan (top {max_depth}) {np.median(timings) * 1e3:.1f} ms/query")
+    print(f"{'rerank':>8}{f'recall@{k}':>12}")
+    for depth in [k] + [d for d in args.rerank_depth if d > k]:
+        recalls = []
+        for q, expected in enumerate(truth):
+            if depth == k:
+                found = candidates[q][:k]
+            else:
+                pool, scores = candidates[q][:depth], exact[q][:depth]
+                order = np.argsort(pool)
+                found = pool[order][top_k_indices(scores[order], k)]
+            recalls.append(len(np.intersect1d(found, expected)) / k)
+        print(f"{depth if depth > k else 'none':>8}{np.mean(recalls):>12.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-docs", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--subspaces", type=int, default=32)
+    parser.add_argument("--opq-iterations", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-depth", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--block-size", type=int, default=65536)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    topics = normalize_rows(rng.standard_normal((2000, args.dim), dtype=np.float32))
+    queries = topics[rng.integers(0, 2000, args.queries)]
+    queries += 0.5 / np.sqrt(args.dim) * rng.standard_normal(queries.shape, dtype=np.float32)
+    queries = normalize_rows(queries)
+
+    for num_docs in args.num_docs:
+        run(args, num_docs, topics, queries)
+
+
+if __name__ == "__main__":
+    main()
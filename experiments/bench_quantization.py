@@ -0,0 +1,99 @@
+"""
+Memory, latency and recall@k of the float16 / int8 first-pass scan, with and without float32 re-ranking,
+against the exact float32 search as ground truth.
+
+By default runs on a synthetic clustered corpus with perturbed corpus rows as queries. Point --index-dir at a
+real index containing normalized_embeddings.npy, and --queries-csv at the query log to measure recall on the
+eval queries encoded with --model.
+
+    python experiments/bench_quantization.py --num-docs 1000000
+    python experiments/bench_quantization.py --index-dir ./index/title --queries-csv queries_frequency.csv
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.models.quantization import QUANTIZATION_KINDS, QuantizedMatrix
+from backend.app.models.vector_store import NORMALIZED_MATRIX_FILE, normalize_rows, top_k_indices
+from backend.app.utils.cache import load_query_frequencies
+
+
+def synthetic_corpus(rng, num_docs, dim, num_topics=2000, noise=0.6):
+    """
+    Unit vectors scattered around random topic directions.
+    """
+    topics = normalize_rows(rng.standard_normal((num_topics, dim), dtype=np.float32))
+    matrix = topics[rng.integers(0, num_topics, num_docs)]
+    matrix += noise / np.sqrt(dim) * rng.standard_normal((num_docs, dim), dtype=np.float32)
+    return normalize_rows(matrix)
+
+
+def rerank(matrix, query, candidates, top_k):
+    candidates = np.sort(candidates)
+    scores = np.asarray(matrix[candidates]) @ query
+    return candidates[top_k_indices(scores, top_k)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", default=None)
+    parser.add_argument("--queries-csv", default=None)
+    parser.add_argument("--model", default="distiluse-base-multilingual-cased-v1")
+    parser.add_argument("--num-docs", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-depth", type=int, nargs="+", default=[50, 200, 1000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.index_dir:
+        matrix = np.load(os.path.join(args.index_dir, NORMALIZED_MATRIX_FILE))
+    else:
+        matrix = synthetic_corpus(rng, args.num_docs, args.dim)
+
+    if args.queries_csv:
+        from sentence_transformers import SentenceTransformer
+
+        texts = load_query_frequencies(args.queries_csv)[:args.queries]
+        queries = normalize_rows(SentenceTransformer(args.model).encode(texts, convert_to_numpy=True).astype(np.float32))
+    else:
+        # Perturbed corpus rows stand in for queries
+        queries = np.asarray(matrix[rng.choice(matrix.shape[0], args.queries, replace=False)], dtype=np.float32)
+        queries += 0.3 / np.sqrt(matrix.shape[1]) * rng.standard_normal(queries.shape, dtype=np.float32)
+        queries = normalize_rows(queries)
+
+    truth, exact_times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        truth.append(top_k_indices(matrix @ query, args.top_k))
+        exact_times.append(time.perf_counter() - start)
+
+    k = args.top_k
+    print(f"{matrix.shape[0]} docs x {matrix.shape[1]} dims, {len(queries)} queries, recall@{k}")
+    print(f"{'storage':<10}{'MB':>10}{'saved':>8}{'rerank':>8}{'ms/query':>10}{f'recall@{k}':>12}")
+    print(f"{'float32':<10}{matrix.nbytes / 1e6:>10.1f}{'-':>8}{'-':>8}{np.median(exact_times) * 1e3:>10.2f}{1.0:>12.3f}")
+    for kind in QUANTIZATION_KINDS:
+        quantized = QuantizedMatrix.quantize(matrix, kind)
+        saved = 1 - quantized.nbytes / matrix.nbytes
+        for depth in [k] + [d for d in args.rerank_depth if d > k]:
+            timings, recalls = [], []
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                candidates, _ = quantized.search(query, depth)
+                indices = rerank(matrix, query, candidates, k) if depth > k else candidates
+                timings.append(time.perf_counter() - start)
+                recalls.append(len(np.intersect1d(indices, expected)) / k)
+            label = depth if depth > k else "none"
+            print(f"{kind:<10}{quantized.nbytes / 1e6:>10.1f}{saved:>8.0%}{label:>8}"
+                  f"{np.median(timings) * 1e3:>10.2f}{np.mean(recalls):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark per-query scoring cost of the legacy QueryService path (np.vstack + sklearn cosine_similarity
+on every request) against the pre-stacked, pre-normalized embedding matrix built once in load_index.
+
+Runs on a synthetic index, so no model or index directory is needed:
+
+    python experiments/bench_query_matrix.py --num-docs 1000000 --dim 512
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.models.vector_store import normalize_rows, split_shards
+
+
+def legacy_scores(shards, query_embedding):
+    """
+    Scoring as done before: stack every shard and let sklearn re-normalize the corpus.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    all_embeddings = np.vstack(shards)
+    return cosine_similarity([query_embedding], all_embeddings)[0]
+
+
+def matrix_scores(matrix, query_embedding):
+    """
+    Scoring against the pre-normalized matrix: one matrix-vector product.
+    """
+    query = normalize_rows(query_embedding.reshape(1, -1).astype(np.float32))[0]
+    return matrix @ query
+
+
+def measure(score_fn, corpus, queries, top_k):
+    """
+    Return (median seconds per query, peak bytes allocated per query).
+    """
+    timings = []
+    peaks = []
+    for query in queries:
+        tracemalloc.start()
+        start = time.perf_counter()
+        similarities = score_fn(corpus, query)
+        np.argsort(similarities)[-top_k:][::-1]
+        timings.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return float(np.median(timings)), int(np.median(peaks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-docs", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--shard-size", type=int, default=25000)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    raw = rng.standard_normal((args.num_docs, args.dim), dtype=np.float32)
+    shard_sizes = [min(args.shard_size, args.num_docs - start) for start in range(0, args.num_docs, args.shard_size)]
+    shards = split_shards(raw, shard_sizes)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    print(f"Synthetic index: {args.num_docs} docs x {args.dim} dims in {len(shards)} shards "
+          f"({raw.nbytes / 1e6:.1f} MB)")
+
+    before_time, before_bytes = measure(legacy_scores, shards, queries, args.top_k)
+
+    # Build the matrix the way QueryService.load_index does, then drop the raw shards
+    matrix = normalize_rows(raw.copy())
+    del shards, raw
+    after_time, after_bytes = measure(matrix_scores, matrix, queries, args.top_k)
+
+    print(f"{'path':<32}{'ms/query':>12}{'MB allocated/query':>22}")
+    print(f"{'vstack + cosine_similarity':<32}{before_time * 1e3:>12.2f}{before_bytes / 1e6:>22.2f}")
+    print(f"{'pre-normalized matrix @ query':<32}{after_time * 1e3:>12.2f}{after_bytes / 1e6:>22.2f}")
+    print(f"Speedup: {before_time / after_time:.1f}x, allocation reduction: {before_bytes / max(after_bytes, 1):.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Tail latency of scatter-gather search with stragglers: the embedding shards of the index in ./index are split
+into --groups shard groups served by --replicas local node processes each, and every node answers a request
+--straggle-ms late with probability --straggle-prob (GC pauses, noisy neighbours, slow disks). Random
+normalized query vectors are ranked one after another with hedged requests off, with a fixed hedge delay,
+and with the adaptive (p95) delay. No encoder is needed.
+
+    python experiments/bench_scatter_gather.py --groups 2 --replicas 2 --straggle-prob 0.02 --straggle-ms 200
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.models.vector_store import list_index_files, shard_number
+from backend.app.services.scatter_gather import ShardCluster
+from backend.app.services.shard_search import ShardSearchService, ShardServer
+
+AUTHKEY = b"bench"
+
+
+class Straggler:
+    """
+    ShardSearchService whose requests are sometimes delayed.
+    """
+    def __init__(self, service, probability: float, delay: float, seed: int):
+        self.service = service
+        self.probability = probability
+        self.delay = delay
+        self.random = random.Random(seed)
+
+    def info(self):
+        return self.service.info()
+
+    def rank_embeddings(self, query_embeddings, top_k):
+        if self.random.random() < self.probability:
+            time.sleep(self.delay)
+        return self.service.rank_embeddings(query_embeddings, top_k)
+
+    def fetch_metadata(self, indices, fields=None):
+        return self.service.fetch_metadata(indices, fields)
+
+
+def run_node(index_dir, shard_numbers, probability, delay, seed, addresses):
+    server = ShardServer(Straggler(ShardSearchService(index_dir, shard_numbers), probability, delay, seed),
+                         ("127.0.0.1", 0), AUTHKEY)
+    addresses.put((seed, f"127.0.0.1:{server.address[1]}"))
+    server.serve_forever()
+
+
+def measure(name, cluster, queries, top_k):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        cluster.rank_embeddings(query[None, :], top_k)
+        latencies.append(time.perf_counter() - start)
+    stats = cluster.stats()
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    print(f"{name:<14}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{max(latencies) * 1000:>9.1f}"
+          f"{stats['hedged'] / (len(queries) * len(cluster.groups)):>9.1%}{stats['hedges_won']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", default="./index")
+    parser.add_argument("--groups", type=int, default=2)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--straggle-prob", type=float, default=0.02)
+    parser.add_argument("--straggle-ms", type=float, default=200.0)
+    parser.add_argument("--hedge-ms", type=float, default=100.0, help="Fixed hedge delay to compare")
+    args = parser.parse_args()
+
+    embedding_paths, _ = list_index_files(args.index_dir)
+    numbers = [shard_number(os.path.basename(path)) for path in embedding_paths]
+    if len(numbers) < args.groups:
+        parser.error(f"{args.index_dir} has only {len(numbers)} shards.")
+    groups = [list(part) for part in np.array_split(numbers, args.groups)]
+
+    context = multiprocessing.get_context("spawn")
+    addresses = context.Queue()
+    nodes = []
+    for g, shard_numbers in enumerate(groups):
+        for r in range(args.replicas):
+            node = context.Process(target=run_node, daemon=True, args=(
+                args.index_dir, shard_numbers, args.straggle_prob, args.straggle_ms / 1000, g * args.replicas + r, addresses))
+            node.start()
+            nodes.append(node)
+    started = dict(addresses.get(timeout=600) for _ in nodes)
+    shards = [[started[g * args.replicas + r] for r in range(args.replicas)] for g in range(args.groups)]
+
+    try:
+        dimension = np.load(embedding_paths[0], mmap_mode="r").shape[1]
+        rng = np.random.default_rng(0)
+        queries = rng.standard_normal((args.queries, dimension)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        print(f"{len(groups)} groups x {args.replicas} replicas, {args.straggle_prob:.0%} of requests {args.straggle_ms:.0f} ms late")
+        print(f"{'hedging':<14}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'hedged':>9}{'won':>7}")
+        for name, hedge_delay in (("off", 3600.0), (f"{args.hedge_ms:.0f} ms", args.hedge_ms / 1000), ("adaptive p95", None)):
+            cluster = ShardCluster(shards, AUTHKEY, timeout=3600.0, hedge_delay=hedge_delay)
+            for query in queries[:20]:  # Warm up connections and latency samples
+                cluster.rank_embeddings(query[None, :], args.top_k)
+            cluster.hedged = cluster.hedges_won = 0
+            measure(name, cluster, queries, args.top_k)
+            cluster.close()
+    finally:
+        for node in nodes:
+            node.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Closed-loop load test of a running API: --clients concurrent clients each send /search requests back to
+back for --duration seconds. Reports throughput, latency percentiles of the successful requests, and the
+number of 503 rejections. Queries are taken from the query-frequency log, or generated when it is missing;
+the result cache should be disabled (retrieval.result_cache_mb: 0) so every request is scored.
+
+    uvicorn backend.app.main:app --port 8000 &
+    python experiments/bench_search_load.py --url http://localhost:8000 --clients 200 --duration 30
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.utils.cache import load_query_frequencies
+
+QUERIES_CSV = os.path.abspath(os.path.join(os.path.dirname(__file__), "../queries_frequency.csv"))
+
+
+async def request(reader, writer, host, path):
+    """
+    One HTTP/1.1 keep-alive GET; the client is kept minimal so that it is not the bottleneck itself.
+    :return: Tuple of (status code, Retry-After seconds or None).
+    """
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length, retry_after = 0, None
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+        elif name.lower() == "retry-after":
+            retry_after = float(value)
+    await reader.readexactly(length)
+    return status, retry_after
+
+
+async def client(url, queries, top_k, deadline, latencies, statuses, rng):
+    parsed = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parsed.hostname, parsed.port or 80)
+    try:
+        while time.perf_counter() < deadline:
+            path = f"{parsed.path.rstrip('/')}/search?" + urlencode({"query": queries[rng.integers(len(queries))], "top_k": top_k})
+            start = time.perf_counter()
+            try:
+                status, retry_after = await request(reader, writer, parsed.netloc, path)
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                statuses[type(e).__name__] += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(parsed.hostname, parsed.port or 80)
+                continue
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            elif retry_after is not None:
+                # Back off as the server asks, like a well-behaved client
+                await asyncio.sleep(retry_after)
+    finally:
+        writer.close()
+
+
+async def run(args, queries):
+    latencies, statuses = [], Counter()
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(
+        client(args.url, queries, args.top_k, deadline, latencies, statuses, np.random.default_rng(i))
+        for i in range(args.clients)
+    ))
+    return np.array(latencies) * 1000, statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--queries-csv", default=QUERIES_CSV)
+    args = parser.parse_args()
+
+    if os.path.exists(args.queries_csv):
+        queries = load_query_frequencies(args.queries_csv)[:10000]
+    else:
+        queries = [f"Mitarbeiter Vertrieb {i}" for i in range(10000)]
+
+    latencies, statuses, elapsed = asyncio.run(run(args, queries))
+    print(f"{args.clients} clients for {elapsed:.1f} s against {args.url}")
+    print(f"status counts: {dict(statuses)}")
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"ok: {len(latencies) / elapsed:.1f} req/s, p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms, max {latencies.max():.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark of top-k selection over a similarity vector: full np.argsort (the previous QueryService path)
+against argpartition + sorting only the k winners, and the per-shard selection + merge used by QueryService.search.
+Every path is checked for exact rank equivalence against a stable argsort.
+
+    python experiments/bench_top_k.py --num-docs 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the project root directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from backend.app.models.vector_store import merge_top_k, top_k_indices
+
+
+def full_argsort(scores, top_k, shard_size):
+    return np.argsort(scores)[-top_k:][::-1]
+
+
+def partial_top_k(scores, top_k, shard_size):
+    return top_k_indices(scores, top_k)
+
+
+def sharded_top_k(scores, top_k, shard_size):
+    shard_indices, shard_scores = [], []
+    for offset in range(0, scores.shape[0], shard_size):
+        shard = scores[offset:offset + shard_size]
+        indices = top_k_indices(shard, top_k)
+        shard_indices.append(indices + offset)
+        shard_scores.append(shard[indices])
+    return merge_top_k(shard_indices, shard_scores, top_k)[0]
+
+
+def time_per_call(fn, scores, top_k, shard_size, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(scores, top_k, shard_size)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-docs", type=int, default=1_000_000)
+    parser.add_argument("--shard-size", type=int, default=25000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Cosine scores of real embeddings are float32 with many exact ties, so quantize to provoke them
+    scores = np.round(rng.uniform(-1.0, 1.0, args.num_docs), 4).astype(np.float32)
+
+    paths = [("np.argsort", full_argsort), ("argpartition", partial_top_k), ("per-shard + merge", sharded_top_k)]
+    print(f"{args.num_docs} scores, shard size {args.shard_size}")
+    print(f"{'top_k':>6}" + "".join(f"{name + ' ms':>22}" for name, _ in paths))
+    for top_k in (10, 100, 1000):
+        expected = np.argsort(scores, kind="stable")[-top_k:][::-1]
+        for name, fn in paths[1:]:
+            assert np.array_equal(fn(scores, top_k, args.shard_size), expected), f"{name} differs at top_k={top_k}"
+        row = [time_per_call(fn, scores, top_k, args.shard_size, args.repeats) for _, fn in paths]
+        print(f"{top_k:>6}" + "".join(f"{t * 1e3:>22.2f}" for t in row))
+
+
+if __name__ == "__main__":
+    main()
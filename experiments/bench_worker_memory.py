@@ -0,0 +1,125 @@
+"""
+Memory of a multi-worker API: starts `uvicorn --workers N` and the pre-forking `backend.app.server` in turn
+on the index in ./index, sends some queries, and reports the total proportional set size (PSS, shared pages
+split between the processes sharing them), each worker's private memory, and the startup time.
+Linux only (reads /proc).
+
+    python experiments/bench_worker_memory.py --workers 4
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+
+LAUNCHERS = {
+    # Workers that load for longer than the health-check timeout would be killed and restarted over and over
+    "uvicorn": lambda workers, port: ["-m", "uvicorn", "backend.app.main:app", "--workers", str(workers), "--port", str(port),
+                                      "--timeout-worker-healthcheck", "600"],
+    "prefork": lambda workers, port: ["-m", "backend.app.server", "--workers", str(workers), "--port", str(port)],
+}
+
+
+def memory_kb(pid: int) -> dict:
+    """
+    Pss, Rss and private (Private_Clean + Private_Dirty) kB of a process.
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if rest.strip().endswith("kB"):
+                values[name] = int(rest.split()[0])
+    return {"pss": values["Pss"], "rss": values["Rss"], "private": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def process_tree(root: int) -> list:
+    """
+    The process and all of its descendants.
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except OSError:
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+def search(port: int, query: str) -> int:
+    url = f"http://127.0.0.1:{port}/search?" + urllib.parse.urlencode({"query": query, "top_k": 20})
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            return response.status
+    except (urllib.error.URLError, ConnectionError):
+        return 0
+
+
+def measure(launcher: str, workers: int, port: int, num_queries: int, startup_timeout: float):
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + LAUNCHERS[launcher](workers, port), cwd=PROJECT_ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while search(port, "warm up") != 200:
+            if process.poll() is not None or time.perf_counter() - start > startup_timeout:
+                raise RuntimeError(f"{launcher} did not start")
+            time.sleep(0.5)
+        # The first worker answers while others may still be loading: wait until memory stops growing
+        previous = 0
+        while True:
+            time.sleep(1.0)
+            total = sum(memory_kb(pid)["pss"] for pid in process_tree(process.pid))
+            if abs(total - previous) < 0.01 * total:
+                break
+            previous = total
+        startup = time.perf_counter() - start
+        with ThreadPoolExecutor(max_workers=4 * workers) as pool:
+            statuses = list(pool.map(lambda i: search(port, f"Mitarbeiter Vertrieb {i}"), range(num_queries)))
+
+        usage = {pid: memory_kb(pid) for pid in process_tree(process.pid)}
+        # The largest processes are the workers (uvicorn also starts a resource tracker); a single
+        # uvicorn worker is the launched process itself
+        worker_private = sorted((m["private"] for pid, m in usage.items() if pid != process.pid or workers == 1),
+                                reverse=True)[:workers]
+        total_pss = sum(m["pss"] for m in usage.values())
+        print(f"{launcher:<10}{len(usage):>6}{startup:>10.1f}{total_pss / 1024:>12.0f}"
+              f"{sum(worker_private) / len(worker_private) / 1024:>16.0f}{statuses.count(200):>8}")
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--launchers", nargs="+", default=list(LAUNCHERS), choices=list(LAUNCHERS))
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    print(f"{'launcher':<10}{'procs':>6}{'start s':>10}{'total MB':>12}{'private/worker':>16}{'200s':>8}")
+    for i, launcher in enumerate(args.launchers):
+        measure(launcher, args.workers, args.port + i, args.queries, args.startup_timeout)
+
+
+if __name__ == "__main__":
+    main()